@@ -0,0 +1,211 @@
+#
+# Bands.py
+#
+# Conflict bands: the tracks, ground speeds and vertical speeds of the
+# ownship that are in conflict with some traffic aircraft, and those that
+# are conflict free.
+#
+# Each band is computed from a grid of candidate values of one component
+# of the ownship velocity, the others being kept. Every candidate velocity
+# is checked against every intruder in one call to cd3d_batch, and the
+# consecutive candidates with the same outcome are merged into intervals.
+#
+# State information for each aircraft is given as in CDR:
+# x, y, alt [feet], trk [deg], gs [knots], vs [feet/min]
+# where x, y are lat [deg], lon [deg] for geodesic coordinates (gxy) and
+# x [nm], y [nm] otherwise. Geodesic positions are projected into a tangent
+# plane centred on the ownship.
+#
+# D [nm]   : Horizontal separation
+# H [feet] : Vertical separation
+# T [sec]  : Lookahead time
+#
+# BASIC USAGE:
+#   bands = Bands(D,H,T,gxy)
+#   bands.set_ownship(x,y,alt,trk,gs,vs)
+#   bands.set_traffic(x,y,alt,trk,gs,vs)   // arrays, one element per intruder
+#   for lo, hi, conflict in bands.track_bands() :
+#     ...
+#
+# Intervals are (lo,hi,conflict) tuples in candidate order, with lo and hi
+# candidate values: every candidate of [lo,hi] has the same outcome. Track
+# intervals may wrap around North, in which case lo > hi.
+#
+# Functions
+# ---------
+# - conflict_candidates : Candidate ownship velocities in conflict with
+#                         some intruder
+# - merge_intervals     : Runs of candidates with the same outcome
+#
+
+import numpy as np
+from .Util import ft2m, nm2m, velocity_array
+from .Projection import TangentPlane
+from .CD3DBatch import cd3d_batch
+
+
+__all__ = [ 'conflict_candidates', 'merge_intervals', 'Bands' ]
+
+
+# conflict_candidates: For each candidate ownship velocity (vox,voy,voz)
+# [d/t], whether it is in conflict with one of the intruders at relative
+# positions (sx,sy,sz) [d] (ownship - intruder) with velocities
+# (vix,viy,viz) [d/t]. Candidates and intruders are 1-D arrays.
+#
+# OUTPUTS: conflict, one element per candidate
+#
+def conflict_candidates( D, H, T, filter, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    own = [ np.asarray( v, dtype=float )[:, None] for v in ( vox, voy, voz ) ]
+    rel = [ np.asarray( v, dtype=float )[None, :] for v in ( sx, sy, sz, vix, viy, viz ) ]
+    if rel[0].size == 0 :
+        return np.zeros( own[0].shape[0], dtype=bool )
+    conflict = cd3d_batch( D, H, T, filter, rel[0], rel[1], rel[2],
+                           own[0] - rel[3], own[1] - rel[4], own[2] - rel[5] )[0]
+    return conflict.any( axis=1 )
+
+
+# merge_intervals: Runs of consecutive candidate values with the same
+# outcome. With circular, the last run is merged with the first one when
+# they have the same outcome.
+#
+# OUTPUTS: list of (lo,hi,conflict)
+#
+def merge_intervals( values, conflict, circular=False ) :
+    values = np.asarray( values )
+    conflict = np.asarray( conflict, dtype=bool )
+    if values.size == 0 :
+        return []
+    starts = np.flatnonzero( np.concatenate( ( [ True ], conflict[1:] != conflict[:-1] ) ) )
+    ends = np.append( starts[1:], values.size ) - 1
+    intervals = [ ( values[s].item(), values[e].item(), bool( conflict[s] ) ) for s, e in zip( starts, ends ) ]
+    if circular and len( intervals ) > 1 and intervals[0][2] == intervals[-1][2] :
+        intervals[0] = ( intervals[-1][0], intervals[0][1], intervals[0][2] )
+        intervals.pop()
+    return intervals
+
+
+
+class Bands :
+
+
+    def __init__( self, D, H, T, gxy=False ) :
+
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+        self.filter = 1
+        self.gxy = gxy
+
+        # Candidate tracks [deg], ground speeds [knots], vertical speeds [feet/min]
+        self.track_step = 1.0
+        self.gs_range = ( 150.0, 600.0, 5.0 )
+        self.vs_range = ( -3000.0, 3000.0, 100.0 )
+
+        self.own = None
+        self.traffic = tuple( np.zeros( 0 ) for _ in range( 6 ) )
+
+
+    def set_DHT( self, D, H, T ) :
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+
+
+    def set_detection_filter( self, f ) :
+        self.filter = f
+
+
+    def get_detection_filter( self ) :
+        return self.filter
+
+
+    # Step of the candidate tracks [deg]
+    def set_track_step( self, step ) :
+        self.track_step = step
+
+
+    def get_track_step( self ) :
+        return self.track_step
+
+
+    # Lowest, highest and step of the candidate ground speeds [knots]
+    def set_gs_range( self, lo, hi, step ) :
+        self.gs_range = ( lo, hi, step )
+
+
+    def get_gs_range( self ) :
+        return self.gs_range
+
+
+    # Lowest, highest and step of the candidate vertical speeds [feet/min]
+    def set_vs_range( self, lo, hi, step ) :
+        self.vs_range = ( lo, hi, step )
+
+
+    def get_vs_range( self ) :
+        return self.vs_range
+
+
+    def set_ownship( self, x, y, alt, trk, gs, vs ) :
+        self.own = ( x, y, alt, trk, gs, vs )
+
+
+    # set_traffic: Intruders, one element per aircraft
+    def set_traffic( self, x, y, alt, trk, gs, vs ) :
+        self.traffic = tuple( np.atleast_1d( np.asarray( v, dtype=float ) ) for v in ( x, y, alt, trk, gs, vs ) )
+
+
+    # relative: Positions of the ownship relative to the intruders [m] and
+    # velocities of the intruders [m/s]
+    #
+    # OUTPUTS: sx,sy,sz,vix,viy,viz
+    #
+    def relative( self ) :
+        x, y, alt, trk, gs, vs = self.traffic
+        ox, oy, oalt = self.own[:3]
+        if self.gxy :
+            plane = TangentPlane( ox, oy )
+            px, py = plane.geo2xy( x, y )
+            sx, sy = -px, -py
+        else :
+            sx, sy = nm2m( ox - x ), nm2m( oy - y )
+        return ( sx, sy, ft2m( oalt - alt ) ) + velocity_array( trk, gs, vs )
+
+
+    # Candidate velocities (trk [deg], gs [knots], vs [feet/min]) in conflict
+    def conflicts( self, trk, gs, vs ) :
+        vox, voy, voz = np.broadcast_arrays( *( np.atleast_1d( v ) for v in velocity_array( trk, gs, vs ) ) )
+        sx, sy, sz, vix, viy, viz = self.relative()
+        return conflict_candidates( self.d, self.h, self.t, self.filter, sx, sy, sz,
+                                    vox, voy, voz, vix, viy, viz )
+
+
+    # track_bands: Candidate tracks [deg] in [0,360), ground and vertical
+    # speeds kept
+    #
+    # OUTPUTS: list of (lo,hi,conflict)
+    #
+    def track_bands( self ) :
+        trk = np.arange( 0, 360, self.track_step )
+        gs, vs = self.own[4], self.own[5]
+        return merge_intervals( trk, self.conflicts( trk, gs, vs ), circular=True )
+
+
+    # gs_bands: Candidate ground speeds [knots], track and vertical speed kept
+    #
+    # OUTPUTS: list of (lo,hi,conflict)
+    #
+    def gs_bands( self ) :
+        lo, hi, step = self.gs_range
+        gs = np.arange( lo, hi + step / 2, step )
+        return merge_intervals( gs, self.conflicts( self.own[3], gs, self.own[5] ) )
+
+
+    # vs_bands: Candidate vertical speeds [feet/min], track and ground speed kept
+    #
+    # OUTPUTS: list of (lo,hi,conflict)
+    #
+    def vs_bands( self ) :
+        lo, hi, step = self.vs_range
+        vs = np.arange( lo, hi + step / 2, step )
+        return merge_intervals( vs, self.conflicts( self.own[3], self.own[4], vs ) )
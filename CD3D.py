@@ -29,16 +29,114 @@
 # Functions
 # ---------
 # - cd3d : Conflict detection with calculation of conflict interval 
+#
+# The module functions violation and cd3d take the configuration (D, H, T,
+# filter) as arguments and return their results: they never touch any
+# state and can be called concurrently. The methods of class CD3D call them
+# and store the results in the object.
 # 
 # The below Python implementation is done by Phu Tran @ ATMRI. Comments are from original C++ code
 # 
 
 
 import math
-from Constants import *
-from Util import *
-from LoS import *
-from Geodesic import *
+from .Util import max, min, sign, sq
+
+
+__all__ = [ 'violation', 'cd3d', 'CD3D' ]
+
+
+
+# Check if aircraft are in violation at time 0
+def violation( D, H, sx, sy, sz ) :
+    return sq(sx) + sq(sy) < sq(D) and sq(sz) < sq(H)
+
+
+# cd3d: Conflict detection with conflict interval
+#
+# Let conflict,... = cd3d(D,H,T,filter,sx,sy,sz,vx,vy,vz) in
+#   conflict ==> 
+#     time2los is the time to conflict
+#     duration is the duration of the conflict
+#
+#   violation ==>
+#     time2los = 0
+#     duration is the remaining time to exit the violation.
+#
+#   conflicts are reported only if duration > filter and time2los <= T
+#
+# OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration
+#
+
+def cd3d( D, H, T, filter, sx, sy, sz, vx, vy, vz ) :
+
+    conflict = False
+    t_in = 0
+    t_out = 0
+    time2lhs = 0
+    time2lvs = 0
+
+    if vx == 0 and vy == 0 and sq(sx) + sq(sy) < sq(D) :
+        # There's no horizontal movement
+        
+        conflict = sq(sz) < sq(H) or ( vz != 0 and vz*sz <= 0 and -H < sign(vz)*(T*vz + sz) )
+
+        if conflict :
+            
+            if vz != 0 :
+                
+                t_in     = (  sign(sz)*H - sz ) / vz 
+                t_out    = ( -sign(sz)*H - sz ) / vz 
+                time2lvs = t_in
+            
+            else :
+
+                t_in = 0
+                t_out = T
+
+    else :
+        # vertical conflict in the future
+        
+        d = 2 * sx * vx * sy * vy + sq(D) * ( sq(vx) + sq(vy) ) - ( sq(sx) * sq(vy) + sq(sy) * sq(vx) )
+
+        if d > 0 :
+
+            a = sq(vx) + sq(vy)
+            b = sx*vx + sy*vy
+            theta1 = ( -b - math.sqrt(d) ) / a # first intersection with D
+            theta2 = ( -b + math.sqrt(d) ) / a # second intersection with D
+            time2lhs = theta1
+
+            # theta1 <= theta2 
+
+            if vz == 0 :
+                
+                # horizontal movement only
+                t_in  = theta1
+                t_out = theta2
+                conflict = sq(sz) < sq(H)
+
+            else :
+                
+                # general case
+                t1 = ( -sign(vz)*H - sz ) / vz
+                t2 = (  sign(vz)*H - sz ) / vz
+                time2lvs = t1
+
+                # t1 < t2
+
+                t_in     = max(theta1, t1)
+                t_out    = min(theta2, t2)
+                conflict = theta1 < t2 and t1 < theta2
+
+    time2los = max( t_in, 0 )            
+    time2lhs = max( time2lhs, 0)
+    time2lvs = max( time2lvs, 0)
+    duration = t_out - time2los
+    
+    conflict = conflict and t_in <= T and t_out > 0 and duration > filter
+          
+    return conflict, t_in, t_out, time2los, time2lhs, time2lvs, duration
 
 
 
@@ -93,97 +191,15 @@ class CD3D :
     
     # Check if aircraft are in violation at time 0
     def violation ( self, sx, sy, sz ) :
-        return sq(sx) + sq(sy) < sq(self.D) and sq(sz) < sq(self.H)
+        return violation( self.D, self.H, sx, sy, sz )
 
     
-    # cd3d: Conflict detection with conflict interval
-    #
-    # Let conflict = cd3d(sx,sy,sz,vx,vy,vz) in
-    #   conflict ==> 
-    #     time2los is the time to conflict
-    #     duration is the duration of the conflict
-    #
-    #   violation ==>
-    #     time2los = 0
-    #     duration is the remaining time to exit the violation.
-    #
-    #   conflicts are reported only if duration > filter and time2los <= T
+    # cd3d: Conflict detection with conflict interval (see function cd3d)
     #
     # OUTPUTS: time2los,duration,conflict
     #
 
     def cd3d ( self, sx, sy, sz, vx, vy, vz ) :
-
-        # d
-        # a
-        # b
-        # t1
-        # t2
-        # theta1
-        # theta2
-        
-        self.conflict = False
-        self.t_in = 0
-        self.t_out = 0
-
-        if vx == 0 and vy == 0 and sq(vx) + sq(vy) < sq(self.D) :
-            # There's no horizontal movement
-            
-            self.conflict = sq(sz) < sq(self.H) or ( vz != 0 and vz*sz <= 0 and -self.H < sign(vz)*(self.T*vz + sz) )
-
-            if self.conflict :
-                
-                if vz != 0 :
-                    
-                    self.t_in     = (  sign(sz)*self.H - sz ) / vz 
-                    self.t_out    = ( -sign(sz)*self.H - sz ) / vz 
-                    self.time2lvs = self.t_in
-                
-                else :
-
-                    self.t_in = 0
-                    self.t_out = self.T
-
-        else :
-            # vertical conflict in the future
-            
-            d = 2 * sx * vx * sy * vy + sq(self.D) * ( sq(vx) + sq(vy) ) - ( sq(sx) * sq(vy) + sq(sy) * sq(vx) )
-
-            if d > 0 :
-
-                a = sq(vx) + sq(vy)
-                b = sx*vx + sy*vy
-                theta1 = ( -b - math.sqrt(d) ) / a # first intersection with D
-                theta2 = ( -b + math.sqrt(d) ) / a # second intersection with D
-                self.time2lhs = theta1
-
-                # theta1 <= theta2 
-
-                if vz == 0 :
-                    
-                    # horizontal movement only
-                    self.t_in  = theta1
-                    self.t_out = theta2
-                    self.conflict = sq(sz) < sq(self.H)
-
-                else :
-                    
-                    # general case
-                    t1 = ( -sign(vz)*self.H - sz ) / vz
-                    t2 = (  sign(vz)*self.H - sz ) / vz
-                    self.time2lvs = t1
-
-                    # t1 < t2
-
-                    self.t_in     = max(theta1, t1)
-                    self.t_out    = min(theta2, t2)
-                    self.conflict = theta1 < t2 and t1 < theta2
-
-        self.time2los = max( self.t_in, 0 )            
-        self.time2lhs = max( self.time2lhs, 0)
-        self.time2lvs = max( self.time2lvs, 0)
-        self.duration = self.t_out - self.time2los
-        
-        self.conflict &= self.t_in <= self.T and self.t_out > 0 and self.duration > self.filter
-              
+        ( self.conflict, self.t_in, self.t_out, self.time2los,
+          self.time2lhs, self.time2lvs, self.duration ) = cd3d( self.D, self.H, self.T, self.filter, sx, sy, sz, vx, vy, vz )
         return self.conflict
@@ -0,0 +1,163 @@
+#
+# CD3DBatch.py
+#
+# Array version of CD3D. cd3d_batch evaluates many relative states in one
+# call and reproduces, element by element, every branch of CD3D.cd3d:
+# the no-horizontal-motion case, the vz == 0 case, the lookahead time T
+# and the duration filter.
+#
+# Unit and naming conventions are the same as in CD3D.py. The inputs
+# sx,sy,sz,vx,vy,vz are NumPy arrays (or anything that broadcasts to a
+# common shape); D, H, T and filter are scalars.
+#
+# Functions
+# ---------
+# - cd3d_batch : Conflict detection with conflict interval for many pairs
+# - cd3d_sweep : cd3d_batch for many (D,H,T) settings, sharing the terms
+#                that do not depend on the setting
+#
+# Classes
+# -------
+# - CD3DBatch : Same interface as CD3D, with array inputs and outputs
+#
+
+import numpy as np
+from .Util import sign_array, sq
+from .CD3D import CD3D
+
+
+__all__ = [ 'SWEEP_CHUNK', 'cd3d_batch', 'cd3d_sweep', 'relative_terms', 'cd3d_settings', 'CD3DBatch' ]
+
+
+# Number of pairs per chunk of cd3d_sweep
+SWEEP_CHUNK = 2048
+
+
+# cd3d_batch: Conflict detection with conflict interval, one element per pair
+#
+# Each element is computed as CD3D.cd3d would compute it on a fresh CD3D
+# object with the same D, H, T and filter.
+#
+# OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration
+#
+def cd3d_batch( D, H, T, filter, sx, sy, sz, vx, vy, vz ) :
+    return cd3d_settings( D, H, T, filter, relative_terms( sx, sy, sz, vx, vy, vz ) )
+
+
+# cd3d_sweep: cd3d_batch for K settings D, H, T (arrays of K values, or
+# scalars) at once. The terms that do not depend on the setting are computed
+# once per pair. Element [k,m] is the result of cd3d_batch for pair k with
+# setting m.
+#
+# Pairs are evaluated SWEEP_CHUNK at a time, with the settings along the
+# first axis so that the inner loops run over contiguous pairs; the outputs
+# are views of settings x pairs arrays.
+#
+# OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration (pairs x settings)
+#
+def cd3d_sweep( D, H, T, filter, sx, sy, sz, vx, vy, vz ) :
+    D, H, T = [ a[:, None] for a in np.broadcast_arrays( *[ np.atleast_1d( np.asarray( a, dtype=float ) ) for a in ( D, H, T ) ] ) ]
+    terms = [ term.ravel() for term in relative_terms( sx, sy, sz, vx, vy, vz ) ]
+    n = terms[0].size
+    outputs = [ np.zeros( ( D.size, n ), dtype=dtype ) for dtype in ( bool, ) + ( float, ) * 6 ]
+    for start in range( 0, n, SWEEP_CHUNK ) :
+        stop = start + SWEEP_CHUNK
+        for output, result in zip( outputs, cd3d_settings( D, H, T, filter, tuple( term[None, start:stop] for term in terms ) ) ) :
+            output[:, start:stop] = result
+    return tuple( output.T for output in outputs )
+
+
+# relative_terms: Terms of cd3d that depend on the relative state only:
+# sx,sy,sz,vx,vy,vz, signs of sz and vz, vz != 0, no horizontal motion,
+# sx^2+sy^2, the cross terms of the discriminant, vx^2+vy^2 and s.v
+#
+# OUTPUTS: tuple of arrays of the common shape of the inputs
+#
+def relative_terms( sx, sy, sz, vx, vy, vz ) :
+    sx, sy, sz, vx, vy, vz = np.broadcast_arrays( *[ np.asarray( a, dtype=float ) for a in ( sx, sy, sz, vx, vy, vz ) ] )
+    return ( sx, sy, sz, vx, vy, vz, sign_array( sz ), sign_array( vz ), vz != 0,
+             ( vx == 0 ) & ( vy == 0 ), sq(sx) + sq(sy),
+             2 * sx * vx * sy * vy, sq(sx) * sq(vy) + sq(sy) * sq(vx),
+             sq(vx) + sq(vy), sx*vx + sy*vy )
+
+
+# cd3d_settings: cd3d on the relative terms, for the settings D, H, T
+# (arrays that broadcast with the terms)
+#
+# OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration
+#
+def cd3d_settings( D, H, T, filter, terms ) :
+
+    sx, sy, sz, vx, vy, vz, sign_sz, sign_vz, moving_z, still_xy, s2, cross, square, a, b = terms
+    zeros = np.zeros( np.broadcast_shapes( sx.shape, np.shape( D ), np.shape( H ), np.shape( T ) ) )
+
+    with np.errstate( divide='ignore', invalid='ignore' ) :
+
+        # There's no horizontal movement
+        still = still_xy & ( s2 < sq(D) )
+        still_conflict = still & ( ( sq(sz) < sq(H) ) | ( moving_z & ( vz*sz <= 0 ) & ( -H < sign_vz*( T*vz + sz ) ) ) )
+        still_vz = still_conflict & moving_z
+        still_no_vz = still_conflict & ~moving_z
+
+        t_in     = np.where( still_vz, (  sign_sz*H - sz ) / vz, zeros )
+        t_out    = np.where( still_vz, ( -sign_sz*H - sz ) / vz, zeros )
+        time2lvs = np.where( still_vz, t_in, zeros )
+        t_out    = np.where( still_no_vz, T, t_out )
+
+        # vertical conflict in the future
+        d = cross + sq(D) * a - square
+        crossing = ~still & ( d > 0 )
+
+        root_d = np.sqrt( np.where( crossing, d, 0 ) )
+        theta1 = ( -b - root_d ) / a # first intersection with D
+        theta2 = ( -b + root_d ) / a # second intersection with D
+        time2lhs = np.where( crossing, theta1, zeros )
+
+        # horizontal movement only
+        level = crossing & ~moving_z
+        t_in  = np.where( level, theta1, t_in )
+        t_out = np.where( level, theta2, t_out )
+
+        # general case
+        general = crossing & moving_z
+        t1 = ( -sign_vz*H - sz ) / vz
+        t2 = (  sign_vz*H - sz ) / vz
+        time2lvs = np.where( general, t1, time2lvs )
+        t_in  = np.where( general, np.maximum( theta1, t1 ), t_in )
+        t_out = np.where( general, np.minimum( theta2, t2 ), t_out )
+
+        conflict = ( still_conflict
+                     | ( level & ( sq(sz) < sq(H) ) )
+                     | ( general & ( theta1 < t2 ) & ( t1 < theta2 ) ) )
+
+    time2los = np.maximum( t_in, 0 )
+    time2lhs = np.maximum( time2lhs, 0 )
+    time2lvs = np.maximum( time2lvs, 0 )
+    duration = t_out - time2los
+
+    conflict &= ( t_in <= T ) & ( t_out > 0 ) & ( duration > filter )
+
+    return conflict, t_in, t_out, time2los, time2lhs, time2lvs, duration
+
+
+class CD3DBatch( CD3D ) :
+
+
+    def __init__( self, d, h, t ) :
+        CD3D.__init__( self, d, h, t )
+
+
+    # Check if aircraft are in violation at time 0
+    def violation( self, sx, sy, sz ) :
+        return ( sq(sx) + sq(sy) < sq(self.D) ) & ( sq(sz) < sq(self.H) )
+
+
+    # cd3d: Conflict detection with conflict interval for arrays of
+    # relative states. Same outputs as CD3D.cd3d, one element per pair.
+    #
+    # OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration
+    #
+    def cd3d( self, sx, sy, sz, vx, vy, vz ) :
+        ( self.conflict, self.t_in, self.t_out, self.time2los,
+          self.time2lhs, self.time2lvs, self.duration ) = cd3d_batch( self.D, self.H, self.T, self.filter, sx, sy, sz, vx, vy, vz )
+        return self.conflict
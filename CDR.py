@@ -38,14 +38,18 @@
  # The below Python implementation was done by Phu Tran @ ATMRI
  #
 
-from pygeodesy.ellipsoidalVincenty import LatLon 
 import math
 from math import sin, cos, fabs, asin
-from Util import *
-from LoS import *
-from Geodesic import *
-from CD3D import *
-from KB3D import *
+from .Constants import NaR
+from .Util import ( atan2_safe, ft2m, knots2msec, m2ft, m2nm, msec2ftmin, msec2knots,
+                    nm2m, rad2deg, sq, sqrt_safe, to360, velocity )
+from .LoS import vertical_recovery
+from .Geodesic import Geodesic
+from .CD3D import cd3d, violation
+from .KB3D import kb3d
+
+
+__all__ = [ 'CDR' ]
 
 
 
@@ -58,10 +62,15 @@ class CDR :
         self.h = ft2m(H)
         self.t = T
 
-        self.cd = CD3D(self.d, self.h, self.t)
-        self.cr = KB3D(self.d, self.h, self.t)      
+        self.set_states( x_o, y_o, alt_o, trk_o, gs_o, vs_o, x_i, y_i, alt_i, trk_i, gs_i, vs_i, gxy )
+        self.vox, self.voy, self.voz = velocity( trk_o, gs_o, vs_o )
+        self.vix, self.viy, self.viz = velocity( trk_i, gs_i, vs_i )
+        self.clear_outputs()
 
-        
+
+    # set_states: Relative position of the pair and, for geodesic coordinates,
+    # the absolute states of the two aircraft
+    def set_states( self, x_o, y_o, alt_o, trk_o, gs_o, vs_o, x_i, y_i, alt_i, trk_i, gs_i, vs_i, gxy ) :
 
         if gxy :
 
@@ -105,19 +114,11 @@ class CDR :
             self.course = rad2deg( atan2_safe( x_i - x_o, y_i - y_o ) )
 
         self.sz = ft2m( alt_o - alt_i )
-        
-        gs   = knots2msec(gs_o)
-        trk  = deg2rad(trk_o)
-        self.vox = gs2vx(gs,trk)
-        self.voy = gs2vy(gs,trk)
-        self.voz = ftmin2msec(vs_o)
-        
-        gs  = knots2msec(gs_i)
-        trk = deg2rad(trk_i)
-        self.vix = gs2vx(gs,trk)
-        self.viy = gs2vy(gs,trk)
-        self.viz = ftmin2msec(vs_i)
 
+
+    def clear_outputs( self ) :
+
+        self.conflict = False
         self.time2los = 0
         self.t_in = 0
         self.t_out = 0
@@ -132,64 +133,54 @@ class CDR :
         self.optgs = NaR
 
     
+    # clear_CDR: Kept for compatibility; detection and resolution call the
+    # stateless cd3d and kb3d and hold no CD3D or KB3D objects
     def clear_CDR( self ) :
-        del self.cd, self.cr
+        pass
         
 
     def violation( self ) :
-        self.cd.set_D(self.d)
-        self.cd.set_H(self.h)
-        self.cd.set_T(self.t)
-        return self.cd.violation( self.sx, self.sy, self.sz )
+        return violation( self.d, self.h, self.sx, self.sy, self.sz )
 
     
     def detection( self ) :
-        self.cd.set_D(self.d)
-        self.cd.set_H(self.h)
-        self.cd.set_T(self.t)
-        self.cd.set_filter(self.filter)
-        self.cd.cd3d(self.sx, self.sy, self.sz, self.vox - self.vix, self.voy - self.viy, self.voz - self.viz)
-        self.time2los = self.cd.time2los
-        self.time2lhs = self.cd.time2lhs
-        self.time2lvs = self.cd.time2lvs
-        self.duration = self.cd.duration
-        self.t_in = self.cd.t_in
-        self.t_out = self.cd.t_out
-        return self.cd.conflict
+        ( self.conflict, self.t_in, self.t_out, self.time2los, self.time2lhs, self.time2lvs,
+          self.duration ) = cd3d( self.d, self.h, self.t, self.filter, self.sx, self.sy, self.sz,
+                                  self.vox - self.vix, self.voy - self.viy, self.voz - self.viz )
+        return self.conflict
 
 
     def resolution( self ) :
-        cdnow = CD3D( self.d, self.h, self.t )
-        self.cr.set_D(self.d)
-        self.cr.set_H(self.h)
-        self.cr.set_T(self.t)
         self.recovery = 0
+        conflict, t_in = cd3d( self.d, self.h, self.t, 0, self.sx, self.sy, self.sz,
+                               self.vox - self.vix, self.voy - self.viy, self.voz - self.viz )[:2]
 
-        if cdnow.cd3d( self.sx, self.sy, self.sz, self.vox - self.vix, self.voy - self.viy, self.voz - self.viz ) :
+        if conflict :
             
-            if not cdnow.violation( self.sx, self.sy, self.sz ) : # aircraft are separated
-                self.cr.kb3d( self.sx, self.sy, self.sz, self.vox, self.voy, self.voz, self.vix, self.viy, self.viz )                
+            if not violation( self.d, self.h, self.sx, self.sy, self.sz ) : # aircraft are separated
+                trk, gs, opt_trk, opt_gs, vs = kb3d( self.d, self.h, self.t, self.sx, self.sy, self.sz,
+                                                     self.vox, self.voy, self.voz, self.vix, self.viy, self.viz )
                 
-                if self.cr.trk != NaR : 
+                if trk != NaR : 
                     self.recovery = 1
-                    self.newtrk = rad2deg(self.cr.trk)                
+                    self.newtrk = rad2deg(trk)                
                 
-                if self.cr.gs != NaR :
+                if gs != NaR :
                     self.recovery = 1
-                    self.newgs = msec2knots(self.cr.gs)                
+                    self.newgs = msec2knots(gs)                
                 
-                if self.cr.opt_trk != NaR :
+                if opt_trk != NaR :
                     self.recovery = 1
-                    self.opttrk = rad2deg(self.cr.opt_trk)
-                    self.optgs = msec2knots(self.cr.opt_gs)
+                    self.opttrk = rad2deg(opt_trk)
+                    self.optgs = msec2knots(opt_gs)
                 
-                if self.cr.vs != NaR :
+                if vs != NaR :
                     self.recovery = 1
-                    self.newvs = msec2ftmin(self.cr.vs)                
+                    self.newvs = msec2ftmin(vs)                
             
             else : # aircraft are in violation
                 self.recovery = -1
-                self.newvs = msec2ftmin( vertical_recovery( self.sx, self.sy, self.sz, self.voz, self.viz, self.h, fabs(cdnow.t_in) ) )
+                self.newvs = msec2ftmin( vertical_recovery( self.sx, self.sy, self.sz, self.voz, self.viz, self.h, fabs(t_in) ) )
 
 
     def set_DHT( self, D, H, T ) :
@@ -228,7 +219,7 @@ class CDR :
         # ownship : lon [deg] lat[deg] alt[feet] trk[deg] gs[knots] vs [ft/min]
         # traffic : lon [deg] lat[deg] alt[feet] trk[deg] gs[knots] vs [ft/min]
          
-        if not self.cd.conflict :
+        if not self.conflict :
             # no conflict
             return False
 
@@ -246,8 +237,11 @@ class CDR :
             dist2entry_i = knots2msec(self.gs_i) * self.t_in # [m]
             dist2exit_i = knots2msec(self.gs_i)  * self.t_out # [m]
 
+            # pygeodesy is only loaded by the first call
+            from pygeodesy.ellipsoidalVincenty import LatLon
+
             current_loc_o = LatLon(self.x_o, self.y_o)
-            current_loc_i = LatLon(self.x_o, self.y_i)
+            current_loc_i = LatLon(self.x_i, self.y_i)
 
             entry_o = current_loc_o.destination(dist2entry_o, self.trk_o)
             exit_o = current_loc_o.destination(dist2exit_o, self.trk_o)
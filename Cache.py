@@ -0,0 +1,268 @@
+#
+# Cache.py
+#
+# Memoization of the scalar KB3D and CD3D solvers. Pairs that keep nearly
+# the same relative state from one tick to the next get the result of the
+# first call instead of a new one.
+#
+# Inputs are quantized to a position step [d] and a velocity step [d/t]:
+# states that round to the same steps share one entry, whose result is the
+# one computed for the first state seen. The last `size` entries used are
+# kept (least recently used eviction).
+#
+# Accuracy guard: near a branch boundary of the solvers, a change smaller
+# than the quantization can change the result completely. States whose
+# relative margin to one of the boundaries below is within `guard` bypass
+# the cache and are always computed:
+#   - horizontal separation, now and at the lookahead time: s2 = D^2
+#   - vertical separation, now and at the lookahead time  : |sz| = H
+#   - relative velocity tangent to the protected zone     : delta = 0
+#   - time of closest approach                            : s.v = 0 (tau_pos)
+#   - horizontal coordination                             : s x v = 0
+#   - KB3D ground speed quadratic                         : discr = 0, a = 0
+#   - KB3D track quadratic                                : discr = 0, sxy = 0
+# The KB3D solvers also test tau_pos and the contact time on the relative
+# velocity of each candidate maneuver. These candidates cost about as much
+# as kb3d itself, so they are checked once, on the state that fills an
+# entry: a cell whose state is near one of these boundaries keeps no result
+# and every later state in it bypasses the cache.
+#
+# Unit conventions are those of KB3D.py and CD3D.py.
+#
+# BASIC USAGE:
+#   cache = ResolutionCache(D,H,T)
+#   trk, gs, opt_trk, opt_gs, vs = cache.kb3d(sx,sy,sz,vox,voy,voz,vix,viy,viz)
+#   conflict, ... = cache.cd3d(filter,sx,sy,sz,vx,vy,vz)
+#
+# Counters
+# --------
+# hits, misses : Calls answered from the cache, and computed then cached
+# bypassed     : Calls computed without the cache, by the accuracy guard
+#
+
+from collections import OrderedDict
+from .Util import discr, root, sq, sqrt
+from .CD3D import cd3d
+from .KB3D import kb3d
+
+
+__all__ = [ 'near_boundary', 'near_maneuver_boundary', 'ResolutionCache' ]
+
+
+# Entry of a cell whose results are always computed
+BYPASS = object()
+
+
+# near_boundary: Whether the relative state (sx,sy,sz) [d], (vx,vy,vz)
+# [d/t] is within the relative margin guard of a branch boundary of cd3d.
+# With the ownship and intruder velocities vo and vi, the ground speed and
+# track quadratics of KB3D are also checked.
+def near_boundary( D, H, T, guard, sx, sy, sz, vx, vy, vz, vo=None, vi=None ) :
+    s2 = sq(sx) + sq(sy)
+    v2 = sq(vx) + sq(vy)
+    if abs( s2 - sq(D) ) < guard * sq(D) or \
+       abs( sq(sx + T*vx) + sq(sy + T*vy) - sq(D) ) < guard * sq(D) :
+        return True
+    if abs( abs(sz) - H ) < guard * H or abs( abs(sz + T*vz) - H ) < guard * H :
+        return True
+    if v2 > 0 and ( abs( sq(D) * v2 - sq(sx*vy - sy*vx) ) < guard * sq(D) * v2 or
+                    abs( sx*vx + sy*vy ) < guard * sqrt( s2 * v2 ) or
+                    abs( sx*vy - sy*vx ) < guard * sqrt( s2 * v2 ) ) :
+        return True
+    if vo is not None :
+        vox, voy = vo
+        vix, viy = vi
+        a = sq(D) * ( sq(vox) + sq(voy) ) - sq(sx*voy - sy*vox)
+        b = 2*( (sx*voy - sy*vox) * (sx*viy - sy*vix) - sq(D) * (vox*vix + voy*viy) )
+        c = sq(D) * ( sq(vix) + sq(viy) ) - sq(sx*viy - sy*vix)
+        if abs( discr( a, b, c ) ) < guard * sq(b) or abs( a ) < guard * sq(D) * ( sq(vox) + sq(voy) ) :
+            return True
+        if s2 > sq(D) :
+            R = D / sqrt( s2 - sq(D) )
+            v2 = sq(vox) + sq(voy)
+            for epsilon in ( 1, -1 ) :
+                sxy, syx = sx - epsilon*R*sy, sy + epsilon*R*sx
+                viyx = viy*sxy - vix*syx
+                a = sq(s2) / ( s2 - sq(D) )
+                b = 2*syx*viyx
+                c = sq(viyx) - sq(sxy)*v2
+                if abs( sxy ) < guard * ( abs(sx) + R*abs(sy) ) or \
+                   abs( discr( a, b, c ) ) < guard * ( sq(b) + abs( 4*a*c ) ) :
+                    return True
+    return False
+
+
+# near_maneuver_boundary: Whether the relative velocity of a candidate
+# ground speed or track maneuver of KB3D is within the relative margin guard
+# of tau_pos, or the contact time of a candidate optimal maneuver within
+# guard of 0 (the candidates of KB3D.ground_speed_k, track_vx_vy and
+# optimal_vx_vy, for both values of epsilon).
+def near_maneuver_boundary( D, guard, sx, sy, vox, voy, vix, viy ) :
+    s2 = sq(sx) + sq(sy)
+    if s2 <= sq(D) :
+        return False
+
+    def tangent( rx, ry ) :
+        return abs( sx*rx + sy*ry ) < guard * sqrt( s2 * ( sq(rx) + sq(ry) ) )
+
+    # Ground speed: ownship velocity scaled by k
+    a = sq(D) * ( sq(vox) + sq(voy) ) - sq(sx*voy - sy*vox)
+    b = 2*( (sx*voy - sy*vox) * (sx*viy - sy*vix) - sq(D) * (vox*vix + voy*viy) )
+    c = sq(D) * ( sq(vix) + sq(viy) ) - sq(sx*viy - sy*vix)
+    ks = [ -c/b ] if a == 0 and b != 0 else \
+         [ root( a, b, c, e ) for e in ( 1, -1 ) ] if a != 0 and discr( a, b, c ) >= 0 else []
+    if any( tangent( k*vox - vix, k*voy - viy ) for k in ks ) :
+        return True
+
+    R = D / sqrt( s2 - sq(D) )
+    v2 = sq(vox) + sq(voy)
+    vx, vy = vox - vix, voy - viy
+    for epsilon in ( 1, -1 ) :
+        # Track: solutions of the track quadratic, or along the y axis
+        sxy, syx = sx - epsilon*R*sy, sy + epsilon*R*sx
+        viyx = viy*sxy - vix*syx
+        a = sq(s2) / ( s2 - sq(D) )
+        b = 2*syx*viyx
+        c = sq(viyx) - sq(sxy)*v2
+        if sxy == 0 :
+            ay = sqrt( max( v2 - sq(vix), 0 ) )
+            if tangent( 0, ay - viy ) or tangent( 0, -ay - viy ) :
+                return True
+        elif discr( a, b, c ) >= 0 :
+            for e in ( 1, -1 ) :
+                tx = root( a, b, c, e )
+                if tangent( tx - vix, ( viyx + syx*tx ) / sxy - viy ) :
+                    return True
+
+        # Optimal: contact time with the tangent point q
+        qx = sq(D) / s2 * sx + epsilon * D * sqrt( s2 - sq(D) ) / s2 * sy
+        qy = sq(D) / s2 * sy - epsilon * D * sqrt( s2 - sq(D) ) / s2 * sx
+        if abs( vx*(qx-sx) + vy*(qy-sy) ) < guard * sqrt( ( sq(vx) + sq(vy) ) * ( sq(qx-sx) + sq(qy-sy) ) ) :
+            return True
+    return False
+
+
+
+class ResolutionCache :
+
+
+    def __init__( self, D, H, T, size=4096, position=1.0, velocity=0.01, guard=1e-2 ) :
+
+        self.D = D
+        self.H = H
+        self.T = T
+        self.size = size
+        self.position = position
+        self.velocity = velocity
+        self.guard = guard
+        self.entries = OrderedDict()
+        self.clear()
+
+
+    # clear: Empties the cache and resets the counters
+    def clear( self ) :
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+
+    # The cached results depend on D, H and T: changing them empties the cache
+    def set_DHT( self, D, H, T ) :
+        self.D = D
+        self.H = H
+        self.T = T
+        self.clear()
+
+
+    # Largest number of entries
+    def set_size( self, size ) :
+        self.size = size
+        while len( self.entries ) > self.size :
+            self.entries.popitem( last=False )
+
+
+    def get_size( self ) :
+        return self.size
+
+
+    # Quantization steps of positions [d] and velocities [d/t]. Changing
+    # them empties the cache.
+    def set_quantization( self, position, velocity ) :
+        self.position = position
+        self.velocity = velocity
+        self.clear()
+
+
+    def get_quantization( self ) :
+        return self.position, self.velocity
+
+
+    # Relative margin to the branch boundaries below which the cache is
+    # bypassed (0 never bypasses it)
+    def set_guard( self, guard ) :
+        self.guard = guard
+
+
+    def get_guard( self ) :
+        return self.guard
+
+
+    # Fraction of the calls answered from the cache
+    def hit_rate( self ) :
+        calls = self.hits + self.misses + self.bypassed
+        return self.hits / calls if calls else 0.0
+
+
+    def key( self, name, positions, velocities ) :
+        return ( ( name, ) + tuple( round( p / self.position ) for p in positions ) +
+                 tuple( round( v / self.velocity ) for v in velocities ) )
+
+
+    # lookup: Result of solve() for key, from the cache when present. On a
+    # miss, a cell for which bypass() holds is marked to be always computed.
+    def lookup( self, key, solve, bypass=None ) :
+        result = self.entries.get( key )
+        if result is BYPASS :
+            self.entries.move_to_end( key )
+            self.bypassed += 1
+            return solve()
+        if result is not None :
+            self.entries.move_to_end( key )
+            self.hits += 1
+            return result
+        if bypass is not None and bypass() :
+            self.bypassed += 1
+            result, self.entries[key] = solve(), BYPASS
+        else :
+            self.misses += 1
+            result = self.entries[key] = solve()
+        if len( self.entries ) > self.size :
+            self.entries.popitem( last=False )
+        return result
+
+
+    # kb3d: KB3D.kb3d through the cache
+    #
+    # OUTPUTS: trk,gs,opt_trk,opt_gs,vs
+    #
+    def kb3d( self, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+        solve = lambda : kb3d( self.D, self.H, self.T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+        if near_boundary( self.D, self.H, self.T, self.guard, sx, sy, sz, vox - vix, voy - viy, voz - viz,
+                          ( vox, voy ), ( vix, viy ) ) :
+            self.bypassed += 1
+            return solve()
+        bypass = lambda : self.guard > 0 and near_maneuver_boundary( self.D, self.guard, sx, sy, vox, voy, vix, viy )
+        return self.lookup( self.key( 'kb3d', ( sx, sy, sz ), ( vox, voy, voz, vix, viy, viz ) ), solve, bypass )
+
+
+    # cd3d: CD3D.cd3d through the cache
+    #
+    # OUTPUTS: conflict,t_in,t_out,time2los,time2lhs,time2lvs,duration
+    #
+    def cd3d( self, filter, sx, sy, sz, vx, vy, vz ) :
+        solve = lambda : cd3d( self.D, self.H, self.T, filter, sx, sy, sz, vx, vy, vz )
+        if near_boundary( self.D, self.H, self.T, self.guard, sx, sy, sz, vx, vy, vz ) :
+            self.bypassed += 1
+            return solve()
+        return self.lookup( self.key( ( 'cd3d', filter ), ( sx, sy, sz ), ( vx, vy, vz ) ), solve )
@@ -1,4 +1,7 @@
 # Constants used in Util.py
+
+__all__ = [ 'TAU_MIN', 'NaR', 'PI', 'WGS84', 'Flat' ]
+
 TAU_MIN = 0.0001 # A minimum time for positive tau
 NaR = 9999999   # An arbitrary large number
 PI = 3.141592654 # Value of Pi 
@@ -0,0 +1,178 @@
+#
+# Fleet.py
+#
+# State table for all tracked aircraft. The fleet is one NumPy structured
+# array (FLEET_DTYPE) sorted by aircraft id, with one row of 80 bytes per
+# aircraft. Velocities are converted to SI units once, when a state is
+# inserted or updated, and kept next to the given track, ground speed and
+# vertical speed, so that building a pair repeats neither the conversion
+# nor its inverse for both aircraft.
+#
+# State information for each aircraft is given as in CDR:
+# x, y, alt [feet], trk [deg], gs [knots], vs [feet/min]
+# where x, y are lat [deg], lon [deg] for geodesic coordinates (gxy) and
+# x [nm], y [nm] otherwise. Aircraft ids are integers.
+#
+# insert, update and delete take one aircraft or arrays of aircraft.
+#
+# BASIC USAGE:
+#   fleet = Fleet(gxy)
+#   fleet.update(ids,x,y,alt,trk,gs,vs)
+#   ...
+#   // All conflicts and resolutions of the fleet
+#   scene = Scene(D,H,T)
+#   scene.set_fleet(fleet)
+#   scene.detection()
+#   scene.resolution()
+#
+#   // One pair, with the CDR interface
+#   cdr = fleet.pair(D,H,T,own_id,intruder_id)
+#   if cdr.detection() :
+#     cdr.resolution()
+#     ...
+#
+# FleetPair has the interface of CDR (detection, violation, resolution,
+# loc_at_conflict, ...) and gives the same results as a CDR built from the
+# same states.
+#
+
+import numpy as np
+from .Util import ft2m, nm2m, velocity_array
+from .CDR import CDR
+
+
+__all__ = [ 'FLEET_DTYPE', 'Fleet', 'FleetPair' ]
+
+
+# One row per aircraft: id, state (CDR units) and velocity [m/s]
+FLEET_DTYPE = np.dtype( [ ( 'id', np.int64 ),
+                          ( 'x', np.float64 ), ( 'y', np.float64 ), ( 'alt', np.float64 ),
+                          ( 'trk', np.float64 ), ( 'gs', np.float64 ), ( 'vs', np.float64 ),
+                          ( 'vx', np.float64 ), ( 'vy', np.float64 ), ( 'vz', np.float64 ) ] )
+
+
+
+class Fleet :
+
+
+    def __init__( self, gxy=True ) :
+        self.gxy = gxy
+        self.table = np.zeros( 0, dtype=FLEET_DTYPE )
+
+
+    def size( self ) :
+        return self.table.size
+
+
+    # Memory used by the table [bytes]
+    def nbytes( self ) :
+        return self.table.nbytes
+
+
+    def ids( self ) :
+        return self.table['id']
+
+
+    # find: Rows of the aircraft ids in the table, -1 for unknown ids
+    def find( self, ids ) :
+        ids = np.atleast_1d( np.asarray( ids, dtype=np.int64 ) )
+        if self.table.size == 0 :
+            return np.full( ids.size, -1 )
+        rows = np.minimum( np.searchsorted( self.table['id'], ids ), self.table.size - 1 )
+        return np.where( self.table['id'][rows] == ids, rows, -1 )
+
+
+    def contains( self, ident ) :
+        return bool( self.find( ident )[0] >= 0 )
+
+
+    # Rows of FLEET_DTYPE for the given states
+    def records( self, ids, x, y, alt, trk, gs, vs ) :
+        ids = np.atleast_1d( np.asarray( ids, dtype=np.int64 ) )
+        rec = np.zeros( ids.size, dtype=FLEET_DTYPE )
+        rec['id']  = ids
+        rec['x']   = x
+        rec['y']   = y
+        rec['alt'] = alt
+        rec['trk'] = trk
+        rec['gs']  = gs
+        rec['vs']  = vs
+        rec['vx'], rec['vy'], rec['vz'] = velocity_array( rec['trk'], rec['gs'], rec['vs'] )
+        return rec
+
+
+    # insert: Adds new aircraft. Raises ValueError if an id is already tracked
+    # or repeated.
+    def insert( self, ids, x, y, alt, trk, gs, vs ) :
+        rec = self.records( ids, x, y, alt, trk, gs, vs )
+        if ( self.find( rec['id'] ) >= 0 ).any() or np.unique( rec['id'] ).size != rec.size :
+            raise ValueError( "aircraft already tracked" )
+        table = np.concatenate( ( self.table, rec ) )
+        self.table = table[ np.argsort( table['id'], kind='stable' ) ]
+
+
+    # update: Replaces the states of tracked aircraft and inserts the others
+    def update( self, ids, x, y, alt, trk, gs, vs ) :
+        rec = self.records( ids, x, y, alt, trk, gs, vs )
+        rows = self.find( rec['id'] )
+        known = rows >= 0
+        self.table[rows[known]] = rec[known]
+        if not known.all() :
+            new = rec[~known]
+            # The last state wins when an id is repeated
+            last = new.size - 1 - np.unique( new['id'][::-1], return_index=True )[1]
+            new = new[last]
+            table = np.concatenate( ( self.table, new ) )
+            self.table = table[ np.argsort( table['id'], kind='stable' ) ]
+
+
+    # delete: Removes aircraft. Raises KeyError for unknown ids.
+    def delete( self, ids ) :
+        rows = self.find( ids )
+        if ( rows < 0 ).any() :
+            raise KeyError( "aircraft not tracked" )
+        keep = np.ones( self.table.size, dtype=bool )
+        keep[rows] = False
+        self.table = self.table[keep]
+
+
+    def row( self, ident ) :
+        r = self.find( ident )[0]
+        if r < 0 :
+            raise KeyError( ident )
+        return self.table[r]
+
+
+    # state: x,y,alt,trk,gs,vs of aircraft ident (CDR units)
+    def state( self, ident ) :
+        r = self.row( ident )
+        return ( float( r['x'] ), float( r['y'] ), float( r['alt'] ),
+                 float( r['trk'] ), float( r['gs'] ), float( r['vs'] ) )
+
+
+    # velocity: vx,vy,vz of aircraft ident [m/s,m/s,m/s]
+    def velocity( self, ident ) :
+        r = self.row( ident )
+        return float( r['vx'] ), float( r['vy'] ), float( r['vz'] )
+
+
+    # pair: CDR interface for ownship own and intruder intruder
+    def pair( self, D, H, T, own, intruder ) :
+        return FleetPair( D, H, T, self, own, intruder )
+
+
+
+class FleetPair( CDR ) :
+
+
+    # Same as CDR.__init__, with the states and velocities read from the fleet
+    def __init__( self, D, H, T, fleet, own, intruder ) :
+
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+
+        self.set_states( *( fleet.state( own ) + fleet.state( intruder ) + ( fleet.gxy, ) ) )
+        self.vox, self.voy, self.voz = fleet.velocity( own )
+        self.vix, self.viy, self.viz = fleet.velocity( intruder )
+        self.clear_outputs()
@@ -35,8 +35,11 @@
 #
 
 from math import sin, cos
-from Constants import Flat, WGS84
-from Util import *
+from .Constants import Flat, WGS84
+from .Util import asin_safe, atan2_safe, deg2rad, sq, sqrt_safe
+
+__all__ = [ 'gc_dist', 'true_course', 'Geodesic' ]
+
 
 # Great cricle distance [rad]
 def gc_dist( lat1, lon1, lat2, lon2 ) :
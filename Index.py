@@ -0,0 +1,281 @@
+#
+# Index.py
+#
+# Spatial indexes used to prune candidate pairs before conflict detection.
+#
+# Unit Convention
+# ---------------
+# - Positions, altitudes, cell sizes and band widths share the same
+#   distance unit [d], times are in [t] and vertical speeds in [d/t]
+#
+# Classes
+# -------
+# - UniformGrid   : Square horizontal grid. Two aircraft closer than the
+#                   cell size are always in the same or in adjacent cells.
+#                   candidate_pairs lists all such pairs, pairs_of only the
+#                   pairs of some of the points. Given altitude band ranges,
+#                   only the pairs whose ranges overlap are listed.
+# - AltitudeBands : Range of altitude bands that each aircraft may occupy
+#                   within the lookahead time, updated incrementally.
+#
+# Altitude bands
+# --------------
+# Bands are horizontal slices of height width, H by default. The range of
+# an aircraft covers the altitudes it flies through in [0,T], widened by H/2
+# above and below. Two aircraft closer than H vertically at some time of
+# [0,T] are within H/2 of their middle altitude at that time, so their
+# ranges overlap: pairs whose ranges do not overlap can never lose
+# vertical separation and are not listed. A level aircraft at a flight
+# level multiple of H covers two bands and is paired with the aircraft of
+# its own and of the two neighbouring levels only; a climbing or
+# descending aircraft covers every band it crosses.
+#
+# In the grid, an aircraft is binned once per band of its range, and a
+# pair is listed in the lowest band common to both ranges only.
+#
+
+import numpy as np
+
+
+__all__ = [ 'NEIGHBOURS', 'UniformGrid', 'AltitudeBands' ]
+
+
+# Key offsets of the neighbouring cells visited from each cell. Only half
+# of the 8-neighbourhood is visited so that every pair of cells is
+# considered once: (0,0), (0,+1), (+1,-1), (+1,0), (+1,+1).
+NEIGHBOURS = ( ( 0, 0 ), ( 0, 1 ), ( 1, -1 ), ( 1, 0 ), ( 1, 1 ) )
+
+
+
+class UniformGrid :
+
+
+    def __init__( self, cell ) :
+        self.cell = cell
+        self.order = np.zeros( 0, dtype=np.int64 )
+        self.keys = np.zeros( 0, dtype=np.int64 )
+        self.unsorted = self.keys
+        self.stride = 1
+        # One entry per point and band: point of each entry, whether the
+        # entry is in the lowest band of its point, and first entry of each
+        # point (unsorted)
+        self.points = self.order
+        self.lowest = np.zeros( 0, dtype=bool )
+        self.starts = np.zeros( 1, dtype=np.int64 )
+
+
+    def get_cell( self ) :
+        return self.cell
+
+
+    def set_cell( self, cell ) :
+        self.cell = cell
+
+
+    # build: Bins the points (x,y) [d,d] in cells of size cell [d], and in
+    # the altitude bands lo..hi of each point when given (see AltitudeBands)
+    def build( self, x, y, lo=None, hi=None ) :
+        ix = np.floor( np.asarray( x ) / self.cell ).astype( np.int64 )
+        iy = np.floor( np.asarray( y ) / self.cell ).astype( np.int64 )
+        if ix.size > 0 :
+            ix -= ix.min()
+            iy -= iy.min()
+            # One empty column of padding so that (+1,-1) never wraps onto a used cell
+            self.stride = int( iy.max() ) + 2
+        keys = ix * self.stride + iy
+        points = np.arange( keys.size )
+        span = np.ones( keys.size, dtype=np.int64 )
+        lowest = np.ones( keys.size, dtype=bool )
+
+        if lo is not None and keys.size > 0 :
+            lo = np.asarray( lo, dtype=np.int64 )
+            span = np.asarray( hi, dtype=np.int64 ) - lo + 1
+            points = np.repeat( points, span )
+            band = np.arange( points.size ) - np.repeat( np.cumsum( span ) - span, span )
+            lowest = band == 0
+            # Bands are blocks of whole columns; the padding column keeps
+            # the neighbours of a cell inside its band
+            band += lo[points] - lo.min()
+            keys = band * ( ( int( ix.max() ) + 2 ) * self.stride ) + keys[points]
+
+        self.order = np.argsort( keys, kind='stable' )
+        self.keys = keys[self.order]
+        self.points = points[self.order]
+        self.lowest = lowest[self.order]
+        self.unsorted = keys
+        self.starts = np.concatenate( ( [ 0 ], np.cumsum( span ) ) )
+
+
+    # candidate_pairs: Index pairs (i,j), i < j, of points in the same or in
+    # adjacent cells, sorted by i then j.
+    #
+    # OUTPUTS: i,j
+    #
+    def candidate_pairs( self ) :
+        n = self.keys.size
+        if n == 0 :
+            return np.zeros( 0, dtype=np.int64 ), np.zeros( 0, dtype=np.int64 )
+        position = np.arange( n )
+        firsts = []
+        seconds = []
+
+        # Occupied cells: first entry and number of entries. Neighbours are
+        # looked up once per cell rather than once per entry.
+        starts = np.flatnonzero( np.concatenate( ( [ True ], self.keys[1:] != self.keys[:-1] ) ) )
+        sizes = np.diff( np.append( starts, n ) )
+        cells = self.keys[starts]
+        cell = np.repeat( np.arange( cells.size ), sizes )
+
+        for dx, dy in NEIGHBOURS :
+            if dx == 0 and dy == 0 :
+                # same cell: only the points that follow
+                lo = position + 1
+                hi = ( starts + sizes )[cell]
+            else :
+                target = cells + dx * self.stride + dy
+                k = np.minimum( np.searchsorted( cells, target ), cells.size - 1 )
+                found = cells[k] == target
+                lo = np.where( found, starts[k], 0 )[cell]
+                hi = lo + np.where( found, sizes[k], 0 )[cell]
+            counts = np.maximum( hi - lo, 0 )
+            total = int( counts.sum() )
+            if total == 0 :
+                continue
+            first = np.repeat( position, counts )
+            start = np.repeat( lo - ( np.cumsum( counts ) - counts ), counts )
+            second = start + np.arange( total )
+            # Each pair once, in the lowest band common to both points
+            listed = self.lowest[first] | self.lowest[second]
+            firsts.append( self.points[first[listed]] )
+            seconds.append( self.points[second[listed]] )
+
+        if not firsts :
+            return np.zeros( 0, dtype=np.int64 ), np.zeros( 0, dtype=np.int64 )
+
+        a = np.concatenate( firsts )
+        b = np.concatenate( seconds )
+        i = np.minimum( a, b )
+        j = np.maximum( a, b )
+        order = np.argsort( i * ( int( j.max() ) + 1 ) + j )
+        return i[order], j[order]
+
+
+    # pairs_of: Index pairs (i,j), i < j, of points in the same or in adjacent
+    # cells where i or j is in rows, sorted by i then j.
+    #
+    # OUTPUTS: i,j
+    #
+    def pairs_of( self, rows ) :
+        rows = np.unique( np.asarray( rows, dtype=np.int64 ) )
+        # Entries of the rows, in every band of their ranges
+        span = self.starts[rows + 1] - self.starts[rows]
+        owners = np.repeat( rows, span )
+        entries = np.repeat( self.starts[rows], span ) + np.arange( owners.size ) - np.repeat( np.cumsum( span ) - span, span )
+        keys = self.unsorted[entries]
+        lowest = entries == self.starts[owners]
+        firsts = []
+        seconds = []
+
+        for dx in ( -1, 0, 1 ) :
+            for dy in ( -1, 0, 1 ) :
+                target = keys + dx * self.stride + dy
+                lo = np.searchsorted( self.keys, target, side='left' )
+                hi = np.searchsorted( self.keys, target, side='right' )
+                counts = hi - lo
+                total = int( counts.sum() )
+                if total == 0 :
+                    continue
+                found = np.repeat( lo - ( np.cumsum( counts ) - counts ), counts ) + np.arange( total )
+                listed = np.repeat( lowest, counts ) | self.lowest[found]
+                firsts.append( np.repeat( owners, counts )[listed] )
+                seconds.append( self.points[found[listed]] )
+
+        if not firsts :
+            return np.zeros( 0, dtype=np.int64 ), np.zeros( 0, dtype=np.int64 )
+
+        a = np.concatenate( firsts )
+        b = np.concatenate( seconds )
+        keep = a != b
+        i = np.minimum( a[keep], b[keep] )
+        j = np.maximum( a[keep], b[keep] )
+        # Pairs of two points of rows are found twice
+        pairs = np.unique( np.stack( ( i, j ), axis=1 ), axis=0 )
+        return pairs[:, 0], pairs[:, 1]
+
+
+
+class AltitudeBands :
+
+
+    def __init__( self, h, t, width=None ) :
+        self.h = h
+        self.t = t
+        # Band height, H when None
+        self.width = width
+        # Band range of each aircraft, by row
+        self.lo = np.zeros( 0, dtype=np.int64 )
+        self.hi = np.zeros( 0, dtype=np.int64 )
+
+
+    def set_HT( self, h, t ) :
+        self.h = h
+        self.t = t
+
+
+    def get_width( self ) :
+        return self.h if self.width is None else self.width
+
+
+    def set_width( self, width ) :
+        self.width = width
+
+
+    # ranges: Band ranges of aircraft at altitudes z [d] with vertical
+    # speeds vz [d/t]. The small relative margin covers rounding.
+    #
+    # OUTPUTS: lo,hi
+    #
+    def ranges( self, z, vz ) :
+        z = np.asarray( z, dtype=float )
+        end = z + np.asarray( vz, dtype=float ) * self.t
+        half = self.h * ( 1 + 1e-9 ) / 2
+        width = self.get_width()
+        lo = np.floor( ( np.minimum( z, end ) - half ) / width ).astype( np.int64 )
+        hi = np.floor( ( np.maximum( z, end ) + half ) / width ).astype( np.int64 )
+        return lo, hi
+
+
+    # build: Band ranges of all the aircraft
+    def build( self, z, vz ) :
+        self.lo, self.hi = self.ranges( z, vz )
+
+
+    # update: New band ranges of the aircraft in rows, at altitudes z and
+    # with vertical speeds vz (one element per row). Ranges of the other
+    # rows are kept.
+    #
+    # OUTPUTS: rows whose range changed
+    #
+    def update( self, rows, z, vz ) :
+        rows = np.asarray( rows, dtype=np.int64 )
+        if rows.size == 0 :
+            return rows
+        n = int( rows.max() ) + 1
+        if n > self.lo.size :
+            capacity = max( n, 2 * self.lo.size )
+            for name in ( 'lo', 'hi' ) :
+                old = getattr( self, name )
+                new = np.zeros( capacity, dtype=np.int64 )
+                new[:old.size] = old
+                setattr( self, name, new )
+        lo, hi = self.ranges( z, vz )
+        changed = ( self.lo[rows] != lo ) | ( self.hi[rows] != hi )
+        self.lo[rows] = lo
+        self.hi[rows] = hi
+        return rows[changed]
+
+
+    # move: Range of row src copied to row dst
+    def move( self, src, dst ) :
+        self.lo[dst] = self.lo[src]
+        self.hi[dst] = self.hi[src]
@@ -0,0 +1,218 @@
+#
+# Intent.py
+#
+# Conflict detection on piecewise-linear 4D trajectories.
+#
+# A Trajectory is a sequence of waypoints (t,x,y,z); the aircraft flies in
+# straight line at constant velocity between consecutive waypoints and its
+# position is not defined before the first waypoint or after the last one.
+#
+# For a pair of trajectories, the lookahead window [t0,t0+T], cut to the
+# times where both are defined, is split at the waypoint times of both
+# aircraft. On each piece the relative motion is linear, so cd3d_batch
+# gives the conflict interval of every piece of every pair in one call.
+# The intervals, clipped to their piece, are merged across consecutive
+# pieces into the conflict intervals of the pair; the duration filter
+# applies to the merged intervals.
+#
+# Unit and naming conventions are the same as in CD3D.py: positions [d],
+# times [t], speeds [d/t], X points to East, Y points to North. Geodesic
+# waypoints can be converted with Projection.TangentPlane.
+#
+# BASIC USAGE:
+#   own = Trajectory(t,x,y,z)
+#   cd = CD3DIntent(D,H,T)
+#   if cd.cd3d(own,intruder,t0) :
+#     cd.time2los, cd.duration, cd.intervals
+#
+# Functions
+# ---------
+# - pieces      : Linear pieces of the relative motion of pairs of trajectories
+# - cd3d_intent : Conflict detection for many pairs of trajectories
+#
+
+import numpy as np
+from .CD3DBatch import cd3d_batch
+from .CD3D import CD3D
+
+
+__all__ = [ 'Trajectory', 'pieces', 'cd3d_intent', 'CD3DIntent' ]
+
+
+
+class Trajectory :
+
+
+    def __init__( self, t, x, y, z ) :
+        self.t, self.x, self.y, self.z = [ np.asarray( a, dtype=float ).ravel() for a in ( t, x, y, z ) ]
+        if self.t.size < 2 or not np.all( np.diff( self.t ) > 0 ) :
+            raise ValueError( "a trajectory needs at least 2 waypoints with increasing times" )
+        if not self.t.size == self.x.size == self.y.size == self.z.size :
+            raise ValueError( "waypoint coordinates must have the same length" )
+        dt = np.diff( self.t )
+        self.vx = np.diff( self.x ) / dt
+        self.vy = np.diff( self.y ) / dt
+        self.vz = np.diff( self.z ) / dt
+
+
+    def size( self ) :
+        return self.t.size
+
+
+    # Times of the first and last waypoints [t]
+    def span( self ) :
+        return self.t[0], self.t[-1]
+
+
+    # Segment flown at times t (times outside the span use the first or last)
+    def segment( self, t ) :
+        return np.clip( np.searchsorted( self.t, t, side='right' ) - 1, 0, self.t.size - 2 )
+
+
+    # state: Position and velocity at times t
+    #
+    # OUTPUTS: x,y,z,vx,vy,vz
+    #
+    def state( self, t ) :
+        k = self.segment( t )
+        dt = t - self.t[k]
+        return ( self.x[k] + self.vx[k] * dt, self.y[k] + self.vy[k] * dt, self.z[k] + self.vz[k] * dt,
+                 self.vx[k], self.vy[k], self.vz[k] )
+
+
+
+# pieces: Linear pieces of the relative motion of the pairs (owns[k],
+# intruders[k]) over [t0,t0+T]. The pieces of all pairs are built at once,
+# from the waypoints of all trajectories in one array.
+#
+# OUTPUTS: pair,start,stop (piece k of pair[k] covers [start[k],stop[k]]),
+#          sx,sy,sz,vx,vy,vz (relative state of the ownship at start)
+#
+def pieces( owns, intruders, t0, T ) :
+    n = len( owns )
+    own = Waypoints( owns )
+    intruder = Waypoints( intruders )
+    lo = np.maximum( np.maximum( own.first, intruder.first ), t0 )
+    hi = np.minimum( np.minimum( own.last, intruder.last ), t0 + T )
+
+    # Piece bounds: lo, hi and the waypoints in between, sorted by pair then time
+    times = np.concatenate( ( lo, hi, own.t, intruder.t ) )
+    pair = np.concatenate( ( np.arange( n ), np.arange( n ), own.pair, intruder.pair ) )
+    inside = ( lo[pair] < hi[pair] ) & ( times >= lo[pair] ) & ( times <= hi[pair] )
+    times, pair = times[inside], pair[inside]
+    order = np.lexsort( ( times, pair ) )
+    times, pair = times[order], pair[order]
+    distinct = np.ones( times.size, dtype=bool )
+    distinct[1:] = ( pair[1:] != pair[:-1] ) | ( times[1:] != times[:-1] )
+    times, pair = times[distinct], pair[distinct]
+    piece = np.flatnonzero( pair[1:] == pair[:-1] )
+    pair, start, stop = pair[piece], times[piece], times[piece + 1]
+
+    o = own.state( pair, start )
+    i = intruder.state( pair, start )
+    return ( pair, start, stop ) + tuple( a - b for a, b in zip( o, i ) )
+
+
+
+# Waypoints of a list of trajectories, concatenated
+class Waypoints :
+
+
+    def __init__( self, trajectories ) :
+        sizes = np.array( [ w.t.size for w in trajectories ], dtype=np.int64 )
+        self.offset = np.concatenate( ( [ 0 ], np.cumsum( sizes ) ) )
+        self.sizes = sizes
+        self.pair = np.repeat( np.arange( sizes.size ), sizes )
+        columns = lambda name : np.concatenate( [ getattr( w, name ) for w in trajectories ] ) if sizes.size else np.zeros( 0 )
+        self.t, self.x, self.y, self.z = [ columns( name ) for name in ( 't', 'x', 'y', 'z' ) ]
+        # One segment less than waypoints per trajectory: segment w - pair
+        # starts at waypoint w
+        self.vx, self.vy, self.vz = [ columns( name ) for name in ( 'vx', 'vy', 'vz' ) ]
+        self.first = self.t[self.offset[:-1]] if sizes.size else np.zeros( 0 )
+        self.last = self.t[self.offset[1:] - 1] if sizes.size else np.zeros( 0 )
+
+
+    # state: Positions and velocities of the trajectories pair at the times
+    # t, sorted by pair then time
+    #
+    # OUTPUTS: x,y,z,vx,vy,vz
+    #
+    def state( self, pair, t ) :
+        # Number of waypoints at or before each time, by a merge of the
+        # waypoints with the times (waypoints first on ties)
+        order = np.lexsort( ( np.concatenate( ( np.zeros( self.t.size ), np.ones( t.size ) ) ),
+                              np.concatenate( ( self.t, t ) ), np.concatenate( ( self.pair, pair ) ) ) )
+        position = np.empty( order.size, dtype=np.int64 )
+        position[order] = np.arange( order.size )
+        count = position[self.t.size:] - np.arange( t.size )
+        w = np.clip( count - 1, self.offset[pair], self.offset[pair] + self.sizes[pair] - 2 )
+        k = w - pair
+        dt = t - self.t[w]
+        return ( self.x[w] + self.vx[k] * dt, self.y[w] + self.vy[k] * dt, self.z[w] + self.vz[k] * dt,
+                 self.vx[k], self.vy[k], self.vz[k] )
+
+
+# cd3d_intent: Conflict detection for the pairs of trajectories (owns[k],
+# intruders[k]) from time t0 to t0+T. A conflict interval longer than filter
+# is a conflict.
+#
+# OUTPUTS: conflict,time2los,duration (per pair: first loss of separation
+#          after t0 and total time in conflict),
+#          intervals (pair,t_in,t_out of every conflict interval, relative
+#          to t0, sorted by pair then time)
+#
+def cd3d_intent( D, H, T, filter, owns, intruders, t0 ) :
+    n = len( owns )
+    pair, start, stop, sx, sy, sz, vx, vy, vz = pieces( owns, intruders, t0, T )
+    length = stop - start
+    conflict, t_in, t_out, time2los, _, _, _ = cd3d_batch( D, H, length, -np.inf, sx, sy, sz, vx, vy, vz )
+
+    # Conflict interval of each piece, clipped to the piece. Ends at a piece
+    # boundary are the boundary itself, so that consecutive intervals meet.
+    k = np.flatnonzero( conflict )
+    pair = pair[k]
+    a = np.where( time2los[k] > 0, start[k] + time2los[k], start[k] )
+    b = np.where( t_out[k] < length[k], start[k] + t_out[k], stop[k] )
+
+    first = np.ones( k.size, dtype=bool )
+    first[1:] = ( pair[1:] != pair[:-1] ) | ( a[1:] != b[:-1] )
+    starts = np.flatnonzero( first )
+    ends = np.append( starts[1:], k.size )[:starts.size] - 1
+    pair, a, b = pair[starts], a[starts], b[ends]
+    keep = b - a > filter
+    pair, a, b = pair[keep], a[keep] - t0, b[keep] - t0
+
+    conflict = np.zeros( n, dtype=bool )
+    conflict[pair] = True
+    time2los = np.zeros( n )
+    # First interval of each pair: the intervals of a pair are in time order
+    first = np.unique( pair, return_index=True )[1]
+    time2los[pair[first]] = a[first]
+    duration = np.bincount( pair, weights=b - a, minlength=n )
+    return conflict, time2los, duration, ( pair, a, b )
+
+
+
+class CD3DIntent( CD3D ) :
+
+
+    def __init__( self, d, h, t ) :
+        CD3D.__init__( self, d, h, t )
+        self.intervals = np.zeros( ( 0, 2 ) )
+
+
+    # cd3d: Conflict detection between the trajectories own and intruder
+    # from time t0. t_in, t_out are the first conflict interval, intervals
+    # all of them (relative to t0) and duration their total length.
+    #
+    # OUTPUTS: conflict
+    #
+    def cd3d( self, own, intruder, t0 ) :
+        conflict, time2los, duration, ( _, a, b ) = cd3d_intent( self.D, self.H, self.T, self.filter,
+                                                                  [ own ], [ intruder ], t0 )
+        self.conflict = bool( conflict[0] )
+        self.time2los = float( time2los[0] )
+        self.duration = float( duration[0] )
+        self.intervals = np.column_stack( ( a, b ) )
+        self.t_in, self.t_out = ( float( a[0] ), float( b[0] ) ) if a.size else ( 0, 0 )
+        return self.conflict
@@ -35,6 +35,12 @@
 # - kb3d_vertical   : Coordinated vertical maneuver (vertical speed)
 # - kb3d_horizontal : Coordinated horizontal maneuvers (ground speed, track)
 #
+# The module functions after the support functions are the solvers, with
+# the configuration (D, H, T) as first arguments. They return their results
+# as tuples and never touch any state, so they can be called concurrently
+# with a single configuration. The methods of class KB3D call them and
+# store the results in the object.
+#
 # Output class variables
 # ----------------------
 # trk: Track [rad]
@@ -44,9 +50,19 @@
 # The below Python implementation was done by Phu Tran @ ATMRI. Comments are from original C++ code.
 #
 
-from Constants import *
-from Util import *
-from CD3D import *
+from .Constants import NaR, TAU_MIN
+from .Util import atan2_safe, discr, root, sign, sq, sqrt, sqrt_safe
+from .CD3D import cd3d, violation
+from .Screen import KEPT, screen
+
+
+__all__ = [ 'tau', 'tau_pos', 'eps_line', 'break_symm', 'contact_time',
+            'precondition_time2los', 'precondition', 'vertical_coordination', 'horizontal_coordination',
+            'delta', 'theta', 'vertical_theta1', 'vertical_theta2', 'vertical',
+            'ground_speed_k', 'ground_speed', 'track_vx_vy', 'track', 'alpha',
+            'beta', 'Q', 'optimal_vx_vy', 'optimal', 'horizontal',
+            'coordinated_vertical', 'kb3d_vertical', 'kb3d_horizontal', 'kb3d',
+            'KB3D' ]
 
 
 
@@ -86,6 +102,271 @@ def contact_time( sx, sy, qx, qy, vx, vy ) :
 
 
 
+# Solvers
+
+# precondition_time2los: General Precondition for KB3D (see
+# KB3D.precondition) and, when it holds, the time to loss of separation of
+# the predicted conflict, from the same cd3d call (0 otherwise). Pairs
+# rejected by the screening bounds (see Screen.py) cannot be in conflict:
+# cd3d is skipped.
+#
+# OUTPUTS: holds,time2los
+#
+def precondition_time2los( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    if violation( D, H, sx, sy, sz ) or sq(vox) + sq(voy) <= 0 or sq(vix) + sq(viy) <= 0 or \
+       screen( D, H, T, sx, sy, sz, vox - vix, voy - viy, voz - viz ) != KEPT :
+        return False, 0
+    conflict, _, _, time2los = cd3d( D, H, T, 0, sx, sy, sz, vox - vix, voy - viy, voz - viz )[:4]
+    return conflict, time2los if conflict else 0
+
+
+def precondition( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    return precondition_time2los( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz )[0]
+
+
+# Coordination strategies
+
+def vertical_coordination( sx, sy, sz, pz ) :
+    epsilon = 1        
+    if pz == 0 and sz == 0 :
+        epsilon = break_symm( sx, sy, sz )
+    elif pz == 0 : 
+        epsilon = sign(sz)
+    else :
+        epsilon = sign(pz)
+    return epsilon
+
+
+def horizontal_coordination( sx, sy, vx, vy) :
+    return sign( sy*vx - sx*vy )
+
+
+def delta( D, sx, sy, vx, vy ) :
+    return sq(D) * ( sq(vx) + sq(vy) ) - sq( sx*vy - sy*vx )
+
+
+def theta( D, sx, sy, vx, vy, eps ) :
+    v = sq(vx) + sq(vy)
+    if v == 0 :
+        return 0 # THIS CASE SHOULD NEVER HAPPEN
+    d = delta( D, sx, sy, vx, vy )
+    return ( -sx*vx - sy*vy + eps*sqrt(d) ) / v    
+
+
+def vertical_theta1( D, H, sx, sy, sz, vx, vy, viz, eps ) :
+    t = theta( D, sx, sy, vx, vy, -1 )
+    if t == 0 :
+        return NaR # THIS CASE SHOULD NEVER HAPPEN
+    return viz + ( eps * H - sz ) / t
+
+
+def vertical_theta2( D, H, sx, sy, sz, vx, vy, viz ) : 
+    t = theta( D, sx, sy, vx, vy, 1 )
+    if t == 0 :
+        return NaR # THIS CASE SHOULD NEVER HAPPEN
+    return viz + ( sign(sz) * H - sz ) / t
+
+
+# vertical: Independent vertical speed only maneuver (see KB3D.vertical)
+#
+# OUTPUTS: vs
+#
+def vertical( D, H, sx, sy, sz, vox, voy, voz, vix, viy, viz, epsilon ) :
+    vx = vox - vix
+    vy = voy - viy
+    if sq(vx) + sq(vy) == 0 :
+        return viz
+    elif epsilon*sz < H and sq(sx) + sq(sy) > sq(D) :
+        return vertical_theta1( D, H, sx, sy, sz, vx, vy, viz, epsilon )        
+    elif epsilon*sz >= H : 
+        return vertical_theta2( D, H, sx, sy, sz, vx, vy, viz )        
+    return NaR
+
+
+def ground_speed_k( D, sx, sy, vox, voy, vix, viy, epsilon ) :    
+    k = 0
+    a = sq(D) * ( sq(vox) + sq(voy) ) - sq(sx*voy - sy*vox)
+    b = 2*( (sx*voy - sy*vox) * (sx*viy - sy*vix) - sq(D) * (vox*vix + voy*viy) )
+    c = sq(D) * ( sq(vix) + sq(viy) ) - sq(sx*viy - sy*vix)
+    if a == 0  and ( c*b >= 0 or not tau_pos( sx, sy, -c/b*vox - vix, -c/b*voy - viy ) ) : 
+        k = 0
+    elif a == 0 :
+        k = -c/b
+    elif discr(a,b,c) >= 0 :
+        k = root( a, b, c, epsilon ) 
+        if k <= 0 or not tau_pos( sx, sy, k*vox - vix, k*voy - viy ) :
+            k = 0        
+    return k
+
+
+# ground_speed: Independent ground speed only maneuver (see KB3D.ground_speed)
+#
+# OUTPUTS: gs,kvx,kvy
+#
+def ground_speed( D, sx, sy, vox, voy, vix, viy, epsilon ) :
+    for e in ( epsilon, -epsilon ) :
+        k = ground_speed_k( D, sx, sy, vox, voy, vix, viy, e )
+        if k > 0 and eps_line( sx, sy, k*vox - vix, k*voy - viy ) == epsilon :
+            kvx = k*vox
+            kvy = k*voy
+            if kvx != 0 or kvy != 0 :
+                return sqrt( sq(kvx) + sq(kvy) ), kvx, kvy
+            return NaR, kvx, kvy
+    return NaR, 0, 0
+
+
+# track_vx_vy: Velocity of the independent track only maneuver, (0,0) if
+# there is none
+#
+# OUTPUTS: vx,vy
+#
+def track_vx_vy( D, sx, sy, vox, voy, vix, viy, epsilon ) :
+    s2   = sq(sx) + sq(sy)
+    v2   = sq(vox) + sq(voy)
+    R    = D / sqrt( s2 - sq(D) )
+    sxy  = sx - epsilon*R*sy
+    syx  = sy + epsilon*R*sx
+    viyx = viy*sxy - vix*syx
+    a    = sq(s2) / ( s2 - sq(D) )
+    b    = 2*syx*viyx
+    c    = sq(viyx) - sq(sxy)*v2
+    if sxy == 0 and ( syx == 0 or v2 < sq(vix) ) :
+        return 0, 0
+    if sxy == 0 :
+        vy = sign(voy) * sqrt( v2 - sq(vix) )
+        if tau_pos( sx, sy , 0, vy-viy ) :
+            return vix, vy
+        elif tau_pos( sx, sy, 0, -vy-viy ) :
+            return vix, -vy
+        return 0, 0
+    elif discr(a,b,c) >= 0 :
+        vx1 = root( a, b, c, 1 )
+        vy1 = ( viyx + syx*vx1 ) / sxy
+        vx2 = root(a,b,c,-1)
+        vy2 = (viyx + syx*vx2) / sxy
+        tp1 = tau_pos( sx, sy, vx1-vix, vy1-viy )
+        tp2 = tau_pos( sx, sy, vx2-vix, vy2-viy )
+        if tp1 and ( not tp2 or vx1*vox+vy1*voy > vx2*vox+vy2*voy ) :
+            return vx1, vy1
+        elif tp2 :
+            return vx2, vy2
+    return 0, 0
+
+
+# track: Independent track only maneuver (see KB3D.track)
+#
+# OUTPUTS: trk,vx,vy
+#
+def track( D, sx, sy, vox, voy, vix, viy, epsilon ) :
+    vx, vy = track_vx_vy( D, sx, sy, vox, voy, vix, viy, epsilon )
+    if vx != 0 or vy != 0 :
+        return atan2_safe( vx, vy ), vx, vy
+    return NaR, vx, vy
+
+
+def alpha( D, sx, sy) :
+    if sx != 0 or sy != 0 :
+        return sq(D) / ( sq(sx) + sq(sy) )
+    return 0
+
+
+def beta( D, sx, sy ) :
+    if sx != 0 or sy != 0 :
+        return D * sqrt_safe( sq(sx) + sq(sy) - sq(D) ) / ( sq(sx) + sq(sy) )
+    return 0
+
+
+def Q( D, sx, sy, epsilon ) :
+    return alpha( D, sx, sy )*sx + epsilon*beta( D, sx, sy )*sy
+
+
+# optimal_vx_vy: Velocity of the optimal maneuver for epsilon, (0,0) if
+# there is none
+#
+# OUTPUTS: ovx,ovy
+#
+def optimal_vx_vy( D, sx, sy, vox, voy, vix, viy, epsilon ) :
+    vx  = vox-vix    
+    vy  = voy-viy
+    qpx = Q( D, sx, sy, epsilon )
+    qpy = Q( D, sy, sx, -epsilon )
+    tpq = contact_time( sx, sy, qpx, qpy, vx, vy )
+    if tpq > 0 :
+        return (qpx-sx) / tpq + vix, (qpy-sy) / tpq + viy
+    elif tpq == 0 :
+        return -sy*(sx*vy-vx*sy) + vix, sx*(sx*vy-vx*sy) + viy
+    return 0, 0
+
+
+# optimal: Independent optimal track and ground speed only maneuver (see
+# KB3D.optimal)
+#
+# OUTPUTS: opt_trk,opt_gs,ovx,ovy
+#
+def optimal( D, sx, sy, vox, voy, vix, viy, epsilon) :
+    for e in ( epsilon, -epsilon ) :
+        ovx, ovy = optimal_vx_vy( D, sx, sy, vox, voy, vix, viy, e )
+        if ( ovx != 0 or ovy != 0 ) and eps_line( sx, sy, ovx-vix, ovy-viy ) == epsilon :
+            return atan2_safe( ovx, ovy ), sqrt( sq(ovx) + sq(ovy) ), ovx, ovy
+    return NaR, NaR, 0, 0
+
+
+# horizontal: Horizontal maneuvers of a pair meeting the precondition
+#
+# OUTPUTS: trk,gs,opt_trk,opt_gs
+#
+def horizontal( D, sx, sy, vox, voy, vix, viy ) :
+    if sq(sx)+sq(sy) <= sq(D) :
+        return NaR, NaR, NaR, NaR
+    epsilon = horizontal_coordination( sx, sy, vox-vix, voy-viy )
+    gs  = ground_speed( D, sx, sy, vox, voy, vix, viy, epsilon )[0]
+    trk = track( D, sx, sy, vox, voy, vix, viy, epsilon )[0]
+    opt_trk, opt_gs = optimal( D, sx, sy, vox, voy, vix, viy, epsilon )[:2]
+    return trk, gs, opt_trk, opt_gs
+
+
+# Vertical speed of a pair meeting the precondition, with time2los from
+# precondition_time2los
+def coordinated_vertical( D, H, time2los, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    pz = sz + time2los*(voz-viz)
+    return vertical( D, H, sx, sy, sz, vox, voy, voz, vix, viy, viz, vertical_coordination( sx, sy, sz, pz ) )
+
+
+# kb3d_vertical: Coordinated vertical maneuver (see KB3D.kb3d_vertical)
+#
+# OUTPUTS: vs
+#
+def kb3d_vertical( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    holds, time2los = precondition_time2los( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+    if not holds :
+        return NaR
+    return coordinated_vertical( D, H, time2los, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+
+
+# kb3d_horizontal: Coordinated horizontal maneuvers (see KB3D.kb3d_horizontal)
+#
+# OUTPUTS: trk,gs,opt_trk,opt_gs
+#
+def kb3d_horizontal( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    if not precondition( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+        return NaR, NaR, NaR, NaR
+    return horizontal( D, sx, sy, vox, voy, vix, viy )
+
+
+# kb3d: Coordinated horizontal and vertical maneuvers (see KB3D.kb3d). The
+# precondition, and its cd3d call, is evaluated once.
+#
+# OUTPUTS: trk,gs,opt_trk,opt_gs,vs
+#
+def kb3d( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+    holds, time2los = precondition_time2los( D, H, T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+    if not holds :
+        return NaR, NaR, NaR, NaR, NaR
+    vs = coordinated_vertical( D, H, time2los, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+    return horizontal( D, sx, sy, vox, voy, vix, viy ) + ( vs, )
+
+
+
 class KB3D :
 
 
@@ -93,7 +374,7 @@ class KB3D :
         self.D = d
         self.H = h
         self.T = t
-        self.cd3d = CD3D( self.D, self.H, self.T )
+        self.time2los = 0
         self.vs = NaR
         self.gs = NaR
         self.trk = NaR
@@ -107,12 +388,12 @@ class KB3D :
         self.ovy = 0
 
 
+    # clear_KB3D: Kept for compatibility; the solvers hold no CD3D object
     def clear_KB3D( self ) :
-        del self.cd3d
+        pass
 
 
     def set_D( self, d ) :
-        self.cd3d.set_D( d )
         self.D = d
 
 
@@ -121,7 +402,6 @@ class KB3D :
 
     
     def set_H( self, h ) :
-        self.cd3d.set_H( h )
         self.H = h
 
 
@@ -130,7 +410,6 @@ class KB3D :
 
 
     def set_T( self, t ) :
-        self.cd3d.set_T( t )
         self.T = t
 
 
@@ -145,58 +424,39 @@ class KB3D :
     # - Aircraft are not in violation
     # - Aircraft have a positive ground speed
     #
+    # When it holds, time2los is the time to loss of separation of the
+    # predicted conflict (0 otherwise).
     #
 
     def precondition( self, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
-
-        cond1 = not self.cd3d.violation( sx, sy, sz )
-        cond2 = self.cd3d.cd3d( sx, sy, sz, vox - vix, voy - viy, voz - viz )
-        cond3 = sq(vox) + sq(voy) > 0
-        cond4 = sq(vix) + sq(viy) > 0
-        return cond1 and cond2 and cond3 and cond4
+        holds, self.time2los = precondition_time2los( self.D, self.H, self.T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
+        return holds
 
 
     # Coordination strategies
     
     def vertical_coordination( self, sx, sy, sz, pz ) :
-        epsilon = 1        
-        if pz == 0 and sz == 0 :
-            epsilon = break_symm( sx, sy, sz )
-        elif pz == 0 : 
-            epsilon = sign(sz)
-        else :
-            epsilon = sign(pz)
-        return epsilon
+        return vertical_coordination( sx, sy, sz, pz )
 
 
     def horizontal_coordination( self, sx, sy, vx, vy) :
-        return sign( sy*vx - sx*vy )
+        return horizontal_coordination( sx, sy, vx, vy )
   
 
     def delta( self, sx, sy, vx, vy ) :
-        return sq(self.D) * ( sq(vx) + sq(vy) ) - sq( sx*vy - sy*vx )
+        return delta( self.D, sx, sy, vx, vy )
     
 
     def theta( self, sx, sy, vx, vy, eps ) :
-        v = sq(vx) + sq(vy)
-        if v == 0 :
-            return 0 # THIS CASE SHOULD NEVER HAPPEN
-        d = self.delta( sx, sy, vx, vy )
-        return ( -sx*vx - sy*vy + eps*sqrt(d) ) / v    
+        return theta( self.D, sx, sy, vx, vy, eps )
 
 
     def vertical_theta1( self, sx, sy, sz, vx, vy, viz, eps ) :
-        t = self.theta( sx, sy, vx, vy, -1 )
-        if t == 0 :
-            return NaR # THIS CASE SHOULD NEVER HAPPEN
-        return viz + ( eps * self.H - sz ) / t
+        return vertical_theta1( self.D, self.H, sx, sy, sz, vx, vy, viz, eps )
     
 
     def vertical_theta2( self, sx, sy, sz, vx, vy, viz ) : 
-        t = self.theta( sx, sy, vx, vy, 1 )
-        if t == 0 :
-            return NaR # THIS CASE SHOULD NEVER HAPPEN
-        return viz + ( sign(sz) * self.H - sz ) / t
+        return vertical_theta2( self.D, self.H, sx, sy, sz, vx, vy, viz )
     
     '''
     # vertical: Independent vertical speed only maneuver
@@ -208,32 +468,14 @@ class KB3D :
     '''
 
     def vertical( self, sx, sy, sz, vox, voy, voz, vix, viy, viz, epsilon ) :
-        self.vs = NaR
         self.vx = vox - vix
         self.vy = voy - viy
-        if sq(self.vx) + sq(self.vy) == 0 :
-            self.vs = viz
-        elif epsilon*sz < self.H and sq(sx) + sq(sy) > sq(self.D) :
-            self.vs = self.vertical_theta1( sx, sy, sz, self.vx, self.vy, viz, epsilon )        
-        elif epsilon*sz >= self.H : 
-            self.vs =  self.vertical_theta2( sx, sy, sz, self.vx, self.vy, viz )        
+        self.vs = vertical( self.D, self.H, sx, sy, sz, vox, voy, voz, vix, viy, viz, epsilon )
         return self.vs
     
 
     def ground_speed_k( self, sx, sy, vox, voy, vix, viy, epsilon ) :    
-        k = 0
-        a = sq(self.D) * ( sq(vox) + sq(voy) ) - sq(sx*voy - sy*vox)
-        b = 2*( (sx*voy - sy*vox) * (sx*viy - sy*vix) - sq(self.D) * (vox*vix + voy*viy) )
-        c = sq(self.D) * ( sq(vix) + sq(viy) ) - sq(sx*viy - sy*vix)
-        if a == 0  and ( c*b >= 0 or not tau_pos( sx, sy, -c/b*vox - vix, -c/b*voy - viy ) ) : 
-            k = 0
-        elif a == 0 :
-            k = -c/b
-        elif discr(a,b,c) >= 0 :
-            k = root( a, b, c, epsilon ) 
-            if k <= 0 or not tau_pos( sx, sy, k*vox - vix, k*voy - viy ) :
-                k = 0        
-        return k
+        return ground_speed_k( self.D, sx, sy, vox, voy, vix, viy, epsilon )
 
     
     '''
@@ -251,61 +493,12 @@ class KB3D :
     '''
 
     def ground_speed( self, sx, sy, vox, voy, vix, viy, epsilon ) :
-        k = self.ground_speed_k( sx, sy, vox, voy, vix, viy, epsilon )
-        self.kvx = 0 
-        self.kvy = 0
-        if k > 0 and eps_line( sx, sy, k*vox - vix, k*voy - viy ) == epsilon :
-            self.kvx = k*vox
-            self.kvy = k*voy
-        else :
-            k = self.ground_speed_k( sx, sy, vox, voy, vix, viy, -epsilon )
-            if k > 0 and eps_line( sx, sy, k*vox - vix, k*voy - viy ) == epsilon :
-                self.kvx = k*vox
-                self.kvy = k*voy                    
-        if self.kvx != 0 or self.kvy != 0 : 
-            return sqrt( sq(self.kvx) + sq(self.kvy) )
-        return NaR
+        gs, self.kvx, self.kvy = ground_speed( self.D, sx, sy, vox, voy, vix, viy, epsilon )
+        return gs
     
 
     def track_vx_vy( self, sx, sy, vox, voy, vix, viy, epsilon ) :
-        self.vx = 0 
-        self.vy = 0
-        s2   = sq(sx) + sq(sy)
-        v2   = sq(vox) + sq(voy)
-        R    = self.D / sqrt( s2 - sq(self.D) )
-        sxy  = sx - epsilon*R*sy
-        syx  = sy + epsilon*R*sx
-        viyx = viy*sxy - vix*syx
-        a    = sq(s2) / ( s2 - sq(self.D) )
-        b    = 2*syx*viyx
-        c    = sq(viyx) - sq(sxy)*v2
-        if sxy == 0 and ( syx == 0 or v2 < sq(vix) ) :
-            return
-        if sxy == 0 :
-            self.vy = sign(voy) * sqrt( v2 - sq(vix) )
-            if tau_pos( sx, sy , 0, self.vy-viy ) :
-                self.vx = vix
-                self.vy = self.vy
-            elif tau_pos( sx, sy, 0, -self.vy-viy ) :
-                self.vx = vix
-                self.vy = -self.vy             
-            else :
-                return
-        elif discr(a,b,c) >= 0 :
-            vx1 = root( a, b, c, 1 )
-            vy1 = ( viyx + syx*vx1 ) / sxy
-            vx2 = root(a,b,c,-1)
-            vy2 = (viyx + syx*vx2) / sxy
-            tp1 = tau_pos( sx, sy, vx1-vix, vy1-viy )
-            tp2 = tau_pos( sx, sy, vx2-vix, vy2-viy )
-            if tp1 and ( not tp2 or vx1*vox+vy1*voy > vx2*vox+vy2*voy ) :
-                self.vx = vx1
-                self.vy = vy1 
-            elif tp2 :
-                self.vx = vx2
-                self.vy = vy2 
-            else :
-                return
+        self.vx, self.vy = track_vx_vy( self.D, sx, sy, vox, voy, vix, viy, epsilon )
 
     '''
     /* track: Independent track only maneuver
@@ -322,22 +515,16 @@ class KB3D :
     '''
 
     def track( self, sx, sy, vox, voy, vix, viy, epsilon ) :
-        self.track_vx_vy( sx, sy, vox, voy, vix, viy, epsilon )
-        if self.vx != 0 or self.vy != 0 :
-            return atan2_safe( self.vx, self.vy )
-        return NaR
-        
+        trk, self.vx, self.vy = track( self.D, sx, sy, vox, voy, vix, viy, epsilon )
+        return trk
+
 
     def alpha( self, sx, sy) :
-        if sx != 0 or sy != 0 :
-            return sq(self.D) / ( sq(sx) + sq(sy) )
-        return 0
+        return alpha( self.D, sx, sy )
 
 
     def beta( self, sx, sy ) :
-        if sx != 0 or sy != 0 :
-            return self.D * sqrt_safe( sq(sx) + sq(sy) - sq(self.D) ) / ( sq(sx) + sq(sy) )
-        return 0
+        return beta( self.D, sx, sy )
 
 
     def Q( self, sx, sy, epsilon ) :
@@ -345,19 +532,7 @@ class KB3D :
     
 
     def optimal_vx_vy( self, sx, sy, vox, voy, vix, viy, epsilon ) :
-        self.ovx = 0 
-        self.ovy = 0
-        vx  = vox-vix    
-        vy  = voy-viy
-        qpx = self.Q( sx, sy, epsilon )
-        qpy = self.Q( sy, sx, -epsilon )
-        tpq = contact_time( sx, sy, qpx, qpy, vx, vy )
-        if tpq > 0 :
-            self.ovx = (qpx-sx) / tpq + vix
-            self.ovy = (qpy-sy) / tpq + viy
-        elif tpq == 0 :
-            self.ovx = -sy*(sx*vy-vx*sy) + vix
-            self.ovy =  sx*(sx*vy-vx*sy) + viy
+        self.ovx, self.ovy = optimal_vx_vy( self.D, sx, sy, vox, voy, vix, viy, epsilon )
     
     
     '''
@@ -376,20 +551,7 @@ class KB3D :
     '''
 
     def optimal( self, sx, sy, vox, voy, vix, viy, epsilon) :
-        self.opt_trk = NaR
-        self.opt_gs = NaR
-        self.optimal_vx_vy( sx, sy, vox, voy, vix, viy, epsilon )
-        if ( self.ovx != 0 or self.ovy != 0 ) and eps_line( sx, sy, self.ovx-vix, self.ovy-viy) == epsilon :
-            self.opt_trk = atan2_safe( self.ovx, self.ovy )
-            self.opt_gs  = sqrt( sq(self.ovx) + sq(self.ovy) )
-            return        
-        self.optimal_vx_vy( sx, sy, vox, voy, vix, viy, -epsilon)
-        if ( self.ovx != 0 or self.ovy != 0 ) and eps_line( sx, sy, self.ovx-vix, self.ovy-viy ) == epsilon :
-            self.opt_trk = atan2_safe( self.ovx, self.ovy )
-            self.opt_gs  = sqrt( sq(self.ovx) + sq(self.ovy) )
-            return        
-        self.ovx = 0 
-        self.ovy = 0
+        self.opt_trk, self.opt_gs, self.ovx, self.ovy = optimal( self.D, sx, sy, vox, voy, vix, viy, epsilon )
     
     '''
     /* kb3d_vertical: Coordinated vertical maneuver.
@@ -408,10 +570,7 @@ class KB3D :
     '''
 
     def kb3d_vertical( self, sx, sy, sz, vox, voy, voz, vix, viy, viz) :
-        self.vs = NaR
-        if self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
-            pz = sz + self.cd3d.time2los*(voz-viz)
-            self.vs = self.vertical( sx, sy, sz, vox, voy, voz, vix, viy, viz, self.vertical_coordination( sx, sy, sz, pz) )
+        self.vs = kb3d_vertical( self.D, self.H, self.T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
     
     
 
@@ -440,15 +599,7 @@ class KB3D :
 
 
     def kb3d_horizontal( self, sx, sy, sz, vox, voy, voz, vix, viy, viz) :
-        self.gs      = NaR 
-        self.trk     = NaR
-        self.opt_trk = NaR
-        self.opt_gs  = NaR    
-        if self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz ) and sq(sx)+sq(sy) > sq(self.D) :
-            epsilon = self.horizontal_coordination( sx, sy, vox-vix, voy-viy )
-            self.gs  = self.ground_speed( sx, sy, vox, voy, vix, viy, epsilon )
-            self.trk = self.track( sx, sy, vox, voy, vix, viy, epsilon )
-            self.optimal( sx, sy, vox, voy, vix, viy, epsilon )    
+        self.trk, self.gs, self.opt_trk, self.opt_gs = kb3d_horizontal( self.D, self.H, self.T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
 
 
     '''
@@ -478,5 +629,4 @@ class KB3D :
     '''
 
     def kb3d( self, sx, sy, sz, vox, voy, voz, vix, viy, viz) :
-        self.kb3d_vertical( sx, sy, sz, vox, voy, voz, vix, viy, viz )
-        self.kb3d_horizontal( sx, sy, sz, vox, voy, voz, vix, viy, viz )
\ No newline at end of file
+        self.trk, self.gs, self.opt_trk, self.opt_gs, self.vs = kb3d( self.D, self.H, self.T, sx, sy, sz, vox, voy, voz, vix, viy, viz )
@@ -0,0 +1,421 @@
+#
+# KB3DBatch.py
+#
+# Array version of KB3D. KB3DBatch.kb3d computes the coordinated
+# resolutions of many conflicting pairs in one call. Every branch of the
+# scalar solvers (symmetry breaking, tau_pos checks, the eps_line retry
+# with -epsilon, degenerate quadratics) is reproduced with masks, so each
+# element is what KB3D.kb3d returns for the same pair.
+#
+# Unit and naming conventions are the same as in KB3D.py. The state
+# inputs are NumPy arrays (or anything that broadcasts to a common shape);
+# D, H and T are scalars. The coordination epsilon is an array with one
+# element per pair.
+#
+# Output class variables
+# ----------------------
+# trk: Track [rad]
+# gs : Ground speed   [d/t]
+# vs : Vertical speed [d/t]
+# opt_trk, opt_gs : Optimal track [rad] and ground speed [d/t]
+#
+# Elements without a solution are NaR, as in KB3D.
+#
+# KB3DBatch.kb3d_pair also computes the coordinated resolutions of the
+# intruders, which are the resolutions of the pairs with ownship and
+# intruder swapped. Swapping negates the relative state, which leaves the
+# precondition, the horizontal coordination, the ground speed quadratic
+# (up to the order of its coefficients), the track geometry and the
+# optimal tangent points unchanged up to sign: they are computed once for
+# both aircraft. The intruder resolutions are in trk_i, gs_i, opt_trk_i,
+# opt_gs_i and vs_i.
+#
+
+import numpy as np
+from .Constants import NaR
+from .Util import atan2_safe_array, discr, root_array, sign_array, sq, sqrt_safe_array
+from .CD3DBatch import CD3DBatch
+from .KB3D import KB3D, tau_pos
+
+
+__all__ = [ 'eps_line_array', 'break_symm_array', 'contact_time_array', 'KB3DBatch' ]
+
+
+
+# Support functions
+
+# Epsilon of each element
+def eps_line_array( sx, sy, vx, vy ) :
+    return sign_array( sx*vx + sy*vy ) / sign_array( sx*vy - sy*vx )
+
+
+def break_symm_array( sx, sy, sz ) :
+    return np.where( ( sx < 0 ) | ( ( sx == 0 ) & ( sy < 0 ) ), 1.0, -1.0 )
+
+
+def contact_time_array( sx, sy, qx, qy, vx, vy ) :
+    d = vx*(qx-sx) + vy*(qy-sy)
+    with np.errstate( divide='ignore', invalid='ignore' ) :
+        t = ( sq(qx-sx) + sq(qy-sy) ) / d
+    return np.where( d != 0, t, np.where( ( qx == sx ) & ( qy == sy ), 0.0, -1.0 ) )
+
+
+
+class KB3DBatch( KB3D ) :
+
+
+    def __init__( self, d, h, t ) :
+        KB3D.__init__( self, d, h, t )
+        self.cd3d = CD3DBatch( self.D, self.H, self.T )
+
+
+    # General Precondition for KB3D, one element per pair
+    def precondition( self, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+        cond1 = ~self.cd3d.violation( sx, sy, sz )
+        cond2 = self.cd3d.cd3d( sx, sy, sz, vox - vix, voy - viy, voz - viz )
+        cond3 = sq(vox) + sq(voy) > 0
+        cond4 = sq(vix) + sq(viy) > 0
+        return cond1 & cond2 & cond3 & cond4
+
+
+    # Coordination strategies
+
+    def vertical_coordination( self, sx, sy, sz, pz ) :
+        return np.where( ( pz == 0 ) & ( sz == 0 ), break_symm_array( sx, sy, sz ),
+                         np.where( pz == 0, sign_array( sz ), sign_array( pz ) ) )
+
+
+    def horizontal_coordination( self, sx, sy, vx, vy ) :
+        return sign_array( sy*vx - sx*vy )
+
+
+    def theta( self, sx, sy, vx, vy, eps ) :
+        v = sq(vx) + sq(vy)
+        d = self.delta( sx, sy, vx, vy )
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            t = ( -sx*vx - sy*vy + eps*np.sqrt(d) ) / v
+        return np.where( v == 0, 0.0, t ) # v == 0 SHOULD NEVER HAPPEN
+
+
+    def vertical_theta1( self, sx, sy, sz, vx, vy, viz, eps ) :
+        t = self.theta( sx, sy, vx, vy, -1 )
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            vs = viz + ( eps * self.H - sz ) / t
+        return np.where( t == 0, NaR, vs ) # t == 0 SHOULD NEVER HAPPEN
+
+
+    def vertical_theta2( self, sx, sy, sz, vx, vy, viz ) :
+        t = self.theta( sx, sy, vx, vy, 1 )
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            vs = viz + ( sign_array(sz) * self.H - sz ) / t
+        return np.where( t == 0, NaR, vs ) # t == 0 SHOULD NEVER HAPPEN
+
+
+    # vertical: Independent vertical speed only maneuver, one element per pair
+    #
+    # OUTPUTS: vs
+    #
+    def vertical( self, sx, sy, sz, vox, voy, voz, vix, viy, viz, epsilon ) :
+        self.vx = vox - vix
+        self.vy = voy - viy
+        still  = sq(self.vx) + sq(self.vy) == 0
+        below  = ~still & ( epsilon*sz < self.H ) & ( sq(sx) + sq(sy) > sq(self.D) )
+        above  = ~still & ~below & ( epsilon*sz >= self.H )
+        self.vs = np.where( still, viz,
+                  np.where( below, self.vertical_theta1( sx, sy, sz, self.vx, self.vy, viz, epsilon ),
+                  np.where( above, self.vertical_theta2( sx, sy, sz, self.vx, self.vy, viz ), NaR ) ) )
+        return self.vs
+
+
+    # Coefficients of the ground speed quadratic. Swapping ownship and
+    # intruder swaps a and c.
+    def ground_speed_abc( self, sx, sy, vox, voy, vix, viy ) :
+        a = sq(self.D) * ( sq(vox) + sq(voy) ) - sq(sx*voy - sy*vox)
+        b = 2*( (sx*voy - sy*vox) * (sx*viy - sy*vix) - sq(self.D) * (vox*vix + voy*viy) )
+        c = sq(self.D) * ( sq(vix) + sq(viy) ) - sq(sx*viy - sy*vix)
+        return a, b, c
+
+
+    # vertical_pair: Independent vertical speed only maneuvers of both
+    # aircraft of each pair, epsilon being the ownship coordination (the
+    # intruder's is -epsilon). Both maneuvers move the aircraft apart by the
+    # same vertical speed offset from the other aircraft's vertical speed.
+    #
+    # OUTPUTS: vs of the ownships, vs of the intruders
+    #
+    def vertical_pair( self, sx, sy, sz, vox, voy, voz, vix, viy, viz, epsilon ) :
+        vx = vox - vix
+        vy = voy - viy
+        still  = sq(vx) + sq(vy) == 0
+        below  = ~still & ( epsilon*sz < self.H ) & ( sq(sx) + sq(sy) > sq(self.D) )
+        above  = ~still & ~below & ( epsilon*sz >= self.H )
+        t1 = self.theta( sx, sy, vx, vy, -1 )
+        t2 = self.theta( sx, sy, vx, vy, 1 )
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            r = np.where( below, ( epsilon * self.H - sz ) / t1, ( sign_array(sz) * self.H - sz ) / t2 )
+        solved = ( below & ( t1 != 0 ) ) | ( above & ( t2 != 0 ) )
+        return ( np.where( still, viz, np.where( solved, viz + r, NaR ) ),
+                 np.where( still, voz, np.where( solved, voz - r, NaR ) ) )
+
+
+    def ground_speed_k( self, sx, sy, vox, voy, vix, viy, epsilon, abc=None ) :
+        a, b, c = self.ground_speed_abc( sx, sy, vox, voy, vix, viy ) if abc is None else abc
+        linear = a == 0
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            kl = -c/b
+        kl_ok = linear & ( c*b < 0 ) & tau_pos( sx, sy, kl*vox - vix, kl*voy - viy )
+        kq = root_array( a, b, c, epsilon )
+        kq_ok = ~linear & ( discr(a,b,c) >= 0 ) & ( kq > 0 ) & tau_pos( sx, sy, kq*vox - vix, kq*voy - viy )
+        return np.where( kl_ok, kl, np.where( kq_ok, kq, 0.0 ) )
+
+
+    # ground_speed: Independent ground speed only maneuver, one element per
+    # pair. abc are the coefficients of ground_speed_abc when known.
+    #
+    # OUTPUTS: kvx,kvy
+    #
+    def ground_speed( self, sx, sy, vox, voy, vix, viy, epsilon, abc=None ) :
+        if abc is None :
+            abc = self.ground_speed_abc( sx, sy, vox, voy, vix, viy )
+        k1 = self.ground_speed_k( sx, sy, vox, voy, vix, viy, epsilon, abc )
+        ok1 = ( k1 > 0 ) & ( eps_line_array( sx, sy, k1*vox - vix, k1*voy - viy ) == epsilon )
+        k2 = self.ground_speed_k( sx, sy, vox, voy, vix, viy, -epsilon, abc )
+        ok2 = ~ok1 & ( k2 > 0 ) & ( eps_line_array( sx, sy, k2*vox - vix, k2*voy - viy ) == epsilon )
+        k = np.where( ok1, k1, k2 )
+        self.kvx = np.where( ok1 | ok2, k*vox, 0.0 )
+        self.kvy = np.where( ok1 | ok2, k*voy, 0.0 )
+        return np.where( ( self.kvx != 0 ) | ( self.kvy != 0 ), np.sqrt( sq(self.kvx) + sq(self.kvy) ), NaR )
+
+
+    # Terms of the track quadratic that only depend on the relative position.
+    # Swapping ownship and intruder negates sxy and syx.
+    #
+    # OUTPUTS: sxy,syx,a
+    #
+    def track_geometry( self, sx, sy, epsilon ) :
+        s2 = sq(sx) + sq(sy)
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            R   = self.D / np.sqrt( s2 - sq(self.D) )
+            sxy = sx - epsilon*R*sy
+            syx = sy + epsilon*R*sx
+            a   = sq(s2) / ( s2 - sq(self.D) )
+        return sxy, syx, a
+
+
+    def track_vx_vy( self, sx, sy, vox, voy, vix, viy, epsilon, geometry=None ) :
+        sxy, syx, a = self.track_geometry( sx, sy, epsilon ) if geometry is None else geometry
+        v2   = sq(vox) + sq(voy)
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            viyx = viy*sxy - vix*syx
+            b    = 2*syx*viyx
+            c    = sq(viyx) - sq(sxy)*v2
+
+            # sxy == 0 : solution along the y axis
+            axis  = ( sxy == 0 ) & ~( ( syx == 0 ) | ( v2 < sq(vix) ) )
+            ay    = sign_array(voy) * np.sqrt( v2 - sq(vix) )
+            plus  = axis & tau_pos( sx, sy, 0, ay-viy )
+            minus = axis & ~plus & tau_pos( sx, sy, 0, -ay-viy )
+
+            # general case
+            quad = ( sxy != 0 ) & ( discr(a,b,c) >= 0 )
+            vx1  = root_array( a, b, c, 1 )
+            vy1  = ( viyx + syx*vx1 ) / sxy
+            vx2  = root_array( a, b, c, -1 )
+            vy2  = ( viyx + syx*vx2 ) / sxy
+            tp1  = tau_pos( sx, sy, vx1-vix, vy1-viy )
+            tp2  = tau_pos( sx, sy, vx2-vix, vy2-viy )
+            one  = quad & tp1 & ( ~tp2 | ( vx1*vox+vy1*voy > vx2*vox+vy2*voy ) )
+            two  = quad & ~one & tp2
+
+        self.vx = np.where( plus | minus, vix, np.where( one, vx1, np.where( two, vx2, 0.0 ) ) )
+        self.vy = np.where( minus, -ay, np.where( plus, ay, np.where( one, vy1, np.where( two, vy2, 0.0 ) ) ) )
+
+
+    # track: Independent track only maneuver, one element per pair.
+    # geometry is the output of track_geometry when known.
+    #
+    # OUTPUTS: vx,vy
+    #
+    def track( self, sx, sy, vox, voy, vix, viy, epsilon, geometry=None ) :
+        self.track_vx_vy( sx, sy, vox, voy, vix, viy, epsilon, geometry )
+        return np.where( ( self.vx != 0 ) | ( self.vy != 0 ), atan2_safe_array( self.vx, self.vy ), NaR )
+
+
+    def alpha( self, sx, sy ) :
+        s2 = sq(sx) + sq(sy)
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            return np.where( s2 != 0, sq(self.D) / s2, 0.0 )
+
+
+    def beta( self, sx, sy ) :
+        s2 = sq(sx) + sq(sy)
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            return np.where( s2 != 0, self.D * sqrt_safe_array( s2 - sq(self.D) ) / s2, 0.0 )
+
+
+    # Tangent points Q of the optimal maneuvers for epsilon and -epsilon.
+    # Swapping ownship and intruder negates them.
+    #
+    # OUTPUTS: (qpx,qpy) for epsilon, (qpx,qpy) for -epsilon
+    #
+    def tangent_points( self, sx, sy, epsilon ) :
+        alpha, beta = self.alpha( sx, sy ), self.beta( sx, sy )
+        return ( ( alpha*sx + epsilon*beta*sy, alpha*sy + -epsilon*beta*sx ),
+                 ( alpha*sx + -epsilon*beta*sy, alpha*sy + epsilon*beta*sx ) )
+
+
+    # Velocity of the optimal maneuver relative to the intruder for the
+    # tangent point q, and whether there is one. Swapping ownship and
+    # intruder negates it.
+    #
+    # OUTPUTS: wx,wy,found
+    #
+    def optimal_relative( self, sx, sy, vx, vy, q ) :
+        qpx, qpy = q
+        tpq = contact_time_array( sx, sy, qpx, qpy, vx, vy )
+        with np.errstate( divide='ignore', invalid='ignore' ) :
+            wx = np.where( tpq > 0, (qpx-sx) / tpq, -sy*(sx*vy-vx*sy) )
+            wy = np.where( tpq > 0, (qpy-sy) / tpq,  sx*(sx*vy-vx*sy) )
+        return wx, wy, tpq >= 0
+
+
+    def optimal_vx_vy( self, sx, sy, vox, voy, vix, viy, epsilon, q=None ) :
+        if q is None :
+            q = ( self.Q( sx, sy, epsilon ), self.Q( sy, sx, -epsilon ) )
+        wx, wy, found = self.optimal_relative( sx, sy, vox-vix, voy-viy, q )
+        self.ovx = np.where( found, wx + vix, 0.0 )
+        self.ovy = np.where( found, wy + viy, 0.0 )
+
+
+    # Optimal maneuver among the candidate velocities (ovx,ovy) for epsilon
+    # and -epsilon
+    #
+    # OUTPUTS: opt_trk,opt_gs,ovx,ovy
+    #
+    def select_optimal( self, sx, sy, vix, viy, epsilon, first, second ) :
+        ovx1, ovy1 = first
+        ok1 = ( ( ovx1 != 0 ) | ( ovy1 != 0 ) ) & ( eps_line_array( sx, sy, ovx1-vix, ovy1-viy ) == epsilon )
+        ovx2, ovy2 = second
+        ok2 = ~ok1 & ( ( ovx2 != 0 ) | ( ovy2 != 0 ) ) & ( eps_line_array( sx, sy, ovx2-vix, ovy2-viy ) == epsilon )
+        self.ovx = np.where( ok1, ovx1, np.where( ok2, ovx2, 0.0 ) )
+        self.ovy = np.where( ok1, ovy1, np.where( ok2, ovy2, 0.0 ) )
+        ok = ok1 | ok2
+        self.opt_trk = np.where( ok, atan2_safe_array( self.ovx, self.ovy ), NaR )
+        self.opt_gs  = np.where( ok, np.sqrt( sq(self.ovx) + sq(self.ovy) ), NaR )
+
+
+    # optimal: Independent optimal track and ground speed only maneuver,
+    # one element per pair. q is the output of tangent_points when known.
+    #
+    # OUTPUTS: opt_trk,opt_gs,ovx,ovy
+    #
+    def optimal( self, sx, sy, vox, voy, vix, viy, epsilon, q=None ) :
+        q1, q2 = ( None, None ) if q is None else q
+        self.optimal_vx_vy( sx, sy, vox, voy, vix, viy, epsilon, q1 )
+        first = self.ovx, self.ovy
+        self.optimal_vx_vy( sx, sy, vox, voy, vix, viy, -epsilon, q2 )
+        self.select_optimal( sx, sy, vix, viy, epsilon, first, ( self.ovx, self.ovy ) )
+
+
+    # optimal_pair: Independent optimal maneuvers of both aircraft of each
+    # pair, from the relative maneuvers of the ownships. The ownship
+    # maneuvers are stored as by optimal.
+    #
+    # OUTPUTS: opt_trk,opt_gs of the intruders
+    #
+    def optimal_pair( self, sx, sy, vox, voy, vix, viy, epsilon, q ) :
+        own, intruder = [], []
+        for qe in q :
+            wx, wy, found = self.optimal_relative( sx, sy, vox-vix, voy-viy, qe )
+            own.append( ( np.where( found, wx + vix, 0.0 ), np.where( found, wy + viy, 0.0 ) ) )
+            intruder.append( ( np.where( found, vox - wx, 0.0 ), np.where( found, voy - wy, 0.0 ) ) )
+        self.select_optimal( -sx, -sy, vox, voy, epsilon, *intruder )
+        opt_trk, opt_gs = self.opt_trk, self.opt_gs
+        self.select_optimal( sx, sy, vix, viy, epsilon, *own )
+        return opt_trk, opt_gs
+
+
+    # kb3d_vertical: Coordinated vertical maneuver, one element per pair.
+    # pre is the precondition mask; it is computed when not given.
+    #
+    # OUTPUTS: vs
+    #
+    def kb3d_vertical( self, sx, sy, sz, vox, voy, voz, vix, viy, viz, pre=None ) :
+        if pre is None :
+            pre = self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+        pz = sz + self.cd3d.time2los*(voz-viz)
+        vs = self.vertical( sx, sy, sz, vox, voy, voz, vix, viy, viz, self.vertical_coordination( sx, sy, sz, pz ) )
+        self.vs = np.where( pre, vs, NaR )
+
+
+    # kb3d_horizontal: Coordinated horizontal maneuvers, one element per pair.
+    # pre is the precondition mask; it is computed when not given.
+    #
+    # OUTPUTS: trk,gs,opt_gs,opt_trk
+    #
+    def kb3d_horizontal( self, sx, sy, sz, vox, voy, voz, vix, viy, viz, pre=None ) :
+        if pre is None :
+            pre = self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+        pre = pre & ( sq(sx)+sq(sy) > sq(self.D) )
+        epsilon = self.horizontal_coordination( sx, sy, vox-vix, voy-viy )
+        gs  = self.ground_speed( sx, sy, vox, voy, vix, viy, epsilon )
+        trk = self.track( sx, sy, vox, voy, vix, viy, epsilon )
+        self.optimal( sx, sy, vox, voy, vix, viy, epsilon )
+        self.gs      = np.where( pre, gs, NaR )
+        self.trk     = np.where( pre, trk, NaR )
+        self.opt_trk = np.where( pre, self.opt_trk, NaR )
+        self.opt_gs  = np.where( pre, self.opt_gs, NaR )
+
+
+    # kb3d: Coordinated horizontal and vertical maneuvers for arrays of pairs.
+    # The precondition (and its cd3d call) is evaluated once for both.
+    #
+    # OUTPUTS: trk,gs,opt_trk,opt_gs,vs
+    #
+    def kb3d( self, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+        sx, sy, sz, vox, voy, voz, vix, viy, viz = np.broadcast_arrays(
+            *[ np.asarray( a, dtype=float ) for a in ( sx, sy, sz, vox, voy, voz, vix, viy, viz ) ] )
+        pre = self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+        self.kb3d_vertical( sx, sy, sz, vox, voy, voz, vix, viy, viz, pre )
+        self.kb3d_horizontal( sx, sy, sz, vox, voy, voz, vix, viy, viz, pre )
+
+
+    # kb3d_pair: Coordinated maneuvers of both aircraft of each pair, as
+    # kb3d on the pairs and on the swapped pairs, in one pass. The ownship
+    # maneuvers are in trk, gs, opt_trk, opt_gs and vs, and the intruder
+    # maneuvers in trk_i, gs_i, opt_trk_i, opt_gs_i and vs_i.
+    #
+    # OUTPUTS: trk,gs,opt_trk,opt_gs,vs,trk_i,gs_i,opt_trk_i,opt_gs_i,vs_i
+    #
+    def kb3d_pair( self, sx, sy, sz, vox, voy, voz, vix, viy, viz ) :
+        sx, sy, sz, vox, voy, voz, vix, viy, viz = np.broadcast_arrays(
+            *[ np.asarray( a, dtype=float ) for a in ( sx, sy, sz, vox, voy, voz, vix, viy, viz ) ] )
+        pre = self.precondition( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+
+        pz = sz + self.cd3d.time2los*(voz-viz)
+        vs, vs_i = self.vertical_pair( sx, sy, sz, vox, voy, voz, vix, viy, viz,
+                                       self.vertical_coordination( sx, sy, sz, pz ) )
+        self.vs   = np.where( pre, vs, NaR )
+        self.vs_i = np.where( pre, vs_i, NaR )
+
+        pre = pre & ( sq(sx)+sq(sy) > sq(self.D) )
+        epsilon = self.horizontal_coordination( sx, sy, vox-vix, voy-viy )
+        a, b, c = self.ground_speed_abc( sx, sy, vox, voy, vix, viy )
+        sxy, syx, ta = self.track_geometry( sx, sy, epsilon )
+
+        # Intruders: relative position negated, velocities swapped
+        gs_i  = self.ground_speed( -sx, -sy, vix, viy, vox, voy, epsilon, ( c, b, a ) )
+        trk_i = self.track( -sx, -sy, vix, viy, vox, voy, epsilon, ( -sxy, -syx, ta ) )
+        self.gs_i  = np.where( pre, gs_i, NaR )
+        self.trk_i = np.where( pre, trk_i, NaR )
+
+        gs  = self.ground_speed( sx, sy, vox, voy, vix, viy, epsilon, ( a, b, c ) )
+        trk = self.track( sx, sy, vox, voy, vix, viy, epsilon, ( sxy, syx, ta ) )
+        opt_trk_i, opt_gs_i = self.optimal_pair( sx, sy, vox, voy, vix, viy, epsilon,
+                                                 self.tangent_points( sx, sy, epsilon ) )
+        self.opt_trk_i = np.where( pre, opt_trk_i, NaR )
+        self.opt_gs_i  = np.where( pre, opt_gs_i, NaR )
+        self.gs      = np.where( pre, gs, NaR )
+        self.trk     = np.where( pre, trk, NaR )
+        self.opt_trk = np.where( pre, self.opt_trk, NaR )
+        self.opt_gs  = np.where( pre, self.opt_gs, NaR )
@@ -15,13 +15,19 @@
 #
 
 from math import fabs
-from Util import *
+import numpy as np
+from .Util import sign, sign_array
+
+__all__ = [ 'break_vz_symm', 'sign_vz', 'vertical_recovery', 'break_vz_symm_array',
+            'sign_vz_array', 'vertical_recovery_array' ]
+
 
 # Breaks symmetry when vertical speed is zero
+# (same horizontal rule as break_symm in KB3D when sz == 0)
 def break_vz_symm( sx, sy, sz) :
-    if sz > 0 :
+    if sz > 0 or ( sz == 0 and ( sx < 0 or ( sx == 0 and sy < 0 ) ) ) :
         return 1
-    return break_vz_symm( sx, sy, sz )
+    return -1
 
 
 def sign_vz( sx, sy, sz, vz) :
@@ -35,4 +41,21 @@ def vertical_recovery( sx, sy, sz, voz, viz, H, t) :
     nvz =  ( sign_vz( sx, sy, sz, vz ) * H - sz ) / t   
     if sz*vz >= 0 and fabs(vz) >= fabs(nvz) :
         return vz + viz    
-    return nvz + viz
\ No newline at end of file
+    return nvz + viz
+
+
+# Array versions of the above, one element per pair
+
+def break_vz_symm_array( sx, sy, sz ) :
+    return np.where( ( sz > 0 ) | ( ( sz == 0 ) & ( ( sx < 0 ) | ( ( sx == 0 ) & ( sy < 0 ) ) ) ), 1.0, -1.0 )
+
+
+def sign_vz_array( sx, sy, sz, vz ) :
+    return np.where( ( sz*vz >= 0 ) & ( vz != 0 ), sign_array(vz), break_vz_symm_array( sx, sy, sz ) )
+
+
+def vertical_recovery_array( sx, sy, sz, voz, viz, H, t ) :
+    vz  = voz - viz
+    with np.errstate( divide='ignore', invalid='ignore' ) :
+        nvz = ( sign_vz_array( sx, sy, sz, vz ) * H - sz ) / t
+    return np.where( ( sz*vz >= 0 ) & ( np.abs(vz) >= np.abs(nvz) ), vz + viz, nvz + viz )
@@ -0,0 +1,189 @@
+#
+# Parallel.py
+#
+# Multi-core detection and resolution for a Scene.
+#
+# ParallelScene has the interface of Scene. Candidate pairs are split in
+# blocks that a pool of worker processes runs through detect_block and
+# resolve_block (see Scene.py). The aircraft states and the candidate pairs
+# are written once per tick into multiprocessing.shared_memory blocks that
+# the workers map by name, so only block bounds and results are pickled.
+# Results are merged in block order: they are identical, and in the same
+# order, as those of a serial Scene.
+#
+# BASIC USAGE:
+#   scene = ParallelScene(D,H,T,workers)
+#   scene.set_fleet(fleet)
+#   scene.detection()
+#   scene.resolution()
+#   ...
+#   scene.close()  // stops the workers and frees the shared memory
+#
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .Util import max, min
+from .Scene import Scene, detect_block, resolve_block
+
+__all__ = [ 'MIN_BLOCK', 'SharedArray', 'ParallelScene' ]
+
+
+# Smallest number of pairs (or conflicts) per task. Smaller workloads are
+# processed in the calling process.
+MIN_BLOCK = 1 << 16
+
+# Shared memory blocks mapped by this (worker) process, by role
+attached = {}
+
+
+
+class SharedArray :
+
+
+    def __init__( self, dtype ) :
+        self.dtype = np.dtype( dtype )
+        self.shm = None
+
+
+    # store: Copies values into the shared block, replacing it by a larger
+    # one when needed.
+    #
+    # OUTPUTS: name,shape of the shared array
+    #
+    def store( self, values ) :
+        values = np.ascontiguousarray( values, dtype=self.dtype )
+        if self.shm is None or self.shm.size < values.nbytes :
+            self.close()
+            self.shm = shared_memory.SharedMemory( create=True, size=max( 2 * values.nbytes, 1 ) )
+        np.ndarray( values.shape, dtype=self.dtype, buffer=self.shm.buf )[...] = values
+        return self.shm.name, values.shape
+
+
+    def close( self ) :
+        if self.shm is not None :
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+# attach: View of a shared array in a worker. The mapping is kept until the
+# block of the same role is replaced.
+def attach( role, name, shape, dtype ) :
+    shm = attached.get( role )
+    if shm is None or shm.name != name :
+        if shm is not None :
+            shm.close()
+        shm = shared_memory.SharedMemory( name=name )
+        attached[role] = shm
+    return np.ndarray( shape, dtype=dtype, buffer=shm.buf )
+
+
+def detect_task( d, h, t, filter, states, pairs, start, stop ) :
+    x = attach( 'states', *states, np.float64 )
+    p = attach( 'pairs', *pairs, np.int64 )
+    return detect_block( d, h, t, filter, tuple( x ), p[0, start:stop], p[1, start:stop] )
+
+
+def resolve_task( d, h, t, states, a, b, t_in ) :
+    x = attach( 'states', *states, np.float64 )
+    return resolve_block( d, h, t, tuple( x ), a, b, t_in )
+
+
+
+class ParallelScene( Scene ) :
+
+
+    def __init__( self, D, H, T, workers=None, block=MIN_BLOCK ) :
+        self.workers = workers or os.cpu_count() or 1
+        self.block = block
+        self.pool = None
+        self.shared_states = SharedArray( np.float64 )
+        self.shared_pairs = SharedArray( np.int64 )
+        self.states_ref = None
+        Scene.__init__( self, D, H, T )
+
+
+    def set_workers( self, workers ) :
+        self.close_pool()
+        self.workers = workers
+
+
+    def get_workers( self ) :
+        return self.workers
+
+
+    def executor( self ) :
+        if self.pool is None :
+            self.pool = ProcessPoolExecutor( max_workers=self.workers )
+        return self.pool
+
+
+    def load( self, ids, x, y, alt, vx, vy, vz, gxy ) :
+        Scene.load( self, ids, x, y, alt, vx, vy, vz, gxy )
+        self.states_ref = None
+
+
+    # States in shared memory, copied once per load
+    def share_states( self ) :
+        if self.states_ref is None :
+            self.states_ref = self.shared_states.store( np.vstack( self.states() ) )
+        return self.states_ref
+
+
+    # Bounds of the blocks of n items, about 4 blocks per worker
+    def blocks( self, n ) :
+        size = max( self.block, -( -n // ( 4 * self.workers ) ) )
+        starts = list( range( 0, n, size ) )
+        return starts, [ min( start + size, n ) for start in starts ]
+
+
+    def detect_pairs( self, i, j ) :
+        if self.workers <= 1 or i.size <= self.block :
+            return Scene.detect_pairs( self, i, j )
+        states = self.share_states()
+        pairs = self.shared_pairs.store( np.vstack( ( i, j ) ) )
+        starts, stops = self.blocks( i.size )
+        n = len( starts )
+        found = self.executor().map( detect_task, [ self.d ] * n, [ self.h ] * n, [ self.t ] * n,
+                                     [ self.filter ] * n, [ states ] * n, [ pairs ] * n, starts, stops )
+        return self.store_conflicts( list( found ) )
+
+
+    def resolution( self ) :
+        n = self.own_rows.size
+        if self.workers <= 1 or n <= self.block :
+            return Scene.resolution( self )
+        states = self.share_states()
+        starts, stops = self.blocks( n )
+        k = len( starts )
+        a = [ self.own_rows[start:stop] for start, stop in zip( starts, stops ) ]
+        b = [ self.intruder_rows[start:stop] for start, stop in zip( starts, stops ) ]
+        t_in = [ self.t_in[start:stop] for start, stop in zip( starts, stops ) ]
+        found = self.executor().map( resolve_task, [ self.d ] * k, [ self.h ] * k, [ self.t ] * k,
+                                     [ states ] * k, a, b, t_in )
+        ( self.recovery, self.newtrk, self.newgs, self.opttrk, self.optgs,
+          self.newvs ) = [ np.concatenate( c ) for c in zip( *found ) ]
+
+
+    def close_pool( self ) :
+        if self.pool is not None :
+            self.pool.shutdown()
+            self.pool = None
+
+
+    # close: Stops the workers and frees the shared memory
+    def close( self ) :
+        self.close_pool()
+        self.shared_states.close()
+        self.shared_pairs.close()
+        self.states_ref = None
+
+
+    def __enter__( self ) :
+        return self
+
+
+    def __exit__( self, *args ) :
+        self.close()
@@ -0,0 +1,293 @@
+#
+# Probability.py
+#
+# Probability of conflict under surveillance uncertainty.
+#
+# ConflictProbability is a Scene whose aircraft states are the reported
+# ones. For each pair, position and velocity errors are drawn for both
+# aircraft from zero-mean normal distributions of the configured
+# covariances, and cd3d_batch runs on every sample of every pair at once.
+# The errors of the two aircraft are independent with the same covariance,
+# so the relative state error is drawn directly, with twice the covariance.
+#
+# Samples are drawn in blocks of `block` samples, each from its own random
+# stream spawned from the seed: results depend on the seed only, not on the
+# number of workers. With more than one worker, blocks are sampled by a
+# pool of worker processes.
+#
+# The default pairs are the candidate pairs of the grid and altitude bands,
+# widened by SIGMAS standard deviations of the relative error at the
+# lookahead time, sqrt(2) (position + T velocity), horizontally and
+# vertically: the pairs left out conflict in a negligible fraction of the
+# samples.
+#
+# Errors are given in the local frame of the aircraft: east, north, up.
+# position [m]   : 3 standard deviations or a 3x3 covariance [m^2]
+# velocity [m/s] : 3 standard deviations or a 3x3 covariance [m^2/s^2]
+#
+# BASIC USAGE:
+#   cp = ConflictProbability(D,H,T)
+#   cp.set_position_error([30,30,15])
+#   cp.set_velocity_error([2,2,1])
+#   cp.set_traffic(x,y,alt,trk,gs,vs,ids,gxy)
+#   for own, intruder, p in cp.probability() :
+#     ...
+#   cp.time2los_quantiles([0.05,0.5,0.95])
+#
+# Output class variables (one element per pair with at least one sample in
+# conflict, in the order of the pairs)
+# ----------------------
+# p_own, p_intruder : Aircraft ids
+# p_conflict        : Fraction of the samples in conflict
+# p_time2los [sec]  : Time to loss of separation of every sample (pairs x
+#                     samples), NaN for the samples without conflict
+#
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .Util import max, min
+from .CD3DBatch import cd3d_batch
+from .Scene import CHUNK, Scene
+
+
+__all__ = [ 'BLOCK', 'SIGMAS', 'error_factor', 'sample_block', 'ConflictProbability' ]
+
+
+# Default number of samples per block
+BLOCK = 1024
+
+# Standard deviations of the relative error added to the reach of the
+# candidate pairs
+SIGMAS = 6
+
+
+# error_factor: Matrix L with L L' = cov, for 3 standard deviations or a
+# 3x3 covariance. Singular covariances (an exact coordinate) are allowed.
+def error_factor( error ) :
+    error = np.asarray( error, dtype=float )
+    cov = np.diag( np.square( error ) ) if error.shape == ( 3, ) else error
+    if cov.shape != ( 3, 3 ) :
+        raise ValueError( "errors are 3 standard deviations or a 3x3 covariance" )
+    w, v = np.linalg.eigh( cov )
+    if w.min() < -1e-9 * max( w.max(), 1 ) :
+        raise ValueError( "covariance is not positive semi-definite" )
+    return v * np.sqrt( np.clip( w, 0, None ) )
+
+
+# sample_block: Conflicts of samples draws of the relative states (sx,sy,sz,
+# vx,vy,vz) [m,m/s] of the pairs, with position and velocity errors
+# position @ e and velocity @ e (e standard normal) drawn from the random
+# stream seed
+#
+# OUTPUTS: conflicts (number per pair),rows (pairs with a conflict),
+#          time2los (rows x samples, NaN without conflict)
+#
+def sample_block( d, h, t, filter, states, position, velocity, samples, seed ) :
+    rng = np.random.default_rng( seed )
+    n = states[0].size
+    conflicts = np.zeros( n, dtype=np.int64 )
+    rows, time2los = [ np.zeros( 0, dtype=np.int64 ) ], [ np.zeros( ( 0, samples ) ) ]
+    chunk = max( 1, CHUNK // max( 6 * samples, 1 ) )
+    for start in range( 0, n, chunk ) :
+        stop = min( start + chunk, n )
+        e = rng.standard_normal( ( 2, stop - start, samples, 3 ) )
+        s = e[0] @ position.T
+        v = e[1] @ velocity.T
+        conflict, _, _, t2los, _, _, _ = cd3d_batch( d, h, t, filter,
+            *( states[k][start:stop, None] + s[..., k] for k in range( 3 ) ),
+            *( states[k + 3][start:stop, None] + v[..., k] for k in range( 3 ) ) )
+        conflicts[start:stop] = conflict.sum( axis=1 )
+        found = np.flatnonzero( conflicts[start:stop] )
+        rows.append( found + start )
+        time2los.append( np.where( conflict[found], t2los[found], np.nan ) )
+    return conflicts, np.concatenate( rows ), np.concatenate( time2los )
+
+
+
+class ConflictProbability( Scene ) :
+
+
+    def __init__( self, D, H, T, samples=1000, seed=None, workers=1 ) :
+        Scene.__init__( self, D, H, T )
+        self.samples = samples
+        self.seed = seed
+        self.workers = workers
+        self.block = BLOCK
+        self.pool = None
+        self.set_position_error( [ 0, 0, 0 ] )
+        self.set_velocity_error( [ 0, 0, 0 ] )
+        self.clear_probability()
+
+
+    def clear_probability( self ) :
+        self.p_rows = ( np.zeros( 0, dtype=np.int64 ), np.zeros( 0, dtype=np.int64 ) )
+        self.p_own = self.ids[:0]
+        self.p_intruder = self.ids[:0]
+        self.p_conflict = np.zeros( 0 )
+        self.p_time2los = np.zeros( ( 0, self.samples ) )
+
+
+    def load( self, ids, x, y, alt, vx, vy, vz, gxy ) :
+        Scene.load( self, ids, x, y, alt, vx, vy, vz, gxy )
+        self.clear_probability()
+
+
+    # Position error of each aircraft [m], east, north, up
+    def set_position_error( self, error ) :
+        self.position = np.asarray( error, dtype=float )
+        self.position_factor = error_factor( error )
+
+
+    def get_position_error( self ) :
+        return self.position
+
+
+    # Velocity error of each aircraft [m/s], east, north, up
+    def set_velocity_error( self, error ) :
+        self.velocity = np.asarray( error, dtype=float )
+        self.velocity_factor = error_factor( error )
+
+
+    def get_velocity_error( self ) :
+        return self.velocity
+
+
+    def set_samples( self, samples ) :
+        self.samples = samples
+
+
+    def get_samples( self ) :
+        return self.samples
+
+
+    # Seed of the random streams. None draws a fresh seed at each call.
+    def set_seed( self, seed ) :
+        self.seed = seed
+
+
+    def get_seed( self ) :
+        return self.seed
+
+
+    # Number of samples per block (per task with several workers)
+    def set_block( self, block ) :
+        self.block = block
+
+
+    def get_block( self ) :
+        return self.block
+
+
+    def set_workers( self, workers ) :
+        self.close()
+        self.workers = workers
+
+
+    def get_workers( self ) :
+        return self.workers
+
+
+    def executor( self ) :
+        if self.pool is None :
+            self.pool = ProcessPoolExecutor( max_workers=self.workers or os.cpu_count() or 1 )
+        return self.pool
+
+
+    # Margins of the relative error at the lookahead time [m]: SIGMAS
+    # standard deviations, horizontally and vertically
+    #
+    # OUTPUTS: horizontal,vertical
+    #
+    def error_margins( self ) :
+        position = np.square( self.position_factor ).sum( axis=1 )
+        velocity = np.square( self.velocity_factor ).sum( axis=1 )
+        horizontal = np.sqrt( position[:2].sum() ) + self.t * np.sqrt( velocity[:2].sum() )
+        vertical = np.sqrt( position[2] ) + self.t * np.sqrt( velocity[2] )
+        return SIGMAS * np.sqrt( 2 ) * horizontal, SIGMAS * np.sqrt( 2 ) * vertical
+
+
+    # Reach of the grid, widened by the horizontal error margin [m]
+    def reach( self ) :
+        return Scene.reach( self ) + self.error_margins()[0]
+
+
+    # candidate_pairs: As Scene.candidate_pairs, with the altitude bands
+    # widened by the vertical error margin
+    def candidate_pairs( self ) :
+        h = self.bands.h
+        self.bands.set_HT( h + self.error_margins()[1], self.t )
+        try :
+            return Scene.candidate_pairs( self )
+        finally :
+            self.bands.set_HT( h, self.t )
+
+
+    # probability: Probability of conflict of the index pairs (a,b). By
+    # default, the candidate pairs of the grid widened by the error margins:
+    # pairs further apart are out of reach of each other for the reported
+    # velocities and the errors.
+    #
+    # OUTPUTS: list of (own,intruder,probability) of the pairs with at least
+    #          one sample in conflict
+    #
+    def probability( self, a=None, b=None ) :
+        if a is None :
+            a, b = self.candidate_pairs() if self.size() > 1 else ( [], [] )
+        a = np.asarray( a, dtype=np.int64 )
+        b = np.asarray( b, dtype=np.int64 )
+        x, y, z, vx, vy, vz = self.states()
+        states = ( x[a] - x[b], y[a] - y[b], z[a] - z[b], vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b] )
+
+        # Relative errors: twice the covariance of one aircraft
+        position = np.sqrt( 2 ) * self.position_factor
+        velocity = np.sqrt( 2 ) * self.velocity_factor
+        sizes = [ min( self.block, self.samples - start ) for start in range( 0, self.samples, self.block ) ]
+        seeds = np.random.SeedSequence( self.seed ).spawn( len( sizes ) )
+        n = len( sizes )
+        tasks = ( [ self.d ] * n, [ self.h ] * n, [ self.t ] * n, [ self.filter ] * n, [ states ] * n,
+                  [ position ] * n, [ velocity ] * n, sizes, seeds )
+        if self.workers == 1 or n <= 1 or a.size == 0 :
+            found = list( map( sample_block, *tasks ) )
+        else :
+            found = list( self.executor().map( sample_block, *tasks ) )
+
+        conflicts = sum( c for c, _, _ in found ) if found else np.zeros( a.size, dtype=np.int64 )
+        keep = np.flatnonzero( conflicts )
+        self.p_rows = ( a[keep], b[keep] )
+        self.p_own = self.ids[a[keep]]
+        self.p_intruder = self.ids[b[keep]]
+        self.p_conflict = conflicts[keep] / self.samples
+        # Time to loss of separation of each block, in the rows of the pairs kept
+        self.p_time2los = np.full( ( keep.size, self.samples ), np.nan )
+        column = 0
+        for size, ( _, rows, time2los ) in zip( sizes, found ) :
+            self.p_time2los[np.searchsorted( keep, rows ), column:column + size] = time2los
+            column += size
+        return list( zip( self.p_own.tolist(), self.p_intruder.tolist(), self.p_conflict.tolist() ) )
+
+
+    # time2los_quantiles: Quantiles q of the time to loss of separation of
+    # the conflicting samples of each pair [sec]
+    #
+    # OUTPUTS: array of pairs x len(q)
+    #
+    def time2los_quantiles( self, q ) :
+        q = np.atleast_1d( q )
+        if self.p_time2los.shape[0] == 0 :
+            return np.zeros( ( 0, q.size ) )
+        return np.nanquantile( self.p_time2los, q, axis=1 ).T
+
+
+    def close( self ) :
+        if self.pool is not None :
+            self.pool.shutdown()
+            self.pool = None
+
+
+    def __enter__( self ) :
+        return self
+
+
+    def __exit__( self, *args ) :
+        self.close()
@@ -0,0 +1,118 @@
+#
+# Projection.py
+#
+# Projection of many aircraft into one shared local tangent plane.
+#
+# Geodesic.geo2xy computes, for every pair, the flat earth relative position
+# of the ownship in a frame centred on the traffic aircraft:
+#   sx = R2(lat_i) * cos(lat_i) * (lon_o - lon_i)
+#   sy = R1(lat_i) * (lat_o - lat_i)
+# where R1 and R2 are the meridian and prime vertical radii of curvature.
+# TangentPlane evaluates the same radii once, at a reference latitude lat0,
+# and maps every aircraft into that frame once per tick:
+#   x = R2(lat0) * cos(lat0) * (lon - lon0)
+#   y = R1(lat0) * (lat - lat0)
+# so that the relative position of a pair is a plain subtraction.
+#
+# Error bounds against Geodesic.geo2xy
+# ------------------------------------
+# The two results only differ by the scale factors, so the relative errors
+# only depend on the latitudes of the reference and of the traffic aircraft
+# (see scale_error):
+#   ex = R2(lat0)*cos(lat0) / ( R2(lat_i)*cos(lat_i) ) - 1 ~ tan(lat) * dlat
+#   ey = R1(lat0) / R1(lat_i) - 1                          ~ 3*e2*sin(lat)*cos(lat) * dlat
+# with dlat = lat_i - lat0 [rad]. For instance, 1 deg away from the reference
+# at 45 deg of latitude, ex ~ 1.8% and ey ~ 0.02% of the pair's east and
+# north separation: 0.09 nm and 0.001 nm for a pair 5 nm apart. The
+# longitude of the reference only shifts x and does not change the error.
+# Pictures spanning many degrees of latitude should therefore be split in
+# latitude bands, each with its own reference, to keep ex small.
+#
+# Unit Conventions
+# ----------------
+# - lat,lon,lat0,lon0 in degrees [deg]
+# - x,y in meters [m]
+#
+# REMARK : North latitudes are positive.
+#          East longitudes are positive.
+#          X points to East, Y points to North.
+#
+
+from math import cos
+import numpy as np
+from .Constants import Flat, WGS84
+from .Util import deg2rad, deg2rad_array, sq, topi_array
+
+__all__ = [ 'radii', 'TangentPlane' ]
+
+
+# Meridian radius of curvature R1 and prime vertical radius of curvature R2
+# at latitude lat [rad], as in Geodesic.geo2xy
+#
+# OUTPUTS: R1,R2
+#
+def radii( lat ) :
+    e2 = Flat * (2 - Flat)
+    r32 = 1 - e2 * sq( np.sin(lat) )
+    R1 = WGS84 * (1 - e2) / np.sqrt( r32 * r32 * r32 )
+    R2 = WGS84 / np.sqrt( 1 - e2 * sq( np.sin(lat) ) )
+    return R1, R2
+
+
+
+class TangentPlane :
+
+
+    def __init__( self, latdeg0=0, londeg0=0 ) :
+        self.set_reference( latdeg0, londeg0 )
+
+
+    # set_reference: Origin of the plane [deg,deg]
+    def set_reference( self, latdeg0, londeg0 ) :
+        self.latdeg0 = latdeg0
+        self.londeg0 = londeg0
+        self.lat0 = deg2rad( latdeg0 )
+        self.lon0 = deg2rad( londeg0 )
+        R1, R2 = radii( self.lat0 )
+        self.ky = float( R1 )
+        self.kx = float( R2 ) * cos( self.lat0 )
+
+
+    def get_reference( self ) :
+        return self.latdeg0, self.londeg0
+
+
+    # centre: Uses the centre of the bounding box of the positions as origin
+    def centre( self, latdeg, londeg ) :
+        latdeg = np.asarray( latdeg, dtype=float )
+        londeg = np.asarray( londeg, dtype=float )
+        if latdeg.size > 0 :
+            self.set_reference( ( latdeg.min() + latdeg.max() ) / 2, ( londeg.min() + londeg.max() ) / 2 )
+
+
+    # geo2xy: Positions of the aircraft in the plane
+    # PRECONDITION:
+    #   latdeg,londeg: Arrays of positions ([deg],[deg])
+    #
+    # OUTPUTS: x,y [m,m]
+    #
+    def geo2xy( self, latdeg, londeg ) :
+        lat = deg2rad_array( latdeg )
+        lon = deg2rad_array( londeg )
+        x = self.kx * topi_array( lon - self.lon0 )
+        y = self.ky * ( lat - self.lat0 )
+        return x, y
+
+
+    # scale_error: Relative error of the east (ex) and north (ey) components
+    # of the relative position of a pair whose traffic aircraft is at
+    # latitude latdeg_i [deg], with respect to Geodesic.geo2xy
+    #
+    # OUTPUTS: ex,ey
+    #
+    def scale_error( self, latdeg_i ) :
+        lat = deg2rad_array( latdeg_i )
+        R1, R2 = radii( lat )
+        ex = self.kx / ( R2 * np.cos( lat ) ) - 1
+        ey = self.ky / R1 - 1
+        return ex, ey
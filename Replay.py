@@ -0,0 +1,225 @@
+#
+# Replay.py
+#
+# Fast-time replay of recorded traffic (see TrackStore.py). The replay
+# walks the recording on a fixed clock: at each tick, every aircraft
+# reported within the last max_age seconds is extrapolated in straight line
+# from its last report to the time of the tick (see Destination.py), and
+# the traffic picture goes through Scene detection and resolution. The
+# conflicts of every tick are reported as Conflict records, in time order.
+#
+# The ticks are cut in windows. A window only needs the reports from
+# max_age before its first tick to its last tick, so windows are
+# independent: with several workers, a pool of processes replays them, each
+# worker reading its window from the store file. At most two windows per
+# worker are in flight and results are returned in time order, so memory
+# is bounded by the window length, not by the length of the recording.
+#
+# D [nm]   : Horizontal separation
+# H [feet] : Vertical separation
+# T [sec]  : Lookahead time
+#
+# BASIC USAGE:
+#   engine = ReplayEngine(D,H,T)
+#   engine.set_period(5)
+#   with open('conflicts.csv','w') as f :
+#     write_conflicts(engine.run(store,start,stop,workers),f)
+#   print(engine.throughput(), "aircraft-ticks/sec")
+#
+# Counters (over all runs)
+# --------
+# ticks          : Number of ticks replayed
+# aircraft_ticks : Number of aircraft in the traffic pictures of those ticks
+# elapsed [sec]  : Wall time of the runs
+#
+
+import math
+import time
+import numpy as np
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .Util import knots2msec
+from .Destination import SPHERICAL, destination_array
+from .Scene import Scene
+from .TrackStore import TrackStore
+
+
+__all__ = [ 'Conflict', 'replay_window', 'write_conflicts', 'ReplayEngine' ]
+
+
+# One conflict of one tick. time2los and duration are relative to the tick;
+# the resolution is that of Scene.resolution.
+Conflict = namedtuple( 'Conflict', [ 'time', 'own', 'intruder', 'time2los', 'duration',
+                                     'recovery', 'newtrk', 'newgs', 'opttrk', 'optgs', 'newvs' ] )
+
+
+# replay_window: Conflicts of the ticks (sorted times [sec]) of the store on
+# path. Runs in the worker processes.
+#
+# OUTPUTS: conflicts,aircraft (number of aircraft-ticks)
+#
+def replay_window( path, D, H, T, max_age, tier, ticks ) :
+    store = TrackStore( path )
+    t, ids, lat, lon, alt, trk, gs, vs = store.slice( ticks[0] - max_age, np.nextafter( ticks[-1], np.inf ) )
+    t = np.asarray( t )
+    scene = Scene( D, H, T )
+    conflicts = []
+    aircraft = 0
+    for tick in ticks.tolist() :
+        lo = np.searchsorted( t, tick - max_age, side='left' )
+        hi = np.searchsorted( t, tick, side='right' )
+        # Last report of each aircraft: rows are sorted by time
+        picture, last = np.unique( ids[lo:hi][::-1], return_index=True )
+        rows = hi - 1 - last
+        aircraft += rows.size
+        if rows.size < 2 :
+            continue
+
+        age = tick - t[rows]
+        x, y = destination_array( lat[rows], lon[rows], knots2msec( gs[rows].astype( float ) ) * age, trk[rows], tier )
+        z = alt[rows] + vs[rows] / 60.0 * age
+        scene.set_traffic( x, y, z, trk[rows], gs[rows], vs[rows], picture, True )
+        if scene.detection() :
+            scene.resolution()
+            columns = ( scene.own, scene.intruder, scene.time2los, scene.duration, scene.recovery,
+                        scene.newtrk, scene.newgs, scene.opttrk, scene.optgs, scene.newvs )
+            conflicts += [ Conflict( tick, *values ) for values in zip( *( c.tolist() for c in columns ) ) ]
+    return conflicts, aircraft
+
+
+# write_conflicts: Writes the conflicts to the text file f as CSV, one line
+# per conflict, as they come
+#
+# OUTPUTS: number of conflicts
+#
+def write_conflicts( conflicts, f ) :
+    f.write( ','.join( Conflict._fields ) + '\n' )
+    count = 0
+    for c in conflicts :
+        f.write( '%r,%d,%d,%r,%r,%d,%r,%r,%r,%r,%r\n' % c )
+        count += 1
+    return count
+
+
+
+class ReplayEngine :
+
+
+    def __init__( self, D, H, T ) :
+
+        self.D = D
+        self.H = H
+        self.T = T
+
+        self.period = 5.0
+        self.max_age = 30.0
+        self.window = 600.0
+        self.tier = SPHERICAL
+        self.clear_counters()
+
+
+    def clear_counters( self ) :
+        self.ticks = 0
+        self.aircraft_ticks = 0
+        self.elapsed = 0.0
+
+
+    def set_DHT( self, D, H, T ) :
+        self.D = D
+        self.H = H
+        self.T = T
+
+
+    # Time between ticks [sec]
+    def set_period( self, period ) :
+        self.period = period
+
+
+    def get_period( self ) :
+        return self.period
+
+
+    # Aircraft whose last report is older than max_age [sec] are dropped
+    def set_max_age( self, max_age ) :
+        self.max_age = max_age
+
+
+    def get_max_age( self ) :
+        return self.max_age
+
+
+    # Length of the windows of ticks replayed by one task [sec]
+    def set_window( self, window ) :
+        self.window = window
+
+
+    def get_window( self ) :
+        return self.window
+
+
+    # Accuracy tier of the extrapolation (see Destination.py)
+    def set_tier( self, tier ) :
+        self.tier = tier
+
+
+    def get_tier( self ) :
+        return self.tier
+
+
+    # Aircraft-ticks per second of wall time
+    def throughput( self ) :
+        return self.aircraft_ticks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+    # windows: Times of the ticks from start to stop (included), by window
+    def windows( self, start, stop ) :
+        count = int( math.floor( ( stop - start ) / self.period ) ) + 1 if stop >= start else 0
+        size = max( 1, int( round( self.window / self.period ) ) )
+        for first in range( 0, count, size ) :
+            yield start + self.period * np.arange( first, min( first + size, count ) )
+
+
+    # run: Conflicts of every tick from start to stop [sec] (by default, the
+    # time range of the store), in time order. store is a TrackStore or the
+    # path of one. With more than one worker, windows are replayed by a pool
+    # of worker processes.
+    def run( self, store, start=None, stop=None, workers=1 ) :
+        if not isinstance( store, TrackStore ) :
+            store = TrackStore( store )
+        first, last = store.time_range()
+        start = first if start is None else start
+        stop = last if stop is None else stop
+        tasks = ( ( store.path, self.D, self.H, self.T, self.max_age, self.tier, ticks )
+                  for ticks in self.windows( start, stop ) )
+
+        begin = time.perf_counter()
+        elapsed = self.elapsed
+        if workers <= 1 :
+            results = ( ( task[-1], replay_window( *task ) ) for task in tasks )
+            yield from self.collect( results, begin, elapsed )
+        else :
+            with ProcessPoolExecutor( max_workers=workers ) as pool :
+                yield from self.collect( in_order( pool, tasks, 2 * workers ), begin, elapsed )
+
+
+    def collect( self, results, begin, elapsed ) :
+        for ticks, ( conflicts, aircraft ) in results :
+            self.ticks += ticks.size
+            self.aircraft_ticks += aircraft
+            self.elapsed = elapsed + time.perf_counter() - begin
+            yield from conflicts
+
+
+
+# in_order: Results of replay_window on the tasks, in task order, with at
+# most depth tasks submitted and not yet returned
+def in_order( pool, tasks, depth ) :
+    pending = deque()
+    for task in tasks :
+        pending.append( ( task[-1], pool.submit( replay_window, *task ) ) )
+        if len( pending ) >= depth :
+            ticks, future = pending.popleft()
+            yield ticks, future.result()
+    while pending :
+        ticks, future = pending.popleft()
+        yield ticks, future.result()
@@ -0,0 +1,135 @@
+#
+# Resolver.py
+#
+# Multi-intruder resolution. KB3D solves one ownship against one intruder:
+# a maneuver that solves one conflict may create a conflict with a third
+# aircraft. Resolver runs KB3D against every intruder in conflict with the
+# ownship, then checks every proposed maneuver against the whole traffic in
+# one batched detection (see Bands.conflict_candidates), and keeps only the
+# maneuvers that are conflict free with every aircraft.
+#
+# Maneuvers
+# ---------
+# - TRACK        : KB3D track only, ground and vertical speeds kept
+# - GROUND_SPEED : KB3D ground speed only, track and vertical speed kept
+# - OPTIMAL      : KB3D optimal track and ground speed, vertical speed kept
+# - VERTICAL     : KB3D vertical speed only, track and ground speed kept
+#
+# State information for each aircraft is given as in CDR (see Bands.py).
+#
+# BASIC USAGE:
+#   resolver = Resolver(D,H,T,gxy)
+#   resolver.set_ownship(x,y,alt,trk,gs,vs)
+#   resolver.set_traffic(x,y,alt,trk,gs,vs,ids)   // arrays, one element per aircraft
+#   for kind, intruder, trk, gs, vs in resolver.resolution() :
+#     ...
+#
+# Output class variables
+# ----------------------
+# conflicts : ids of the aircraft in conflict with the ownship
+# proposed  : Number of maneuvers proposed by KB3D
+# maneuvers : Conflict free maneuvers, (kind,intruder,trk [deg],gs [knots],
+#             vs [feet/min]) tuples, intruder being the id of the aircraft
+#             whose conflict KB3D solved, sorted by intruder then kind
+#
+
+import numpy as np
+from .Constants import NaR
+from .Util import msec2ftmin, msec2knots, rad2deg_array, to360_array, velocity
+from .CD3DBatch import cd3d_batch
+from .KB3DBatch import KB3DBatch
+from .Bands import Bands, conflict_candidates
+
+
+__all__ = [ 'TRACK', 'GROUND_SPEED', 'OPTIMAL', 'VERTICAL', 'MANEUVERS', 'Resolver' ]
+
+
+TRACK        = 'track'
+GROUND_SPEED = 'gs'
+OPTIMAL      = 'optimal'
+VERTICAL     = 'vertical'
+
+MANEUVERS = ( TRACK, GROUND_SPEED, OPTIMAL, VERTICAL )
+
+
+
+class Resolver( Bands ) :
+
+
+    def __init__( self, D, H, T, gxy=False ) :
+        Bands.__init__( self, D, H, T, gxy )
+        self.ids = np.zeros( 0, dtype=np.int64 )
+        self.clear_outputs()
+
+
+    def clear_outputs( self ) :
+        self.conflicts = []
+        self.proposed = 0
+        self.maneuvers = []
+
+
+    # set_traffic: Traffic aircraft, one element per aircraft. ids default
+    # to 0..N-1.
+    def set_traffic( self, x, y, alt, trk, gs, vs, ids=None ) :
+        Bands.set_traffic( self, x, y, alt, trk, gs, vs )
+        n = self.traffic[0].size
+        self.ids = np.arange( n ) if ids is None else np.atleast_1d( np.asarray( ids ) )
+        self.clear_outputs()
+
+
+    # proposals: KB3D maneuvers against the intruders in conflict with the
+    # ownship, as ownship velocities
+    #
+    # OUTPUTS: kind,intruder (row),vx,vy,vz
+    #
+    def proposals( self, relative ) :
+        sx, sy, sz, vix, viy, viz = relative
+        vox, voy, voz = ( np.float64( v ) for v in velocity( *self.own[3:] ) )
+        conflict = cd3d_batch( self.d, self.h, self.t, self.filter, sx, sy, sz, vox - vix, voy - viy, voz - viz )[0]
+        rows = np.flatnonzero( conflict )
+        self.conflicts = self.ids[rows].tolist()
+
+        cr = KB3DBatch( self.d, self.h, self.t )
+        cr.kb3d( sx[rows], sy[rows], sz[rows], vox, voy, voz, vix[rows], viy[rows], viz[rows] )
+
+        own_gs = np.hypot( vox, voy )
+        solutions = {
+            TRACK        : ( cr.trk != NaR, own_gs * np.sin( cr.trk ), own_gs * np.cos( cr.trk ), voz ),
+            GROUND_SPEED : ( cr.gs != NaR, cr.gs * vox / own_gs, cr.gs * voy / own_gs, voz ),
+            OPTIMAL      : ( cr.opt_trk != NaR, cr.opt_gs * np.sin( cr.opt_trk ), cr.opt_gs * np.cos( cr.opt_trk ), voz ),
+            VERTICAL     : ( cr.vs != NaR, vox, voy, cr.vs ) }
+
+        kinds, intruders, vx, vy, vz = [], [], [], [], []
+        for kind in MANEUVERS :
+            solved, kvx, kvy, kvz = ( np.broadcast_to( v, rows.shape ) for v in solutions[kind] )
+            kinds += [ kind ] * int( solved.sum() )
+            intruders.append( rows[solved] )
+            vx.append( kvx[solved] )
+            vy.append( kvy[solved] )
+            vz.append( kvz[solved] )
+        return kinds, np.concatenate( intruders ), np.concatenate( vx ), np.concatenate( vy ), np.concatenate( vz )
+
+
+    # resolution: Maneuvers of the ownship that solve the conflict with one
+    # intruder and are conflict free with all the traffic
+    #
+    # OUTPUTS: list of (kind,intruder,trk [deg],gs [knots],vs [feet/min])
+    #
+    def resolution( self ) :
+        self.clear_outputs()
+        relative = self.relative()
+        kinds, rows, vx, vy, vz = self.proposals( relative )
+        self.proposed = len( kinds )
+        if not kinds :
+            return self.maneuvers
+
+        sx, sy, sz, vix, viy, viz = relative
+        free = ~conflict_candidates( self.d, self.h, self.t, self.filter, sx, sy, sz, vx, vy, vz, vix, viy, viz )
+
+        trk = to360_array( rad2deg_array( np.arctan2( vx, vy ) ) )
+        gs = msec2knots( np.hypot( vx, vy ) )
+        vs = msec2ftmin( vz )
+        order = sorted( np.flatnonzero( free ).tolist(), key=lambda k : ( rows[k], MANEUVERS.index( kinds[k] ) ) )
+        self.maneuvers = [ ( kinds[k], self.ids[rows[k]].item(), float( trk[k] ), float( gs[k] ), float( vs[k] ) )
+                           for k in order ]
+        return self.maneuvers
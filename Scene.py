@@ -0,0 +1,446 @@
+#
+# Scene.py
+#
+# All-pairs conflict detection for a traffic picture of N aircraft.
+#
+# Candidate pairs are pruned with a uniform grid whose cell size is the
+# reachable distance D + T*(maximum closing speed). Two aircraft that are
+# further apart than this distance cannot lose horizontal separation within
+# the lookahead time, so pruning never drops a pair that cd3d would report:
+# detection() returns exactly the conflicts of brute_force(). Within
+# neighbouring cells, only aircraft whose altitude band ranges overlap are
+# paired (see Index.AltitudeBands): the others cannot lose vertical
+# separation within the lookahead time either. The pairs found are then
+# screened with the per-pair bounds of Screen.py before cd3d runs on them.
+#
+# State information for each aircraft is given as in CDR:
+# x, y, alt [feet], trk [deg], gs [knots], vs [feet/min]
+# where x, y are lat [deg], lon [deg] for geodesic coordinates (gxy) and
+# x [nm], y [nm] otherwise. Geodesic positions are projected once per call
+# to set_traffic into a shared tangent plane (see Projection.py), centred
+# on the picture unless a reference is set on scene.plane.
+#
+# D [nm]   : Horizontal separation
+# H [feet] : Vertical separation
+# T [sec]  : Lookahead time
+#
+# BASIC USAGE:
+#   scene = Scene(D,H,T)
+#   scene.set_traffic(x,y,alt,trk,gs,vs,ids,gxy)  // or scene.set_fleet(fleet)
+#   for own, intruder in scene.detection() :
+#     ...
+#   scene.resolution()       // or scene.pair_resolution()
+#   scene.sweep(Ds,Hs,Ts)    // conflicts for many settings at once
+#
+# candidates : Number of pairs found in neighbouring cells by the last detection
+# screened   : Number of those pairs kept and removed by each screening
+#              bound, indexed as Screen.BOUNDS
+#
+# Output class variables (one element per conflicting pair, sorted by
+# ownship index then intruder index; ownship is the first aircraft of the
+# pair in traffic order)
+# ----------------------
+# own, intruder : Aircraft ids
+# time2los, time2lhs, time2lvs, duration, t_in, t_out [sec]
+# recovery, newtrk [deg], newgs [knots], opttrk [deg], optgs [knots],
+# newvs [feet/min] : Set by resolution(), as in CDR
+# recovery_i, newtrk_i, newgs_i, opttrk_i, optgs_i, newvs_i : Resolutions
+#              of the intruders, set by pair_resolution() with the ownship
+#              resolutions in one pass (see KB3DBatch.kb3d_pair)
+#
+# Set by sweep() (one row per pair in conflict for at least one setting,
+# one column per setting)
+# --------------
+# sweep_own, sweep_intruder : Aircraft ids
+# sweep_conflict, sweep_time2los [sec], sweep_duration [sec]
+#
+
+import numpy as np
+from .Constants import NaR
+from .Util import ( ft2m, m2ft, m2nm, max, min, msec2ftmin, msec2knots, nm2m,
+                    rad2deg_array, sq, velocity_array )
+from .LoS import vertical_recovery_array
+from .Index import UniformGrid, AltitudeBands
+from .Projection import TangentPlane
+from .CD3D import violation
+from .CD3DBatch import cd3d_batch, cd3d_sweep
+from .KB3DBatch import KB3DBatch
+from .Screen import BOUNDS, screen_block
+
+
+__all__ = [ 'CHUNK', 'detect_block', 'advisories', 'resolve_block', 'resolve_pair_block', 'Scene' ]
+
+
+# Number of pairs sent to cd3d_batch at once
+CHUNK = 1 << 20
+
+
+# detect_block: Runs cd3d on the index pairs (a,b) of the aircraft states
+# x,y,z [m] and vx,vy,vz [m/s], and keeps the conflicting pairs
+#
+# OUTPUTS: a,b,t_in,t_out,time2los,time2lhs,time2lvs,duration
+#
+def detect_block( d, h, t, filter, states, a, b ) :
+    x, y, z, vx, vy, vz = states
+    result = cd3d_batch( d, h, t, filter,
+                         x[a] - x[b], y[a] - y[b], z[a] - z[b],
+                         vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b] )
+    conflict = result[0]
+    return ( a[conflict], b[conflict] ) + tuple( r[conflict] for r in result[1:] )
+
+
+# advisories: KB3D resolutions [m/s, rad] in CDR units. Pairs in violation
+# get the vertical recovery speed recovery_vs [m/s] (recovery = -1).
+#
+# OUTPUTS: recovery,newtrk,newgs,opttrk,optgs,newvs
+#
+def advisories( violation, recovery_vs, trk, gs, opt_trk, opt_gs, vs ) :
+    newtrk = np.where( ~violation & ( trk != NaR ), rad2deg_array( trk ), NaR )
+    newgs  = np.where( ~violation & ( gs != NaR ), msec2knots( gs ), NaR )
+    opttrk = np.where( ~violation & ( opt_trk != NaR ), rad2deg_array( opt_trk ), NaR )
+    optgs  = np.where( ~violation & ( opt_trk != NaR ), msec2knots( opt_gs ), NaR )
+    newvs  = np.where( ~violation & ( vs != NaR ), msec2ftmin( vs ), NaR )
+
+    solved = ( newtrk != NaR ) | ( newgs != NaR ) | ( opttrk != NaR ) | ( newvs != NaR )
+    newvs = np.where( violation, msec2ftmin( recovery_vs ), newvs )
+    recovery = np.where( violation, -1, np.where( solved, 1, 0 ) )
+    return recovery, newtrk, newgs, opttrk, optgs, newvs
+
+
+# resolve_block: KB3D resolutions of the conflicting index pairs (a,b), in
+# CDR units, as in CDR.resolution. Pairs in violation get a vertical
+# recovery speed (recovery = -1), computed with their entry time t_in.
+#
+# OUTPUTS: recovery,newtrk,newgs,opttrk,optgs,newvs
+#
+def resolve_block( d, h, t, states, a, b, t_in ) :
+    x, y, z, vx, vy, vz = states
+    sx, sy, sz = x[a] - x[b], y[a] - y[b], z[a] - z[b]
+    vox, voy, voz = vx[a], vy[a], vz[a]
+    vix, viy, viz = vx[b], vy[b], vz[b]
+
+    cr = KB3DBatch( d, h, t )
+    cr.kb3d( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+    return advisories( cr.cd3d.violation( sx, sy, sz ),
+                       vertical_recovery_array( sx, sy, sz, voz, viz, h, np.abs( t_in ) ),
+                       cr.trk, cr.gs, cr.opt_trk, cr.opt_gs, cr.vs )
+
+
+# resolve_pair_block: KB3D resolutions of both aircraft of the conflicting
+# index pairs (a,b), as resolve_block on (a,b) and on (b,a), in one pass
+#
+# OUTPUTS: advisories of the a aircraft, advisories of the b aircraft
+#
+def resolve_pair_block( d, h, t, states, a, b, t_in ) :
+    x, y, z, vx, vy, vz = states
+    sx, sy, sz = x[a] - x[b], y[a] - y[b], z[a] - z[b]
+    vox, voy, voz = vx[a], vy[a], vz[a]
+    vix, viy, viz = vx[b], vy[b], vz[b]
+
+    cr = KB3DBatch( d, h, t )
+    cr.kb3d_pair( sx, sy, sz, vox, voy, voz, vix, viy, viz )
+    violation = cr.cd3d.violation( sx, sy, sz )
+    t_in = np.abs( t_in )
+    return ( advisories( violation, vertical_recovery_array( sx, sy, sz, voz, viz, h, t_in ),
+                         cr.trk, cr.gs, cr.opt_trk, cr.opt_gs, cr.vs ),
+             advisories( violation, vertical_recovery_array( -sx, -sy, -sz, viz, voz, h, t_in ),
+                         cr.trk_i, cr.gs_i, cr.opt_trk_i, cr.opt_gs_i, cr.vs_i ) )
+
+
+class Scene :
+
+
+    def __init__( self, D, H, T ) :
+
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+        self.filter = 1
+
+        self.ids = np.zeros( 0, dtype=np.int64 )
+        self.x   = np.zeros( 0 )
+        self.y   = np.zeros( 0 )
+        self.z   = np.zeros( 0 )
+        self.vx  = np.zeros( 0 )
+        self.vy  = np.zeros( 0 )
+        self.vz  = np.zeros( 0 )
+
+        self.gxy = False
+        self.plane = TangentPlane()
+        self.fixed_reference = False
+
+        self.grid = UniformGrid( 1 )
+        self.bands = AltitudeBands( self.h, self.t )
+        self.candidates = 0
+        self.screened = np.zeros( len( BOUNDS ), dtype=np.int64 )
+        self.clear_conflicts()
+        self.clear_sweep()
+
+
+    def clear_conflicts( self ) :
+        self.own_rows = np.zeros( 0, dtype=np.int64 )
+        self.intruder_rows = np.zeros( 0, dtype=np.int64 )
+        self.own = self.ids[:0]
+        self.intruder = self.ids[:0]
+        self.time2los = np.zeros( 0 )
+        self.time2lhs = np.zeros( 0 )
+        self.time2lvs = np.zeros( 0 )
+        self.duration = np.zeros( 0 )
+        self.t_in = np.zeros( 0 )
+        self.t_out = np.zeros( 0 )
+
+        self.recovery = np.zeros( 0, dtype=int )
+        self.newtrk = np.zeros( 0 )
+        self.newgs = np.zeros( 0 )
+        self.newvs = np.zeros( 0 )
+        self.opttrk = np.zeros( 0 )
+        self.optgs = np.zeros( 0 )
+
+        self.recovery_i = np.zeros( 0, dtype=int )
+        self.newtrk_i = np.zeros( 0 )
+        self.newgs_i = np.zeros( 0 )
+        self.newvs_i = np.zeros( 0 )
+        self.opttrk_i = np.zeros( 0 )
+        self.optgs_i = np.zeros( 0 )
+
+
+    def clear_sweep( self ) :
+        self.sweep_own = self.ids[:0]
+        self.sweep_intruder = self.ids[:0]
+        self.sweep_conflict = np.zeros( ( 0, 0 ), dtype=bool )
+        self.sweep_time2los = np.zeros( ( 0, 0 ) )
+        self.sweep_duration = np.zeros( ( 0, 0 ) )
+
+
+    # set_traffic: Replaces the traffic picture. ids default to 0..N-1.
+    def set_traffic( self, x, y, alt, trk, gs, vs, ids=None, gxy=False ) :
+        x = np.asarray( x, dtype=float )
+        ids = np.arange( x.size ) if ids is None else np.asarray( ids )
+        self.load( ids, x, y, alt, *velocity_array( trk, gs, vs ), gxy )
+
+
+    # set_fleet: Uses the aircraft of a Fleet table as traffic picture. The
+    # velocities already converted by the fleet are used as they are.
+    def set_fleet( self, fleet ) :
+        t = fleet.table
+        self.load( t['id'], t['x'], t['y'], t['alt'], t['vx'], t['vy'], t['vz'], fleet.gxy )
+
+
+    # load: Positions in CDR units and velocities [m/s]
+    def load( self, ids, x, y, alt, vx, vy, vz, gxy ) :
+
+        x = np.asarray( x, dtype=float )
+        y = np.asarray( y, dtype=float )
+        self.ids = ids
+        self.gxy = gxy
+
+        if gxy :
+            if not self.fixed_reference :
+                self.plane.centre( x, y )
+            self.x, self.y = self.plane.geo2xy( x, y )
+        else :
+            self.x = nm2m( x )
+            self.y = nm2m( y )
+
+        self.z  = ft2m( np.asarray( alt, dtype=float ) )
+        self.vx = np.asarray( vx, dtype=float )
+        self.vy = np.asarray( vy, dtype=float )
+        self.vz = np.asarray( vz, dtype=float )
+        self.clear_conflicts()
+        self.clear_sweep()
+
+
+    # set_reference: Fixes the origin of the tangent plane used for geodesic
+    # coordinates [deg,deg]. By default it follows the centre of the picture.
+    def set_reference( self, latdeg0, londeg0 ) :
+        self.plane.set_reference( latdeg0, londeg0 )
+        self.fixed_reference = True
+
+
+    def size( self ) :
+        return self.ids.size
+
+
+    def set_DHT( self, D, H, T ) :
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+        self.bands.set_HT( self.h, self.t )
+
+
+    def get_D( self ) :
+        return m2nm( self.d )
+
+
+    def get_H( self ) :
+        return m2ft( self.h )
+
+
+    def get_T( self ) :
+        return self.t
+
+
+    def set_detection_filter( self, f ) :
+        self.filter = f
+
+
+    def get_detection_filter( self ) :
+        return self.filter
+
+
+    # Upper bound of the horizontal closing speed of any pair [m/s]
+    def max_closing_speed( self ) :
+        if self.size() < 2 :
+            return 0
+        fastest = 2 * np.sqrt( np.max( sq(self.vx) + sq(self.vy) ) )
+        spread  = np.hypot( np.ptp( self.vx ), np.ptp( self.vy ) )
+        return float( min( fastest, spread ) )
+
+
+    # Horizontal distance within which a conflict in [0,T] is possible [m].
+    # The small relative margin covers rounding in the grid binning.
+    def reach( self ) :
+        return ( self.d + self.t * self.max_closing_speed() ) * ( 1 + 1e-9 ) + 1
+
+
+    # candidate_pairs: Index pairs (i,j), i < j, that may be in conflict
+    #
+    # OUTPUTS: i,j
+    #
+    def candidate_pairs( self ) :
+        self.grid.set_cell( self.reach() )
+        self.bands.build( self.z, self.vz )
+        self.grid.build( self.x, self.y, self.bands.lo, self.bands.hi )
+        i, j = self.grid.candidate_pairs()
+        self.candidates = i.size
+        return i, j
+
+
+    # screen_pairs: Index pairs among (i,j) that pass the screening bounds.
+    # The number of pairs per outcome is kept in self.screened.
+    #
+    # OUTPUTS: i,j
+    #
+    def screen_pairs( self, i, j ) :
+        self.screened = np.zeros( len( BOUNDS ), dtype=np.int64 )
+        a, b = [ i[:0] ], [ j[:0] ]
+        for start in range( 0, i.size, CHUNK ) :
+            ka, kb, counts = screen_block( self.d, self.h, self.t, self.states(),
+                                           i[start:start + CHUNK], j[start:start + CHUNK] )
+            a.append( ka )
+            b.append( kb )
+            self.screened += counts
+        return np.concatenate( a ), np.concatenate( b )
+
+
+    # States of the aircraft: x,y,z [m] and vx,vy,vz [m/s]
+    def states( self ) :
+        return self.x, self.y, self.z, self.vx, self.vy, self.vz
+
+
+    # Runs cd3d on the index pairs (a,b) and keeps the conflicting ones
+    def conflicts_of( self, a, b ) :
+        return detect_block( self.d, self.h, self.t, self.filter, self.states(), a, b )
+
+
+    # Stores the conflicts found, chunk by chunk, in the output variables
+    def store_conflicts( self, found ) :
+        self.clear_conflicts()
+        if found :
+            columns = [ np.concatenate( c ) for c in zip( *found ) ]
+            self.own_rows, self.intruder_rows = columns[0], columns[1]
+            self.own = self.ids[self.own_rows]
+            self.intruder = self.ids[self.intruder_rows]
+            ( self.t_in, self.t_out, self.time2los, self.time2lhs,
+              self.time2lvs, self.duration ) = columns[2:]
+        return list( zip( self.own.tolist(), self.intruder.tolist() ) )
+
+
+    # detect_pairs: Conflicting pairs among the index pairs (i,j)
+    def detect_pairs( self, i, j ) :
+        found = [ self.conflicts_of( i[start:start + CHUNK], j[start:start + CHUNK] )
+                  for start in range( 0, i.size, CHUNK ) ]
+        return self.store_conflicts( found )
+
+
+    # detection: All conflicting pairs, using the grid and the screening
+    # bounds to prune candidates
+    def detection( self ) :
+        i, j = self.screen_pairs( *self.candidate_pairs() )
+        return self.detect_pairs( i, j )
+
+
+    # brute_force: All conflicting pairs, testing every pair of aircraft.
+    # Reference for detection().
+    def brute_force( self ) :
+        n = self.size()
+        rows = max( 1, CHUNK // max( n, 1 ) )
+        found = []
+        for start in range( 0, n, rows ) :
+            stop = min( start + rows, n )
+            i = np.repeat( np.arange( start, stop ), n )
+            j = np.tile( np.arange( n ), stop - start )
+            keep = j > i
+            found.append( self.conflicts_of( i[keep], j[keep] ) )
+        return self.store_conflicts( found )
+
+
+    # resolution: KB3D resolutions of the conflicts found by the last
+    # detection, in CDR units, as in CDR.resolution. Pairs in violation get
+    # a vertical recovery speed (recovery = -1).
+    #
+    # OUTPUTS: recovery,newtrk,newgs,opttrk,optgs,newvs
+    #
+    def resolution( self ) :
+        ( self.recovery, self.newtrk, self.newgs, self.opttrk, self.optgs,
+          self.newvs ) = resolve_block( self.d, self.h, self.t, self.states(), self.own_rows, self.intruder_rows, self.t_in )
+
+
+    # pair_resolution: As resolution, with the KB3D resolutions of the
+    # intruders of the conflicts, computed in the same pass
+    #
+    # OUTPUTS: recovery,newtrk,newgs,opttrk,optgs,newvs and
+    #          recovery_i,newtrk_i,newgs_i,opttrk_i,optgs_i,newvs_i
+    #
+    def pair_resolution( self ) :
+        own, intruder = resolve_pair_block( self.d, self.h, self.t, self.states(),
+                                            self.own_rows, self.intruder_rows, self.t_in )
+        self.recovery, self.newtrk, self.newgs, self.opttrk, self.optgs, self.newvs = own
+        ( self.recovery_i, self.newtrk_i, self.newgs_i, self.opttrk_i, self.optgs_i,
+          self.newvs_i ) = intruder
+
+
+    # sweep: Conflicts of the traffic for K settings D [nm], H [feet], T [sec]
+    # (arrays of K values, or scalars) in one pass (see CD3DBatch.cd3d_sweep).
+    # The grid and the screening bounds only widen with D, H and T: the pairs
+    # pruned for the largest values are pruned for every setting. Pairs in
+    # conflict for none of the settings are left out. The settings of the
+    # scene are unchanged.
+    #
+    # OUTPUTS: conflict (pairs x settings), also in sweep_conflict
+    #
+    def sweep( self, D, H, T ) :
+        D, H, T = np.broadcast_arrays( *[ np.atleast_1d( np.asarray( a, dtype=float ) ) for a in ( D, H, T ) ] )
+        d, h = nm2m( D ), ft2m( H )
+        setting = self.d, self.h, self.t
+        self.d, self.h, self.t = float( d.max() ), float( h.max() ), float( T.max() )
+        self.bands.set_HT( self.h, self.t )
+        try :
+            i, j = self.screen_pairs( *self.candidate_pairs() ) if self.size() > 1 else ( self.own_rows[:0], self.own_rows[:0] )
+        finally :
+            self.d, self.h, self.t = setting
+            self.bands.set_HT( self.h, self.t )
+
+        x, y, z, vx, vy, vz = self.states()
+        rows = max( 1, CHUNK // D.size )
+        found = [ ( i[:0], j[:0], np.zeros( ( 0, D.size ), dtype=bool ), np.zeros( ( 0, D.size ) ), np.zeros( ( 0, D.size ) ) ) ]
+        for start in range( 0, i.size, rows ) :
+            a, b = i[start:start + rows], j[start:start + rows]
+            conflict, _, _, time2los, _, _, duration = cd3d_sweep( d, h, T, self.filter,
+                x[a] - x[b], y[a] - y[b], z[a] - z[b], vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b] )
+            keep = conflict.any( axis=1 )
+            found.append( ( a[keep], b[keep], conflict[keep], time2los[keep], duration[keep] ) )
+        a, b, self.sweep_conflict, self.sweep_time2los, self.sweep_duration = [ np.concatenate( c ) for c in zip( *found ) ]
+        self.sweep_own = self.ids[a]
+        self.sweep_intruder = self.ids[b]
+        return self.sweep_conflict
@@ -0,0 +1,145 @@
+#
+# Scheduler.py
+#
+# Resolution of the conflicts of a tick in order of urgency, within a time
+# budget.
+#
+# ResolutionScheduler keeps the detected conflicts (CDR objects whose
+# detection found a conflict) in a heap: pairs in violation first, then by
+# increasing time to loss of separation. resolve() runs CDR.resolution on
+# the most urgent conflict first (vertical recovery for violations, see
+# LoS.vertical_recovery) and stops before the deadline of the tick: a
+# resolution is started only when the running estimate of its cost fits in
+# the time left. The most urgent conflict is resolved whenever the deadline
+# is not reached yet, whatever the estimate: a slow resolution that pushed
+# the estimate above the budget cannot stall the queue, and the measured
+# cost of the next resolutions brings it back down. The conflicts left are reported as deferred and stay in the
+# queue for the next tick; pushing a pair again replaces its conflict. The
+# replaced entries are dropped from the heap when they outnumber the live
+# ones, so the heap stays bounded under sustained overload.
+#
+# BASIC USAGE:
+#   scheduler = ResolutionScheduler(budget)     // seconds per tick
+#   for own, intruder, cdr in conflicts :       // cdr.detection() is True
+#     scheduler.push(own,intruder,cdr)
+#   for own, intruder, cdr in scheduler.resolve() :
+#     ...
+#   scheduler.deferred                          // (own,intruder), most urgent first
+#
+# Counters (over all ticks)
+# --------
+# ticks, resolved, deferred_total : Calls to resolve, conflicts resolved and
+#                                   conflicts deferred
+# cost [sec] : Running estimate of the time of one resolution
+#
+
+import heapq
+import itertools
+import time
+
+
+__all__ = [ 'ResolutionScheduler' ]
+
+
+# Weight of the last resolution in the running estimate of the cost
+SMOOTHING = 0.1
+
+
+
+class ResolutionScheduler :
+
+
+    def __init__( self, budget=0.005 ) :
+
+        self.budget = budget
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.cost = 0.0
+        self.deferred = []
+        self.ticks = 0
+        self.resolved = 0
+        self.deferred_total = 0
+
+
+    # Time available for the resolutions of a tick [sec]
+    def set_budget( self, budget ) :
+        self.budget = budget
+
+
+    def get_budget( self ) :
+        return self.budget
+
+
+    def __len__( self ) :
+        return len( self.entries )
+
+
+    # Empties the queue
+    def clear( self ) :
+        self.heap = []
+        self.entries = {}
+        self.deferred = []
+
+
+    # push: Adds the conflict of the pair (own,intruder), replacing the one
+    # already queued for the pair. detection() must have been called on cdr.
+    def push( self, own, intruder, cdr ) :
+        self.discard( own, intruder )
+        entry = [ 0 if cdr.violation() else 1, cdr.time2los, next( self.counter ), ( own, intruder ), cdr ]
+        self.entries[( own, intruder )] = entry
+        heapq.heappush( self.heap, entry )
+
+
+    # discard: Removes the conflict of the pair, if queued
+    def discard( self, own, intruder ) :
+        entry = self.entries.pop( ( own, intruder ), None )
+        if entry is not None :
+            entry[-1] = None
+
+
+    # pop: Most urgent conflict, removed from the queue
+    #
+    # OUTPUTS: own,intruder,cdr
+    #
+    def pop( self ) :
+        while self.heap :
+            entry = heapq.heappop( self.heap )
+            if entry[-1] is not None :
+                del self.entries[entry[3]]
+                return entry[3] + ( entry[-1], )
+        raise IndexError( "pop from an empty scheduler" )
+
+
+    # compact: Rebuilds the heap from the live entries
+    def compact( self ) :
+        self.heap = list( self.entries.values() )
+        heapq.heapify( self.heap )
+
+
+    # resolve: Resolves the most urgent conflicts until the deadline
+    # (time.perf_counter() value; by default the budget from now)
+    #
+    # OUTPUTS: list of (own,intruder,cdr) resolved, most urgent first
+    #
+    def resolve( self, deadline=None ) :
+        if len( self.heap ) > 2 * len( self.entries ) :
+            self.compact()
+        start = time.perf_counter()
+        deadline = start + self.budget if deadline is None else deadline
+        resolved = []
+        while self.entries :
+            now = time.perf_counter()
+            if now >= deadline or ( resolved and now + self.cost >= deadline ) :
+                break
+            own, intruder, cdr = self.pop()
+            cdr.resolution()
+            spent = time.perf_counter() - now
+            self.cost = spent if self.cost == 0 else ( 1 - SMOOTHING ) * self.cost + SMOOTHING * spent
+            resolved.append( ( own, intruder, cdr ) )
+
+        self.deferred = [ entry[3] for entry in sorted( self.entries.values() ) ]
+        self.ticks += 1
+        self.resolved += len( resolved )
+        self.deferred_total += len( self.deferred )
+        return resolved
@@ -0,0 +1,98 @@
+#
+# Screen.py
+#
+# Conservative screening of pairs before CD3D. A pair is removed only when
+# one of the bounds below proves that cd3d cannot report a conflict for it,
+# whatever the detection filter: screening never drops a conflict.
+#
+# cd3d reports a conflict only if the aircraft are within D horizontally
+# and within H vertically at some time of [0,T] (at t_in, or at 0 when
+# t_in < 0). The bounds reject pairs for which this is impossible:
+#
+# - VERTICAL   : |sz| > H + |vz|*T, the vertical gap cannot close to H
+#                within the lookahead time.
+# - HORIZONTAL : |s| > D + |v|*T, with s and v the horizontal relative
+#                position and velocity: the horizontal gap cannot close
+#                to D within the lookahead time.
+# - DIVERGING  : |s| > D and s.v >= 0, or |sz| > H and sz*vz >= 0, the
+#                aircraft are separated and their distance does not
+#                decrease.
+#
+# Bounds are tested in this order and every removed pair is counted once,
+# under the first bound that rejects it. The reachable distances are
+# widened by a relative MARGIN so that rounding never rejects a pair that
+# cd3d would report.
+#
+# Unit Convention
+# ---------------
+# As in CD3D: distances [d], times [t], speeds [d/t]. sx,sy,sz and vx,vy,vz
+# are the relative position and velocity of the ownship.
+#
+# Functions
+# ---------
+# - screen       : Bound removing one pair, KEPT if none does
+# - screen_array : Same, one element per pair
+# - screen_block : Index pairs kept among (a,b), and counts per bound
+#
+
+import numpy as np
+from .Util import sq
+
+
+__all__ = [ 'KEPT', 'VERTICAL', 'HORIZONTAL', 'DIVERGING', 'BOUNDS', 'MARGIN',
+            'screen', 'screen_array', 'screen_block' ]
+
+
+KEPT       = 0
+VERTICAL   = 1
+HORIZONTAL = 2
+DIVERGING  = 3
+
+# Names of the outcomes, by value
+BOUNDS = ( 'kept', 'vertical', 'horizontal', 'diverging' )
+
+# Relative widening of the reachable distances
+MARGIN = 1e-9
+
+
+# screen: Bound that proves the pair (sx,sy,sz,vx,vy,vz) conflict free
+# within T, or KEPT
+def screen( D, H, T, sx, sy, sz, vx, vy, vz ) :
+    h = H * ( 1 + MARGIN )
+    if abs( sz ) > ( H + abs( vz ) * T ) * ( 1 + MARGIN ) :
+        return VERTICAL
+    s2 = sq(sx) + sq(sy)
+    if s2 > sq( ( D + ( sq(vx) + sq(vy) ) ** 0.5 * T ) * ( 1 + MARGIN ) ) :
+        return HORIZONTAL
+    if ( s2 > sq( D * ( 1 + MARGIN ) ) and sx*vx + sy*vy >= 0 ) or ( abs( sz ) > h and sz*vz >= 0 ) :
+        return DIVERGING
+    return KEPT
+
+
+# screen_array: screen, one element per pair
+#
+# OUTPUTS: bound, an int8 array
+#
+def screen_array( D, H, T, sx, sy, sz, vx, vy, vz ) :
+    bound = np.full( np.shape( sx ), KEPT, dtype=np.int8 )
+    abs_sz = np.abs( sz )
+    s2 = sq(sx) + sq(sy)
+    diverging = ( ( s2 > sq( D * ( 1 + MARGIN ) ) ) & ( sx*vx + sy*vy >= 0 ) ) | \
+                ( ( abs_sz > H * ( 1 + MARGIN ) ) & ( sz*vz >= 0 ) )
+    bound[diverging] = DIVERGING
+    bound[s2 > sq( ( D + np.sqrt( sq(vx) + sq(vy) ) * T ) * ( 1 + MARGIN ) )] = HORIZONTAL
+    bound[abs_sz > ( H + np.abs( vz ) * T ) * ( 1 + MARGIN )] = VERTICAL
+    return bound
+
+
+# screen_block: Screens the index pairs (a,b) of the aircraft states
+# x,y,z and vx,vy,vz
+#
+# OUTPUTS: a,b (pairs kept), counts (number of pairs per outcome, by value)
+#
+def screen_block( D, H, T, states, a, b ) :
+    x, y, z, vx, vy, vz = states
+    bound = screen_array( D, H, T, x[a] - x[b], y[a] - y[b], z[a] - z[b],
+                          vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b] )
+    kept = bound == KEPT
+    return a[kept], b[kept], np.bincount( bound, minlength=len( BOUNDS ) )
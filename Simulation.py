@@ -0,0 +1,327 @@
+#
+# Simulation.py
+#
+# Closed-loop fast-time simulation of KB3D.
+#
+# All aircraft are propagated in straight line, in array form. At each step
+# of dt seconds, conflicts are detected on the whole traffic (see Scene.py)
+# and KB3D resolves both aircraft of every conflict in one pass (see
+# Scene.pair_resolution). Each aircraft in conflict flies the resolution of
+# its most urgent conflict: the first maneuver kind of the policy that KB3D
+# found, or the vertical recovery when it is already in loss of separation.
+# A maneuver is held for `hold` seconds after the last resolution and until
+# the aircraft moves away from the aircraft of that conflict (past the
+# closest point of approach), then the aircraft returns to its nominal
+# velocity and to its cleared level. This may create new conflicts: they
+# are detected and resolved in the following steps.
+#
+# Loss of separation is checked at every step: short losses between two
+# steps are not seen, and smaller steps see more of them.
+#
+# States are given as in CDR, in a flat frame: x [nm], y [nm], alt [feet],
+# trk [deg], gs [knots], vs [feet/min]. Aircraft with a vertical speed
+# level off at their target altitude [feet].
+#
+# BASIC USAGE:
+#   sim = Simulator(D,H,T)
+#   sim.set_policy([VERTICAL,TRACK])   // maneuver kinds, in order of preference
+#   sim.set_traffic(x,y,alt,trk,gs,vs,target)
+#   sim.run(3600)
+#   sim.metrics()
+#
+#   monte_carlo(range(100),workers,n=2000,duration=3600)  // one metrics dict per seed
+#
+# Metrics
+# -------
+# time [sec]      : Simulated time
+# steps           : Number of steps
+# conflicts       : Conflicts detected, summed over the steps
+# los_events      : Pairs entering loss of separation
+# los_time [sec]  : Time spent in loss of separation, summed over the pairs
+# maneuvers       : New maneuvers, by kind (and 'recovery'). A maneuver is
+#                   new when the aircraft was flying its nominal velocity.
+# advisories      : Resolutions applied, new maneuvers or not
+# unresolved      : Aircraft in conflict for which KB3D found no maneuver
+#                   of the policy, summed over the steps
+# delay [sec]     : Along-track delay, summed over the aircraft: time lost
+#                   flying slower than, or away from, the nominal velocity
+#
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .Constants import NaR
+from .Util import ftmin2msec, m2ft, m2nm, nm2m, ft2m, velocity_array
+from .Scene import Scene
+from .Resolver import TRACK, GROUND_SPEED, OPTIMAL, VERTICAL, MANEUVERS
+
+
+__all__ = [ 'RECOVERY', 'random_traffic', 'simulate', 'monte_carlo', 'Simulator' ]
+
+
+RECOVERY = 'recovery'
+
+# Vertical speed to recapture the cleared level after a maneuver [feet/min]
+RECAPTURE = 1000.0
+
+
+# random_traffic: n aircraft with `density` aircraft per 10 000 square
+# nautical miles, in a square. Climbing and descending aircraft have a
+# target level 2000 to 8000 feet away.
+#
+# OUTPUTS: x,y,alt,trk,gs,vs,target
+#
+def random_traffic( n, seed=0, density=5.0 ) :
+    rng = np.random.default_rng( seed )
+    side = np.sqrt( n / density * 1e4 )
+    x = rng.uniform( 0, side, n )
+    y = rng.uniform( 0, side, n )
+    alt = rng.integers( 20, 41, n ) * 1000.0
+    trk = rng.uniform( 0, 360, n )
+    gs = rng.uniform( 350, 500, n )
+    vs = np.zeros( n )
+    moving = rng.random( n ) < 0.3
+    vs[moving] = rng.choice( [ -1, 1 ], moving.sum() ) * rng.uniform( 1000, 2500, moving.sum() )
+    target = alt + np.sign( vs ) * rng.integers( 2, 9, n ) * 1000.0
+    return x, y, alt, trk, gs, vs, target
+
+
+
+class Simulator :
+
+
+    def __init__( self, D, H, T, dt=5.0 ) :
+        self.scene = Scene( D, H, T )
+        self.scene.set_detection_filter( 0 )
+        self.dt = dt
+        self.hold = 60.0
+        self.policy = ( OPTIMAL, TRACK, GROUND_SPEED, VERTICAL )
+        self.set_traffic( [], [], [], [], [], [] )
+
+
+    def set_dt( self, dt ) :
+        self.dt = dt
+
+
+    def get_dt( self ) :
+        return self.dt
+
+
+    # Time a maneuver is held after the last resolution [sec]
+    def set_hold( self, hold ) :
+        self.hold = hold
+
+
+    def get_hold( self ) :
+        return self.hold
+
+
+    # Maneuver kinds (see Resolver.MANEUVERS), in order of preference
+    def set_policy( self, policy ) :
+        for kind in policy :
+            if kind not in MANEUVERS :
+                raise ValueError( "unknown maneuver: %s" % kind )
+        self.policy = tuple( policy )
+
+
+    def get_policy( self ) :
+        return self.policy
+
+
+    # set_traffic: Aircraft states, flying their nominal velocity. Aircraft
+    # with a vertical speed level off at target [feet] (by default, never);
+    # the cleared level of level aircraft is their altitude. Resets the
+    # time and the metrics.
+    def set_traffic( self, x, y, alt, trk, gs, vs, target=None, ids=None ) :
+        self.x = nm2m( np.asarray( x, dtype=float ) )
+        self.y = nm2m( np.asarray( y, dtype=float ) )
+        self.z = ft2m( np.asarray( alt, dtype=float ) )
+        n = self.x.size
+        self.ids = np.arange( n ) if ids is None else np.asarray( ids )
+        self.vx, self.vy, self.vz = [ np.array( v, dtype=float ) for v in velocity_array( trk, gs, vs ) ]
+        self.nominal = ( self.vx.copy(), self.vy.copy(), self.vz.copy() )
+        vs = np.asarray( vs, dtype=float )
+        target = np.full( n, np.nan ) if target is None else np.asarray( target, dtype=float )
+        self.target = ft2m( np.where( vs != 0, target, np.asarray( alt, dtype=float ) ) )
+        self.rate = np.where( vs != 0, np.abs( self.vz ), ftmin2msec( RECAPTURE ) )
+        # Time until which each aircraft holds its maneuver, -inf when flying
+        # nominal, and the aircraft of the conflict it resolves
+        self.until = np.full( n, -np.inf )
+        self.partner = np.zeros( n, dtype=np.int64 )
+        self.time = 0.0
+        self.clear_metrics()
+
+
+    def clear_metrics( self ) :
+        self.steps = 0
+        self.conflicts = 0
+        self.los_events = 0
+        self.los_time = 0.0
+        self.maneuvers = dict( ( kind, 0 ) for kind in MANEUVERS + ( RECOVERY, ) )
+        self.advisories = 0
+        self.unresolved = 0
+        self.delay = 0.0
+        self.in_los = np.zeros( 0, dtype=np.int64 )
+
+
+    def metrics( self ) :
+        return { 'time' : self.time, 'steps' : self.steps, 'aircraft' : self.x.size,
+                 'conflicts' : self.conflicts, 'los_events' : self.los_events, 'los_time' : self.los_time,
+                 'maneuvers' : dict( self.maneuvers ), 'advisories' : self.advisories,
+                 'unresolved' : self.unresolved, 'delay' : self.delay }
+
+
+    # States in CDR units
+    #
+    # OUTPUTS: x,y,alt,trk,gs,vs
+    #
+    def states( self ) :
+        trk = np.degrees( np.arctan2( self.vx, self.vy ) ) % 360
+        gs = m2nm( np.hypot( self.vx, self.vy ) ) * 3600
+        return m2nm( self.x ), m2nm( self.y ), m2ft( self.z ), trk, gs, m2ft( self.vz ) * 60
+
+
+    # propagate: Flies all aircraft for dt seconds
+    def propagate( self, dt ) :
+        vx, vy, vz = self.nominal
+        progress = ( self.vx * vx + self.vy * vy ) / np.maximum( vx * vx + vy * vy, 1e-9 )
+        self.delay += float( np.sum( 1 - progress ) ) * dt
+
+        z = self.z
+        self.x = self.x + self.vx * dt
+        self.y = self.y + self.vy * dt
+        self.z = z + self.vz * dt
+        self.time += dt
+
+        # Level off at the target, unless maneuvering
+        nominal = self.until < self.time
+        crossed = nominal & ( self.vz != 0 ) & ( ( self.z - self.target ) * ( z - self.target ) <= 0 )
+        self.z = np.where( crossed, self.target, self.z )
+        self.vz = np.where( crossed, 0.0, self.vz )
+
+        # End of the maneuvers, once away from the other aircraft: back to
+        # the nominal velocity and level, or to the nominal vertical speed
+        # without a target
+        p = self.partner
+        away = ( ( self.x - self.x[p] ) * ( self.vx - self.vx[p] ) + ( self.y - self.y[p] ) * ( self.vy - self.vy[p] ) +
+                 ( self.z - self.z[p] ) * ( self.vz - self.vz[p] ) ) >= 0
+        ended = np.isfinite( self.until ) & nominal & away
+        if ended.any() :
+            self.vx = np.where( ended, vx, self.vx )
+            self.vy = np.where( ended, vy, self.vy )
+            recapture = np.where( np.isnan( self.target ), vz, np.sign( self.target - self.z ) * self.rate )
+            self.vz = np.where( ended, recapture, self.vz )
+            self.until = np.where( ended, -np.inf, self.until )
+
+
+    # losses: Index pairs of the conflicts in loss of separation, as keys
+    def losses( self ) :
+        s = self.scene
+        a, b = s.own_rows, s.intruder_rows
+        los = ( ( np.square( self.x[a] - self.x[b] ) + np.square( self.y[a] - self.y[b] ) < s.d * s.d ) &
+                ( np.abs( self.z[a] - self.z[b] ) < s.h ) )
+        return a[los] * self.x.size + b[los]
+
+
+    # resolve: Applies the resolution of the most urgent conflict of every
+    # aircraft in conflict
+    def resolve( self ) :
+        s = self.scene
+        s.pair_resolution()
+        rows = np.concatenate( ( s.own_rows, s.intruder_rows ) )
+        urgency = np.concatenate( ( s.time2los, s.time2los ) )
+        own = lambda name : np.concatenate( ( getattr( s, name ), getattr( s, name + '_i' ) ) )
+        recovery = own( 'recovery' ) == -1
+        values = { TRACK : ( own( 'newtrk' ), ), GROUND_SPEED : ( own( 'newgs' ), ),
+                   OPTIMAL : ( own( 'opttrk' ), own( 'optgs' ) ), VERTICAL : ( own( 'newvs' ), ) }
+
+        # Most urgent conflict of each aircraft, violations first
+        order = np.lexsort( ( urgency, ~recovery, rows ) )
+        first = np.ones( order.size, dtype=bool )
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        pick = order[first]
+        k = rows[pick]
+        others = np.concatenate( ( s.intruder_rows, s.own_rows ) )[pick]
+
+        # First maneuver of the policy found by KB3D; vertical recovery for violations
+        found = np.column_stack( [ values[kind][0][pick] != NaR for kind in self.policy ] + [ recovery[pick] ] )
+        choice = np.where( recovery[pick], len( self.policy ), np.argmax( found, axis=1 ) )
+        solved = found.any( axis=1 )
+        self.unresolved += int( np.sum( ~solved ) )
+
+        trk, gs, vs = self.states()[3:]
+        new = ~np.isfinite( self.until[k] )
+        for c, kind in enumerate( self.policy + ( RECOVERY, ) ) :
+            apply = solved & ( choice == c )
+            if not apply.any() :
+                continue
+            rows_c, picks = k[apply], pick[apply]
+            t, g, v = trk[rows_c], gs[rows_c], vs[rows_c]
+            if kind == TRACK :
+                t = values[TRACK][0][picks]
+            elif kind == GROUND_SPEED :
+                g = values[GROUND_SPEED][0][picks]
+            elif kind == OPTIMAL :
+                t, g = values[OPTIMAL][0][picks], values[OPTIMAL][1][picks]
+            else :
+                v = values[VERTICAL][0][picks]
+            self.vx[rows_c], self.vy[rows_c], self.vz[rows_c] = velocity_array( t, g, v )
+            self.until[rows_c] = self.time + self.hold
+            self.partner[rows_c] = others[apply]
+            self.maneuvers[kind] += int( np.sum( new[apply] ) )
+            self.advisories += int( apply.sum() )
+
+
+    # step: Propagates the traffic by dt, then detects and resolves
+    def step( self ) :
+        self.propagate( self.dt )
+        s = self.scene
+        s.load( self.ids, m2nm( self.x ), m2nm( self.y ), m2ft( self.z ), self.vx, self.vy, self.vz, False )
+        s.detection()
+        self.steps += 1
+        self.conflicts += s.own_rows.size
+
+        los = self.losses()
+        self.los_events += int( np.sum( ~np.isin( los, self.in_los ) ) )
+        self.los_time += los.size * self.dt
+        self.in_los = los
+
+        if s.own_rows.size :
+            self.resolve()
+
+
+    # run: Simulates duration seconds
+    #
+    # OUTPUTS: metrics
+    #
+    def run( self, duration ) :
+        for _ in range( int( round( duration / self.dt ) ) ) :
+            self.step()
+        return self.metrics()
+
+
+
+# simulate: Metrics of a simulation of n random aircraft (see random_traffic)
+# for duration seconds. Runs in the worker processes of monte_carlo.
+def simulate( seed, D=5, H=1000, T=300, n=1000, duration=3600.0, dt=5.0, hold=60.0,
+              policy=( OPTIMAL, TRACK, GROUND_SPEED, VERTICAL ), density=5.0 ) :
+    sim = Simulator( D, H, T, dt )
+    sim.set_hold( hold )
+    sim.set_policy( policy )
+    sim.set_traffic( *random_traffic( n, seed, density ) )
+    metrics = sim.run( duration )
+    metrics['seed'] = seed
+    return metrics
+
+
+# monte_carlo: Metrics of simulate for each seed, in seed order. Seeds are
+# simulated by a pool of worker processes (all the cores by default, in
+# this process with one worker).
+def monte_carlo( seeds, workers=None, **parameters ) :
+    seeds = list( seeds )
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len( seeds ) <= 1 :
+        return [ simulate( seed, **parameters ) for seed in seeds ]
+    with ProcessPoolExecutor( max_workers=workers ) as pool :
+        futures = [ pool.submit( simulate, seed, **parameters ) for seed in seeds ]
+        return [ f.result() for f in futures ]
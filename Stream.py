@@ -0,0 +1,312 @@
+#
+# Stream.py
+#
+# Streaming conflict detection and resolution on surveillance updates.
+#
+# ConflictMonitor keeps the last state of every aircraft and the set of
+# current conflicts. Each tick, only the pairs that involve an aircraft
+# updated in that tick are evaluated again (screening, cd3d, then KB3D for
+# new and changed conflicts); the other aircraft are extrapolated in straight line
+# to the time of the tick. Only the changes of the conflict set are
+# reported, as Alert records:
+#
+#   NEW      : the pair is now in conflict
+#   UPDATED  : the predicted loss of separation (absolute time of loss, or
+#              duration) moved by more than the tolerance
+#   RESOLVED : the pair is no longer in conflict, the predicted conflict is
+#              over, or one of the aircraft was removed
+#
+# Candidate pairs come from a horizontal grid and altitude bands (see
+# Index.py); band ranges are recomputed only for the updated aircraft and
+# for the aircraft that climb or descend.
+#
+# Pairs are reported with the smaller aircraft id as ownship. time2los and
+# duration are relative to the time of the alert.
+#
+# State information for each aircraft is given as in CDR:
+# x, y, alt [feet], trk [deg], gs [knots], vs [feet/min]
+# where x, y are lat [deg], lon [deg] for geodesic coordinates (gxy) and
+# x [nm], y [nm] otherwise. Geodesic positions are projected into a tangent
+# plane centred on the first tick, unless a reference is set.
+#
+# BASIC USAGE:
+#   monitor = ConflictMonitor(D,H,T,gxy)
+#   for alert in monitor.run(updates) :   // (t,id,x,y,alt,trk,gs,vs), sorted by t
+#     ...
+#
+
+from collections import namedtuple
+import numpy as np
+from .Constants import NaR
+from .Util import ft2m, max, nm2m, sq, velocity_array
+from .Index import UniformGrid, AltitudeBands
+from .Projection import TangentPlane
+from .CD3DBatch import cd3d_batch
+from .Scene import resolve_block
+from .Screen import BOUNDS, screen_block
+
+
+__all__ = [ 'NEW', 'UPDATED', 'RESOLVED', 'Alert', 'ConflictMonitor' ]
+
+
+NEW      = 'new'
+UPDATED  = 'updated'
+RESOLVED = 'resolved'
+
+Alert = namedtuple( 'Alert', [ 'kind', 'time', 'own', 'intruder', 'time2los', 'duration',
+                               'recovery', 'newtrk', 'newgs', 'opttrk', 'optgs', 'newvs' ] )
+
+
+
+class ConflictMonitor :
+
+
+    def __init__( self, D, H, T, gxy=False ) :
+
+        self.d = nm2m(D)
+        self.h = ft2m(H)
+        self.t = T
+        self.filter = 1
+        self.tolerance = 1
+
+        self.gxy = gxy
+        self.plane = TangentPlane()
+        self.fixed_reference = False
+
+        # One row per aircraft: id, time of the last update [sec], position [m]
+        # and velocity [m/s] at that time
+        self.size = 0
+        self.ids  = np.zeros( 0, dtype=np.int64 )
+        self.time = np.zeros( 0 )
+        self.x    = np.zeros( 0 )
+        self.y    = np.zeros( 0 )
+        self.z    = np.zeros( 0 )
+        self.vx   = np.zeros( 0 )
+        self.vy   = np.zeros( 0 )
+        self.vz   = np.zeros( 0 )
+        self.rows = {}
+
+        # (own,intruder) -> absolute time of loss and end of conflict [sec]
+        self.conflicts = {}
+        # id -> keys of the conflicts of the aircraft
+        self.involved = {}
+
+        self.grid = UniformGrid( 1 )
+        # Altitude band ranges, by row. Only the ranges of the updated and of
+        # the climbing or descending aircraft change from one tick to the next.
+        self.bands = AltitudeBands( self.h, self.t )
+        self.now = None
+        # Pairs evaluated by the last tick, and their screening outcomes
+        # (see Screen.BOUNDS)
+        self.evaluated = 0
+        self.screened = np.zeros( len( BOUNDS ), dtype=np.int64 )
+
+
+    def set_reference( self, latdeg0, londeg0 ) :
+        self.plane.set_reference( latdeg0, londeg0 )
+        self.fixed_reference = True
+
+
+    def set_detection_filter( self, f ) :
+        self.filter = f
+
+
+    def get_detection_filter( self ) :
+        return self.filter
+
+
+    # set_tolerance: Smallest change [sec] of the time of loss or of the
+    # duration reported as UPDATED
+    def set_tolerance( self, tolerance ) :
+        self.tolerance = tolerance
+
+
+    def get_tolerance( self ) :
+        return self.tolerance
+
+
+    # Current conflicts, as (own,intruder) pairs
+    def conflict_pairs( self ) :
+        return sorted( self.conflicts )
+
+
+    def grow( self, n ) :
+        if n <= self.ids.size :
+            return
+        capacity = max( n, max( 2 * self.ids.size, 16 ) )
+        for name in ( 'ids', 'time', 'x', 'y', 'z', 'vx', 'vy', 'vz' ) :
+            old = getattr( self, name )
+            new = np.zeros( capacity, dtype=old.dtype )
+            new[:self.size] = old[:self.size]
+            setattr( self, name, new )
+
+
+    # store: Stores the states of the aircraft ids at time t
+    #
+    # OUTPUTS: rows of the aircraft
+    #
+    def store( self, t, ids, x, y, alt, trk, gs, vs ) :
+
+        ids = np.atleast_1d( np.asarray( ids, dtype=np.int64 ) )
+        x = np.broadcast_to( np.asarray( x, dtype=float ), ids.shape )
+        y = np.broadcast_to( np.asarray( y, dtype=float ), ids.shape )
+
+        if self.gxy :
+            if not self.fixed_reference :
+                self.plane.centre( x, y )
+                self.fixed_reference = True
+            x, y = self.plane.geo2xy( x, y )
+        else :
+            x, y = nm2m( x ), nm2m( y )
+
+        rows = np.zeros( ids.size, dtype=np.int64 )
+        for k, ident in enumerate( ids.tolist() ) :
+            row = self.rows.get( ident )
+            if row is None :
+                self.grow( self.size + 1 )
+                row = self.size
+                self.rows[ident] = row
+                self.ids[row] = ident
+                self.size += 1
+            rows[k] = row
+
+        self.time[rows] = t
+        self.x[rows] = x
+        self.y[rows] = y
+        self.z[rows] = ft2m( np.asarray( alt, dtype=float ) )
+        self.vx[rows], self.vy[rows], self.vz[rows] = velocity_array( np.broadcast_to( trk, ids.shape ), gs, vs )
+        return np.unique( rows )
+
+
+    # States of all aircraft extrapolated to time t
+    def states_at( self, t ) :
+        n = self.size
+        dt = t - self.time[:n]
+        return ( self.x[:n] + self.vx[:n] * dt, self.y[:n] + self.vy[:n] * dt, self.z[:n] + self.vz[:n] * dt,
+                 self.vx[:n], self.vy[:n], self.vz[:n] )
+
+
+    def add_conflict( self, key, los, out ) :
+        self.conflicts[key] = ( los, out )
+        for ident in key :
+            self.involved.setdefault( ident, set() ).add( key )
+
+
+    def drop_conflict( self, key ) :
+        del self.conflicts[key]
+        for ident in key :
+            self.involved.get( ident, set() ).discard( key )
+
+
+    def resolved( self, t, key ) :
+        self.drop_conflict( key )
+        return Alert( RESOLVED, t, key[0], key[1], 0, 0, 0, NaR, NaR, NaR, NaR, NaR )
+
+
+    # expire: Resolves the conflicts whose predicted end is before time t
+    def expire( self, t ) :
+        return [ self.resolved( t, key ) for key in sorted( self.conflicts ) if self.conflicts[key][1] < t ]
+
+
+    # process: Updates the aircraft ids with their states at time t and
+    # re-evaluates their pairs.
+    #
+    # OUTPUTS: list of Alert
+    #
+    def process( self, t, ids, x, y, alt, trk, gs, vs ) :
+
+        if self.now is not None and t < self.now :
+            raise ValueError( "updates must be sorted by time" )
+        self.now = t
+
+        rows = self.store( t, ids, x, y, alt, trk, gs, vs )
+        alerts = self.expire( t )
+
+        states = self.states_at( t )
+        px, py, pz, vx, vy, vz = states
+        speed = np.sqrt( sq(vx) + sq(vy) )
+        self.grid.set_cell( ( self.d + self.t * 2 * ( speed.max() if speed.size else 0 ) ) * ( 1 + 1e-9 ) + 1 )
+        moving = np.union1d( rows, np.flatnonzero( vz != 0 ) )
+        self.bands.update( moving, pz[moving], vz[moving] )
+        self.grid.build( px, py, self.bands.lo[:self.size], self.bands.hi[:self.size] )
+        i, j = self.grid.pairs_of( rows )
+
+        # Smaller id is the ownship
+        swap = self.ids[i] > self.ids[j]
+        a = np.where( swap, j, i )
+        b = np.where( swap, i, j )
+        self.evaluated = a.size
+        a, b, self.screened = screen_block( self.d, self.h, self.t, states, a, b )
+
+        conflict, t_in, t_out, time2los, time2lhs, time2lvs, duration = cd3d_batch(
+            self.d, self.h, self.t, self.filter,
+            px[a] - px[b], py[a] - py[b], pz[a] - pz[b], vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b] )
+
+        # New and changed conflicts
+        changed = []
+        current = set()
+        for k in np.flatnonzero( conflict ).tolist() :
+            key = ( int( self.ids[a[k]] ), int( self.ids[b[k]] ) )
+            los, out = t + time2los[k], t + t_out[k]
+            current.add( key )
+            old = self.conflicts.get( key )
+            if old is None :
+                changed.append( ( NEW, k, key ) )
+            elif abs( los - old[0] ) > self.tolerance or abs( out - old[1] ) > self.tolerance :
+                changed.append( ( UPDATED, k, key ) )
+            else :
+                continue
+            self.add_conflict( key, los, out )
+
+        if changed :
+            k = np.array( [ c[1] for c in changed ] )
+            advisories = resolve_block( self.d, self.h, self.t, states, a[k], b[k], t_in[k] )
+            for n, ( kind, k, key ) in enumerate( changed ) :
+                alerts.append( Alert( kind, t, key[0], key[1], float( time2los[k] ), float( duration[k] ),
+                                      *( float( r[n] ) for r in advisories ) ) )
+
+        # Conflicts of the updated aircraft that are over
+        touched = set()
+        for ident in self.ids[rows].tolist() :
+            touched |= self.involved.get( ident, set() )
+        alerts += [ self.resolved( t, key ) for key in sorted( touched - current ) ]
+
+        return alerts
+
+
+    # remove: Stops tracking the aircraft ids at time t, resolving their conflicts
+    #
+    # OUTPUTS: list of Alert
+    #
+    def remove( self, t, ids ) :
+        alerts = []
+        for ident in np.atleast_1d( ids ).tolist() :
+            row = self.rows.pop( ident )
+            alerts += [ self.resolved( t, key ) for key in sorted( self.involved.pop( ident, set() ) ) ]
+            last = self.size - 1
+            if row != last :
+                for name in ( 'ids', 'time', 'x', 'y', 'z', 'vx', 'vy', 'vz' ) :
+                    column = getattr( self, name )
+                    column[row] = column[last]
+                self.bands.move( last, row )
+                self.rows[int( self.ids[row] )] = row
+            self.size = last
+        return alerts
+
+
+    # run: Alerts of a stream of updates (t,id,x,y,alt,trk,gs,vs) sorted by
+    # time. Consecutive updates with the same time form one tick.
+    def run( self, updates ) :
+        tick = []
+        for update in updates :
+            if tick and update[0] != tick[0][0] :
+                yield from self.process_tick( tick )
+                tick = []
+            tick.append( update )
+        if tick :
+            yield from self.process_tick( tick )
+
+
+    def process_tick( self, tick ) :
+        columns = list( zip( *tick ) )
+        return self.process( columns[0][0], *[ np.array( c ) for c in columns[1:] ] )
@@ -0,0 +1,266 @@
+#
+# TrackStore.py
+#
+# Columnar store of recorded surveillance states, read through numpy.memmap.
+# A replay opens the file and touches only the pages of the time slices it
+# reads; slices are views of the file, never copies.
+#
+# File layout (little endian)
+# ---------------------------
+# header  : HEADER_SIZE bytes: MAGIC, number of states N, number of time
+#           bins M (uint64), start time t0 [sec] and bin width step [sec]
+#           (float64), zero padded
+# columns : TRACK_COLUMNS, one after the other, N values each. Rows are
+#           sorted by time, then by id. The 8-byte columns come first, so
+#           every column is aligned.
+# index   : M+1 int64, the first row of each time bin [t0+k*step,t0+(k+1)*step)
+#           and N
+#
+# States are t [sec], id, lat [deg], lon [deg], alt [feet], trk [deg],
+# gs [knots], vs [feet/min]: 48 bytes per state.
+#
+# BASIC USAGE:
+#   csv2tracks('day.csv','day.trk')        // or write_tracks('day.trk',t,ids,...)
+#   store = TrackStore('day.trk')
+#   t, ids, lat, lon, alt, trk, gs, vs = store.slice(t0,t1)
+#   monitor = ConflictMonitor(D,H,T,True)
+#   for alert in replay(store,monitor,t0,t1) :
+#     ...
+#
+# Functions
+# ---------
+# - write_tracks : Store of arrays of states
+# - csv2tracks   : Store of a CSV file, converted by chunks
+# - replay       : Feeds the ticks of a store to a ConflictMonitor
+#
+
+import numpy as np
+
+
+__all__ = [ 'MAGIC', 'HEADER_SIZE', 'TRACK_COLUMNS', 'write_tracks', 'csv2tracks',
+            'replay', 'TrackStore' ]
+
+
+MAGIC = b'KB3DTRK1'
+
+HEADER_SIZE = 64
+
+TRACK_COLUMNS = ( ( 't', '<f8' ), ( 'id', '<i8' ), ( 'lat', '<f8' ), ( 'lon', '<f8' ),
+                  ( 'alt', '<f4' ), ( 'trk', '<f4' ), ( 'gs', '<f4' ), ( 'vs', '<f4' ) )
+
+HEADER_DTYPE = np.dtype( [ ( 'magic', 'S8' ), ( 'count', '<u8' ), ( 'bins', '<u8' ),
+                           ( 't0', '<f8' ), ( 'step', '<f8' ) ] )
+
+
+# Offset of each column and of the index in a file of count states
+def layout( count ) :
+    offsets = {}
+    offset = HEADER_SIZE
+    for name, dtype in TRACK_COLUMNS :
+        offsets[name] = offset
+        offset += count * np.dtype( dtype ).itemsize
+    offsets['index'] = offset
+    return offsets
+
+
+# Number of time bins of width step from t0 to last
+def bins( t0, last, step ) :
+    return int( ( last - t0 ) // step ) + 1
+
+
+# create: Empty store of count states on path, with the header written
+#
+# OUTPUTS: writable columns (dict of memmap)
+#
+def create( path, count, t0, last, step ) :
+    offsets = layout( count )
+    m = bins( t0, last, step ) if count else 0
+    header = np.zeros( 1, dtype=HEADER_DTYPE )
+    header[0] = ( MAGIC, count, m, t0, step )
+    with open( path, 'wb' ) as f :
+        f.write( header.tobytes().ljust( HEADER_SIZE, b'\0' ) )
+        f.truncate( offsets['index'] + ( m + 1 ) * 8 )
+    if count == 0 :
+        return None
+    return { name : np.memmap( path, dtype=dtype, mode='r+', offset=offsets[name], shape=( count, ) )
+             for name, dtype in TRACK_COLUMNS }
+
+
+# write_index: Time index of a store whose columns are written
+def write_index( path, columns, t0, step ) :
+    t = columns['t']
+    m = bins( t0, t[-1], step )
+    index = np.memmap( path, dtype='<i8', mode='r+', offset=layout( t.size )['index'], shape=( m + 1, ) )
+    index[:] = np.searchsorted( t, t0 + step * np.arange( m + 1 ), side='left' )
+    index[m] = t.size
+    index.flush()
+
+
+# write_tracks: Store of the states, sorted by time then id. step [sec] is
+# the width of the time bins of the index.
+def write_tracks( path, t, ids, lat, lon, alt, trk, gs, vs, step=60.0 ) :
+    values = [ np.atleast_1d( np.asarray( v ) ) for v in ( t, ids, lat, lon, alt, trk, gs, vs ) ]
+    order = np.lexsort( ( values[1], values[0] ) )
+    count = order.size
+    t0, last = ( float( values[0][order[0]] ), float( values[0][order[-1]] ) ) if count else ( 0.0, 0.0 )
+    columns = create( path, count, t0, last, step )
+    if columns is None :
+        return
+    for ( name, _ ), v in zip( TRACK_COLUMNS, values ) :
+        columns[name][:] = v[order]
+    write_index( path, columns, t0, step )
+    for column in columns.values() :
+        column.flush()
+
+
+# csv2tracks: Store of a CSV file with a header line naming the columns
+# t, id, lat, lon, alt, trk, gs, vs (in any order, other columns ignored).
+# Rows must be sorted by time; rows with the same time may come in any
+# order. The file is read twice, chunk rows at a time, so memory does not
+# grow with its length.
+#
+# OUTPUTS: number of states
+#
+def csv2tracks( source, path, step=60.0, chunk=1 << 18 ) :
+    with open( source ) as f :
+        names = [ n.strip() for n in f.readline().split( ',' ) ]
+        try :
+            usecols = [ names.index( name ) for name, _ in TRACK_COLUMNS ]
+        except ValueError :
+            raise ValueError( "%s: the header must name the columns %s" %
+                              ( source, ', '.join( name for name, _ in TRACK_COLUMNS ) ) )
+
+        # First pass: number of states, time range and order
+        count, t0, last = 0, None, None
+        for block in chunks( f, usecols[:1], chunk ) :
+            t = block[:, 0]
+            if np.any( t[1:] < t[:-1] ) or ( last is not None and t[0] < last ) :
+                raise ValueError( "%s: rows are not sorted by time near row %d" % ( source, count ) )
+            t0 = t[0] if t0 is None else t0
+            last = t[-1]
+            count += t.size
+
+    columns = create( path, count, t0 or 0.0, last or 0.0, step )
+    if columns is None :
+        return 0
+
+    # Second pass: values, sorted by id within each time
+    with open( source ) as f :
+        f.readline()
+        row = 0
+        carry = None
+        for block in chunks( f, usecols, chunk ) :
+            if carry is not None :
+                block = np.concatenate( ( carry, block ) )
+            # The rows of the last time may continue in the next chunk
+            cut = np.searchsorted( block[:, 0], block[-1, 0], side='left' )
+            carry, block = block[cut:], block[:cut]
+            row = store_rows( columns, row, block )
+        store_rows( columns, row, carry )
+
+    write_index( path, columns, float( t0 ), step )
+    for column in columns.values() :
+        column.flush()
+    return count
+
+
+# Blocks of at most n rows of the columns usecols of the CSV lines of f
+def chunks( f, usecols, n ) :
+    while True :
+        lines = [ line for _, line in zip( range( n ), f ) ]
+        if not lines :
+            return
+        yield np.loadtxt( lines, delimiter=',', usecols=usecols, ndmin=2 )
+
+
+# Writes the CSV rows (t,id,...) from row on, sorted by time then id
+def store_rows( columns, row, block ) :
+    if block is None or block.shape[0] == 0 :
+        return row
+    block = block[np.lexsort( ( block[:, 1], block[:, 0] ) )]
+    for k, ( name, _ ) in enumerate( TRACK_COLUMNS ) :
+        columns[name][row:row + block.shape[0]] = block[:, k]
+    return row + block.shape[0]
+
+
+# replay: Alerts of a ConflictMonitor fed with the ticks of the store from
+# start to stop [sec]. The monitor must use geodesic coordinates.
+def replay( store, monitor, start=None, stop=None ) :
+    for tick in store.ticks( start, stop ) :
+        yield from monitor.process( *tick )
+
+
+
+class TrackStore :
+
+
+    def __init__( self, path ) :
+        header = np.fromfile( path, dtype=HEADER_DTYPE, count=1 )
+        if header.size == 0 or header['magic'][0] != MAGIC :
+            raise ValueError( "%s is not a track store" % path )
+        self.path = path
+        self.count = int( header['count'][0] )
+        self.t0 = float( header['t0'][0] )
+        self.step = float( header['step'][0] )
+        offsets = layout( self.count )
+        self.columns = { name : np.memmap( path, dtype=dtype, mode='r', offset=offsets[name], shape=( self.count, ) )
+                         for name, dtype in TRACK_COLUMNS } if self.count else \
+                       { name : np.zeros( 0, dtype=dtype ) for name, dtype in TRACK_COLUMNS }
+        self.index = np.memmap( path, dtype='<i8', mode='r', offset=offsets['index'],
+                                shape=( int( header['bins'][0] ) + 1, ) )
+
+
+    def size( self ) :
+        return self.count
+
+
+    # Times of the first and last states [sec]
+    def time_range( self ) :
+        t = self.columns['t']
+        return ( float( t[0] ), float( t[-1] ) ) if self.count else ( self.t0, self.t0 )
+
+
+    # rows: First row at or after time start and first row at or after stop.
+    # Only the time bins that hold start and stop are read.
+    def rows( self, start=None, stop=None ) :
+        return self.row( start, 0 ), self.row( stop, self.count )
+
+
+    def row( self, t, default ) :
+        if t is None :
+            return default
+        if self.count == 0 or t <= self.t0 :
+            return 0
+        k = int( ( t - self.t0 ) // self.step )
+        if k >= self.index.size - 1 :
+            return self.count
+        # The bin before too, in case of rounding at the bin boundary
+        lo, hi = int( self.index[k - 1 if k else 0] ), int( self.index[k + 1] )
+        return lo + int( np.searchsorted( self.columns['t'][lo:hi], t, side='left' ) )
+
+
+    # slice: States from start (included) to stop (excluded) [sec], views
+    # of the file
+    #
+    # OUTPUTS: t,ids,lat,lon,alt,trk,gs,vs
+    #
+    def slice( self, start=None, stop=None ) :
+        lo, hi = self.rows( start, stop )
+        return tuple( self.columns[name][lo:hi] for name, _ in TRACK_COLUMNS )
+
+
+    # ticks: States from start to stop grouped by time, one time bin of the
+    # index at a time
+    #
+    # OUTPUTS: (t,ids,lat,lon,alt,trk,gs,vs) per tick, t a float
+    #
+    def ticks( self, start=None, stop=None ) :
+        lo, hi = self.rows( start, stop )
+        bounds = np.unique( np.clip( self.index, lo, hi ) )
+        for a, b in zip( bounds[:-1].tolist(), bounds[1:].tolist() ) :
+            t = self.columns['t'][a:b]
+            cuts = np.flatnonzero( t[1:] != t[:-1] ) + 1
+            starts = np.concatenate( ( [ 0 ], cuts ) ) + a
+            ends = np.append( cuts + a, b )
+            for s, e in zip( starts.tolist(), ends.tolist() ) :
+                yield ( float( self.columns['t'][s] ), ) + tuple( self.columns[name][s:e] for name, _ in TRACK_COLUMNS[1:] )
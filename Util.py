@@ -11,7 +11,16 @@
 
 import math
 from math import sin, cos, asin
-from Constants import *
+import numpy as np
+from .Constants import NaR, PI
+
+__all__ = [ 'sq', 'sqrt', 'min', 'max', 'asin_safe', 'sqrt_safe', 'atan2_safe',
+            'discr', 'root', 'topi', 'to360', 'rad2deg', 'deg2rad', 'degmin2rad',
+            'm2nm', 'nm2m', 'knots2msec', 'msec2knots', 'ft2m', 'm2ft',
+            'ftmin2msec', 'msec2ftmin', 'sign', 'gs2vx', 'gs2vy', 'velocity',
+            'sign_array', 'sqrt_safe_array', 'atan2_safe_array', 'root_array',
+            'topi_array', 'to360_array', 'rad2deg_array', 'deg2rad_array',
+            'gs2vx_array', 'gs2vy_array', 'velocity_array' ]
 
 
 # square
@@ -63,7 +72,7 @@ def root( a, b, c, eps ) :
     d = discr( a, b, c )
     if ( d < 0 ) :
         return NaR # this case should never happen
-    return ( -b + eps * math.sqrt( d ) / (2*a) )
+    return ( -b + eps * math.sqrt( d ) ) / (2*a)
 
 
 # To range ( -pi, pi ]
@@ -153,4 +162,75 @@ def gs2vx( gs, trk ) :
 
 # ground speed to vy (trk [rad] in true North-clockwise convention)
 def gs2vy( gs, trk ) :
-    return gs * cos(trk)
\ No newline at end of file
+    return gs * cos(trk)
+
+
+# Velocity vector vx,vy,vz [m/s] of trk [deg], gs [knots], vs [feet/min]
+def velocity( trk, gs, vs ) :
+    v = knots2msec(gs)
+    t = deg2rad(trk)
+    return gs2vx(v,t), gs2vy(v,t), ftmin2msec(vs)
+
+
+# Array versions used by the batch kernels. They mirror the scalar
+# functions above element by element.
+
+# Sign ( 0 is positive ) of each element
+def sign_array( x ) :
+    return np.where( np.asarray( x ) >= 0, 1.0, -1.0 )
+
+
+# sqrt_safe of each element
+def sqrt_safe_array( x ) :
+    return np.sqrt( np.maximum( x, 0 ) )
+
+
+# Atan2 safe of each element
+def atan2_safe_array( y, x ) :
+    return np.where( ( y == 0 ) & ( x == 0 ), 0.0, np.arctan2( y, x ) )
+
+
+# Quadratic equation, NaR where a == 0 or the discriminant is negative
+def root_array( a, b, c, eps ) :
+    d = discr( a, b, c )
+    with np.errstate( divide='ignore', invalid='ignore' ) :
+        r = ( -b + eps * np.sqrt( np.maximum( d, 0 ) ) ) / (2*a)
+    return np.where( ( a == 0 ) | ( d < 0 ), NaR, r )
+
+
+# To range ( -pi, pi ], each element
+def topi_array( x ) :
+    return x - 2*PI * np.ceil( ( x - PI ) / ( 2*PI ) )
+
+
+# To range [0, 360), each element
+def to360_array( x ) :
+    r = x - 360 * np.floor( x / 360.0 )
+    return np.where( r >= 360, r - 360, r )
+
+
+# Radians to degrees in [0, 360), each element
+def rad2deg_array( x ) :
+    return to360_array( np.asarray( x, dtype=float ) * 180 / PI )
+
+
+# Degrees to radians in (-pi, pi], each element
+def deg2rad_array( x ) :
+    return topi_array( np.asarray( x, dtype=float ) * PI / 180.0 )
+
+
+# ground speed to vx, each element (trk [rad] in true North-clockwise convention)
+def gs2vx_array( gs, trk ) :
+    return gs * np.sin(trk)
+
+
+# ground speed to vy, each element (trk [rad] in true North-clockwise convention)
+def gs2vy_array( gs, trk ) :
+    return gs * np.cos(trk)
+
+
+# Velocity vectors vx,vy,vz [m/s] of trk [deg], gs [knots], vs [feet/min], each element
+def velocity_array( trk, gs, vs ) :
+    v = knots2msec( np.asarray( gs, dtype=float ) )
+    t = deg2rad_array( trk )
+    return gs2vx_array(v,t), gs2vy_array(v,t), ftmin2msec( np.asarray( vs, dtype=float ) )
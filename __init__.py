@@ -0,0 +1,29 @@
+#
+# pykb3d
+#
+# Python implementation of the KB3D conflict detection and resolution
+# algorithms. Every module lists its public names in __all__ and imports
+# only the names it uses from the other modules, so importing one module
+# loads its own dependencies and nothing else:
+#
+#   from pykb3d.CD3D import cd3d
+#   from pykb3d.Scene import Scene
+#
+# The modules are also available as attributes of the package, loaded on
+# first access (pykb3d.Scene.Scene). pygeodesy is only loaded by
+# CDR.loc_at_conflict.
+#
+
+import importlib
+
+
+__all__ = [ 'Bands', 'Cache', 'CD3D', 'CD3DBatch', 'CDR', 'Constants', 'Destination', 'Fleet',
+            'Geodesic', 'Index', 'Intent', 'KB3D', 'KB3DBatch', 'LoS', 'Parallel', 'Probability',
+            'Projection', 'Replay', 'Resolver', 'Scene', 'Scheduler', 'Screen', 'Simulation', 'Stream',
+            'TrackStore', 'Util' ]
+
+
+def __getattr__( name ) :
+    if name in __all__ :
+        return importlib.import_module( '.' + name, __name__ )
+    raise AttributeError( "module %r has no attribute %r" % ( __name__, name ) )
@@ -0,0 +1,54 @@
+"""
+Scaling of ParallelScene detection + resolution from 1 to N workers.
+
+Run from the repository root:
+    python benchmarks/bench_parallel.py [aircraft] [max workers]
+
+Defaults: 100k aircraft, as many workers as CPUs. Each line reports the
+best of 3 ticks and the speedup over 1 worker; results are checked
+against the serial Scene.
+
+"""
+import os
+import sys
+import time
+
+# The repository is the pykb3d package: import it from its parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pykb3d.Parallel import ParallelScene  # noqa: E402
+from pykb3d.Scene import Scene  # noqa: E402
+from traffic import random_traffic  # noqa: E402
+
+
+D = 5     # nm
+H = 1000  # ft
+T = 300   # sec
+
+
+def tick(scene):
+    start = time.perf_counter()
+    pairs = scene.detection()
+    scene.resolution()
+    return time.perf_counter() - start, pairs
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    traffic = random_traffic(n, seed=n)
+
+    serial = Scene(D, H, T)
+    serial.set_traffic(*traffic)
+    reference = serial.detection()
+
+    print("%d aircraft, %d CPUs" % (n, os.cpu_count() or 1))
+    base = None
+    for w in range(1, workers + 1):
+        with ParallelScene(D, H, T, workers=w) as scene:
+            scene.set_traffic(*traffic)
+            elapsed, pairs = min(tick(scene) for _ in range(3))
+        base = base or elapsed
+        print("%3d workers: %8.3f s  speedup %5.2f  same conflicts: %s"
+              % (w, elapsed, base / elapsed, pairs == reference))
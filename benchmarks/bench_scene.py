@@ -0,0 +1,52 @@
+"""
+Scene detection with grid pruning at 1k, 10k and 50k aircraft.
+
+Run from the repository root:
+    python benchmarks/bench_scene.py
+
+Brute force is timed (and checked against the pruned result) up to
+10k aircraft only.
+
+"""
+import os
+import sys
+import time
+
+# The repository is the pykb3d package: import it from its parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pykb3d.Scene import Scene  # noqa: E402
+from traffic import random_traffic  # noqa: E402
+
+
+D = 5     # nm
+H = 1000  # ft
+T = 300   # sec
+
+BRUTE_FORCE_LIMIT = 10000
+
+
+def bench(n):
+    scene = Scene(D, H, T)
+    scene.set_traffic(*random_traffic(n, seed=n))
+
+    start = time.perf_counter()
+    pruned = scene.detection()
+    elapsed = time.perf_counter() - start
+
+    total = n * (n - 1) // 2
+    print("%6d aircraft: %10d candidates of %11d pairs (%.3f%%), %5d conflicts, %8.3f s"
+          % (n, scene.candidates, total, 100.0 * scene.candidates / total, len(pruned), elapsed))
+
+    if n <= BRUTE_FORCE_LIMIT:
+        start = time.perf_counter()
+        brute = scene.brute_force()
+        elapsed = time.perf_counter() - start
+        print("%6d aircraft: brute force %8.3f s, same conflicts: %s"
+              % (n, elapsed, brute == pruned))
+
+
+if __name__ == "__main__":
+    for n in (1000, 10000, 50000):
+        bench(n)
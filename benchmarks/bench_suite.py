@@ -0,0 +1,480 @@
+"""
+Benchmark suite: every kernel and pipeline stage at scene sizes from 10 to
+100k aircraft, with throughput and memory.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py [--sizes 10,100,1000,10000,100000]
+                                     [--calls 20000] [--repeat 3]
+                                     [--save FILE] [--compare FILE]
+                                     [--threshold 0.2]
+
+Each scene is built with the synthetic traffic generator (traffic.py).
+Scalar kernels (Geodesic, CD3D, KB3D sub-solvers, CDR) are called on
+candidate pairs of the scene, KB3D sub-solvers and loc_at_conflict on its
+conflicts, at most --calls of them; geodesic kernels get each pair placed
+around 45N. Vector stages process the whole scene. Every line gives
+the number of operations (calls, pairs or aircraft), the best of --repeat
+runs in operations per second, and the peak of memory allocated by one run
+(tracemalloc, in a separate untimed run).
+
+--save writes the results as JSON. --compare reads such a file and exits
+with status 1 when a benchmark is slower than the baseline by more than
+--threshold (default 20%).
+
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# The repository is the pykb3d package: import it from its parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pykb3d.Bands import Bands  # noqa: E402
+from pykb3d.CD3D import CD3D  # noqa: E402
+from pykb3d.CD3DBatch import cd3d_batch, cd3d_sweep  # noqa: E402
+from pykb3d.CDR import CDR  # noqa: E402
+from pykb3d.Destination import ELLIPSOIDAL, FLAT, SPHERICAL, loc_at_conflict_array  # noqa: E402
+from pykb3d.Fleet import Fleet  # noqa: E402
+from pykb3d.Geodesic import Geodesic, gc_dist, true_course  # noqa: E402
+from pykb3d.Intent import Trajectory, cd3d_intent  # noqa: E402
+from pykb3d.KB3D import KB3D  # noqa: E402
+from pykb3d.KB3DBatch import KB3DBatch  # noqa: E402
+from pykb3d.Probability import ConflictProbability  # noqa: E402
+from pykb3d.Projection import TangentPlane  # noqa: E402
+from pykb3d.Replay import ReplayEngine  # noqa: E402
+from pykb3d.Resolver import Resolver  # noqa: E402
+from pykb3d.Scene import Scene  # noqa: E402
+from pykb3d.Scheduler import ResolutionScheduler  # noqa: E402
+from pykb3d.Screen import screen_array  # noqa: E402
+from pykb3d.Simulation import Simulator  # noqa: E402
+from pykb3d.Stream import ConflictMonitor  # noqa: E402
+from pykb3d.TrackStore import TrackStore, write_tracks  # noqa: E402
+from traffic import random_traffic  # noqa: E402
+
+
+D = 5     # nm
+H = 1000  # ft
+T = 300   # sec
+
+LAT0 = 45.0  # deg
+COS0 = math.cos(math.radians(LAT0))
+
+
+def geodesic_pair(traffic, a, b):
+    """ States of aircraft a and b in lat [deg], lon [deg], placed around
+    (LAT0,0) with the relative geometry they have in the flat scene. """
+    x, y = traffic[0], traffic[1]
+    states = []
+    for k in (a, b):
+        lat = LAT0 + (y[k] - y[a]) / 60.0
+        lon = (x[k] - x[a]) / (60.0 * COS0)
+        states.append((lat, lon) + tuple(float(column[k]) for column in traffic[2:]))
+    return states
+
+
+class Workload:
+    """ A scene of n aircraft, its candidate pairs and a sample of them. """
+
+    def __init__(self, n, calls):
+        self.n = n
+        self.traffic = random_traffic(n, seed=n)
+        self.ids = np.arange(n)
+
+        x, y = self.traffic[0], self.traffic[1]
+        # Whole scene in lat [deg], lon [deg], folded into 25N-65N, for the
+        # vector conversions only
+        self.lat = LAT0 + np.mod(y / 60.0, 40.0) - 20.0
+        self.lon = np.mod(x / (60.0 * COS0), 360.0) - 180.0
+
+        self.scene = Scene(D, H, T)
+        self.scene.set_traffic(*self.traffic)
+        self.i, self.j = self.scene.candidate_pairs()
+        conflicts = self.scene.detection()
+
+        rng = np.random.default_rng(n)
+        k = rng.permutation(self.i.size)[:calls]
+        self.pairs = [geodesic_pair(self.traffic, a, b) for a, b in zip(self.i[k].tolist(), self.j[k].tolist())]
+        self.conflicts = [geodesic_pair(self.traffic, a, b) for a, b in conflicts[:calls]]
+
+        x, y, z, vx, vy, vz = self.scene.states()
+        self.relative = [(x[a] - x[b], y[a] - y[b], z[a] - z[b],
+                          vx[a], vy[a], vz[a], vx[b], vy[b], vz[b])
+                         for a, b in zip(self.i[k].tolist(), self.j[k].tolist())]
+
+        # KB3D sub-solvers are defined on pairs meeting the KB3D precondition
+        kb = KB3D(self.scene.d, self.scene.h, self.scene.t)
+        rows = zip(self.scene.own_rows[:calls].tolist(), self.scene.intruder_rows[:calls].tolist())
+        self.resolvable = []
+        for a, b in rows:
+            s = (x[a] - x[b], y[a] - y[b], z[a] - z[b], vx[a], vy[a], vz[a], vx[b], vy[b], vz[b])
+            if kb.precondition(*s) and s[0] ** 2 + s[1] ** 2 > kb.D ** 2:
+                pz = s[2] + kb.time2los * (s[5] - s[8])
+                self.resolvable.append(s + (kb.horizontal_coordination(s[0], s[1], s[3] - s[6], s[4] - s[7]),
+                                            kb.vertical_coordination(s[0], s[1], s[2], pz)))
+
+
+# Scalar kernels: ops = calls
+
+def bench_geo2xy(w):
+    geo = Geodesic()
+    for o, i in w.pairs:
+        geo.geo2xy(o[0], o[1], i[0], i[1])
+    return len(w.pairs)
+
+
+def bench_gc_dist_true_course(w):
+    for o, i in w.pairs:
+        lat_o, lon_o, lat_i, lon_i = map(math.radians, (o[0], o[1], i[0], i[1]))
+        gc_dist(lat_o, lon_o, lat_i, lon_i)
+        true_course(lat_o, lon_o, lat_i, lon_i)
+    return len(w.pairs)
+
+
+def bench_cd3d(w):
+    cd = CD3D(w.scene.d, w.scene.h, w.scene.t)
+    for sx, sy, sz, vox, voy, voz, vix, viy, viz in w.relative:
+        cd.cd3d(sx, sy, sz, vox - vix, voy - viy, voz - viz)
+    return len(w.relative)
+
+
+def kb3d_solver(solver):
+    def bench(w):
+        kb = KB3D(w.scene.d, w.scene.h, w.scene.t)
+        for sx, sy, sz, vox, voy, voz, vix, viy, viz, eps, vertical_eps in w.resolvable:
+            if solver == 'vertical':
+                kb.vertical(sx, sy, sz, vox, voy, voz, vix, viy, viz, vertical_eps)
+            else:
+                getattr(kb, solver)(sx, sy, vox, voy, vix, viy, eps)
+        return len(w.resolvable)
+    return bench
+
+
+def bench_cdr(w):
+    for o, i in w.pairs:
+        cdr = CDR(D, H, T, *o, *i, True)
+        if cdr.detection():
+            cdr.resolution()
+    return len(w.pairs)
+
+
+def bench_scheduler(w):
+    # Conflicts of the scene queued by urgency and all resolved in one tick
+    cdrs = [CDR(D, H, T, *o, *i, True) for o, i in w.conflicts]
+    scheduler = ResolutionScheduler(math.inf)
+    start = time.perf_counter()
+    for k, cdr in enumerate(cdrs):
+        if cdr.detection():
+            scheduler.push(k, -1, cdr)
+    return len(scheduler.resolve()), time.perf_counter() - start
+
+
+def bench_loc_at_conflict(w):
+    cdrs = [CDR(D, H, T, *o, *i, True) for o, i in w.conflicts]
+    for cdr in cdrs:
+        cdr.detection()
+    start = time.perf_counter()
+    for cdr in cdrs:
+        cdr.loc_at_conflict()
+    return len(cdrs), time.perf_counter() - start
+
+
+def loc_at_conflict_tier(tier):
+    def bench(w):
+        cdrs = [CDR(D, H, T, *o, *i, True) for o, i in w.conflicts]
+        conflicts = [cdr for cdr in cdrs if cdr.detection()]
+        columns = [np.array([getattr(cdr, a) for cdr in conflicts], dtype=float) for a in
+                   ('x_o', 'y_o', 'alt_o', 'trk_o', 'gs_o', 'vs_o',
+                    'x_i', 'y_i', 'alt_i', 'trk_i', 'gs_i', 'vs_i', 't_in', 't_out')]
+        start = time.perf_counter()
+        loc_at_conflict_array(*columns, tier=tier)
+        return len(conflicts), time.perf_counter() - start
+    return bench
+
+
+# Vector stages: ops = aircraft or pairs
+
+def bench_projection(w):
+    TangentPlane(LAT0, 0).geo2xy(w.lat, w.lon)
+    return w.n
+
+
+def bench_fleet_update(w):
+    fleet = Fleet(gxy=True)
+    fleet.update(w.ids, w.lat, w.lon, *w.traffic[2:])
+    return w.n
+
+
+def bench_cd3d_batch(w):
+    x, y, z, vx, vy, vz = w.scene.states()
+    a, b = w.i, w.j
+    cd3d_batch(w.scene.d, w.scene.h, w.scene.t, 1, x[a] - x[b], y[a] - y[b], z[a] - z[b],
+               vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b])
+    return a.size
+
+
+def bench_cd3d_sweep(w):
+    # 24 settings: D of 3 to 10 nm, H of 500 to 2000 ft, in pair-settings
+    x, y, z, vx, vy, vz = w.scene.states()
+    a, b = w.i, w.j
+    D = np.repeat([3.0, 4.0, 5.0, 6.0, 8.0, 10.0], 4) * 1852.0
+    H = np.tile([500.0, 800.0, 1000.0, 2000.0], 6) * 0.3048
+    cd3d_sweep(D, H, T, 1, x[a] - x[b], y[a] - y[b], z[a] - z[b],
+               vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b])
+    return a.size * D.size
+
+
+def bench_cd3d_intent(w):
+    # Candidate pairs of the scene on 50-segment plans: the reported states
+    # with a heading change of up to 10 deg every 30 s, in pairs
+    a, b = w.i[:200], w.j[:200]
+    rng = np.random.default_rng(w.n)
+    x, y, z, vx, vy, vz = w.scene.states()
+    t = np.arange(51) * 30.0
+    plans = {}
+    for k in set(a.tolist()) | set(b.tolist()):
+        turn = np.radians(np.cumsum(rng.uniform(-10, 10, 50)))
+        ux = vx[k] * np.cos(turn) + vy[k] * np.sin(turn)
+        uy = vy[k] * np.cos(turn) - vx[k] * np.sin(turn)
+        plans[k] = Trajectory(t, x[k] + np.append(0, np.cumsum(ux * 30)), y[k] + np.append(0, np.cumsum(uy * 30)),
+                              z[k] + vz[k] * t)
+    start = time.perf_counter()
+    cd3d_intent(w.scene.d, w.scene.h, w.scene.t, 1, [plans[k] for k in a.tolist()],
+                [plans[k] for k in b.tolist()], 0.0)
+    return a.size, time.perf_counter() - start
+
+
+def bench_screen_array(w):
+    x, y, z, vx, vy, vz = w.scene.states()
+    a, b = w.i, w.j
+    screen_array(w.scene.d, w.scene.h, w.scene.t, x[a] - x[b], y[a] - y[b], z[a] - z[b],
+                 vx[a] - vx[b], vy[a] - vy[b], vz[a] - vz[b])
+    return a.size
+
+
+def bench_kb3d_batch(w):
+    x, y, z, vx, vy, vz = w.scene.states()
+    a, b = w.scene.own_rows, w.scene.intruder_rows
+    kb = KB3DBatch(w.scene.d, w.scene.h, w.scene.t)
+    kb.kb3d(x[a] - x[b], y[a] - y[b], z[a] - z[b], vx[a], vy[a], vz[a], vx[b], vy[b], vz[b])
+    return a.size
+
+
+def bench_track_bands(w):
+    # Ownship: first aircraft, against its 30 nearest neighbours
+    x, y = w.traffic[0], w.traffic[1]
+    nearest = np.argsort(np.hypot(x - x[0], y - y[0]))[1:31]
+    bands = Bands(D, H, T)
+    bands.set_ownship(*(float(c[0]) for c in w.traffic))
+    bands.set_traffic(*(c[nearest] for c in w.traffic))
+    bands.track_bands()
+    return int(360 / bands.get_track_step()) * nearest.size
+
+
+def bench_resolver(w):
+    # Ownship: first aircraft in conflict, against its 50 nearest neighbours
+    if w.scene.own_rows.size == 0:
+        return 0
+    own = w.scene.own_rows[0]
+    x, y = w.traffic[0], w.traffic[1]
+    nearest = np.argsort(np.hypot(x - x[own], y - y[own]))[1:51]
+    resolver = Resolver(D, H, T)
+    resolver.set_ownship(*(float(c[own]) for c in w.traffic))
+    resolver.set_traffic(*(c[nearest] for c in w.traffic))
+    resolver.resolution()
+    return nearest.size
+
+
+def bench_probability(w):
+    # 1000 samples of the conflicting pairs, in pair-samples
+    cp = ConflictProbability(D, H, T, samples=1000, seed=0)
+    cp.set_traffic(*w.traffic)
+    cp.set_position_error([30, 30, 15])
+    cp.set_velocity_error([2, 2, 1])
+    cp.probability(w.scene.own_rows, w.scene.intruder_rows)
+    return w.scene.own_rows.size * 1000
+
+
+def bench_scene_detection(w):
+    scene = Scene(D, H, T)
+    scene.set_traffic(*w.traffic)
+    scene.detection()
+    return w.n
+
+
+def bench_scene_resolution(w):
+    w.scene.resolution()
+    return w.scene.own_rows.size
+
+
+def bench_scene_pair_resolution(w):
+    w.scene.pair_resolution()
+    return 2 * w.scene.own_rows.size
+
+
+def bench_stream_tick(w):
+    monitor = ConflictMonitor(D, H, T)
+    monitor.process(0, w.ids, *w.traffic)
+    # Timed: one tick where a tenth of the aircraft report
+    rows = w.ids[::10]
+    start = time.perf_counter()
+    monitor.process(5, rows, *(column[rows] for column in w.traffic))
+    return rows.size, time.perf_counter() - start
+
+
+def bench_simulator(w):
+    # 24 steps of 5 s of the scene, with KB3D maneuvers, in aircraft-steps
+    sim = Simulator(D, H, T, dt=5.0)
+    sim.set_traffic(*w.traffic)
+    sim.run(120)
+    return w.n * sim.steps
+
+
+def bench_track_store(w):
+    # 60 ticks of the scene, 5 s apart, in a track store
+    ticks = 60
+    t = np.repeat(np.arange(ticks) * 5.0, w.n)
+    columns = [np.tile(c, ticks) for c in (w.ids, w.lat, w.lon) + tuple(w.traffic[2:])]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'tracks.trk')
+        write_tracks(path, t, *columns)
+        store = TrackStore(path)
+        # Timed: reading every tick of the store
+        start = time.perf_counter()
+        states = sum(tick[1].size for tick in store.ticks())
+        elapsed = time.perf_counter() - start
+        del store
+    return states, elapsed
+
+
+def bench_replay(w):
+    # 12 ticks of the scene, 5 s apart, in a track store
+    ticks = 12
+    t = np.repeat(np.arange(ticks) * 5.0, w.n)
+    columns = [np.tile(c, ticks) for c in (w.ids, w.lat, w.lon) + tuple(w.traffic[2:])]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'tracks.trk')
+        write_tracks(path, t, *columns)
+        # Timed: detection and resolution at every tick, in aircraft-ticks
+        engine = ReplayEngine(D, H, T)
+        for _ in engine.run(path):
+            pass
+    return engine.aircraft_ticks, engine.elapsed
+
+
+BENCHMARKS = [
+    ('Geodesic.geo2xy', bench_geo2xy),
+    ('gc_dist+true_course', bench_gc_dist_true_course),
+    ('CD3D.cd3d', bench_cd3d),
+    ('KB3D.ground_speed', kb3d_solver('ground_speed')),
+    ('KB3D.track', kb3d_solver('track')),
+    ('KB3D.optimal', kb3d_solver('optimal')),
+    ('KB3D.vertical', kb3d_solver('vertical')),
+    ('CDR.detection+resolution', bench_cdr),
+    ('CDR.loc_at_conflict', bench_loc_at_conflict),
+    ('ResolutionScheduler.resolve', bench_scheduler),
+    ('loc_at_conflict_array/' + ELLIPSOIDAL, loc_at_conflict_tier(ELLIPSOIDAL)),
+    ('loc_at_conflict_array/' + SPHERICAL, loc_at_conflict_tier(SPHERICAL)),
+    ('loc_at_conflict_array/' + FLAT, loc_at_conflict_tier(FLAT)),
+    ('TangentPlane.geo2xy', bench_projection),
+    ('Fleet.update', bench_fleet_update),
+    ('screen_array', bench_screen_array),
+    ('cd3d_batch', bench_cd3d_batch),
+    ('cd3d_sweep', bench_cd3d_sweep),
+    ('cd3d_intent', bench_cd3d_intent),
+    ('KB3DBatch.kb3d', bench_kb3d_batch),
+    ('Bands.track_bands', bench_track_bands),
+    ('Resolver.resolution', bench_resolver),
+    ('ConflictProbability', bench_probability),
+    ('Scene.detection', bench_scene_detection),
+    ('Scene.resolution', bench_scene_resolution),
+    ('Scene.pair_resolution', bench_scene_pair_resolution),
+    ('ConflictMonitor.process', bench_stream_tick),
+    ('Simulator.run', bench_simulator),
+    ('TrackStore.ticks', bench_track_store),
+    ('ReplayEngine.run', bench_replay),
+]
+
+
+def run(bench, w):
+    """ ops and elapsed time [sec] of one run. Benchmarks with a setup
+    return their own timing. """
+    start = time.perf_counter()
+    result = bench(w)
+    elapsed = time.perf_counter() - start
+    if isinstance(result, tuple):
+        return result
+    return result, elapsed
+
+
+def measure(bench, w, repeat):
+    ops, best = 0, math.inf
+    for _ in range(repeat):
+        ops, elapsed = run(bench, w)
+        best = min(best, elapsed)
+    tracemalloc.start()
+    run(bench, w)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ops, (ops / best if ops and best > 0 else 0.0), peak
+
+
+def compare(results, baseline, threshold):
+    """ Benchmarks slower than the baseline by more than threshold. """
+    reference = {(r['name'], r['n']): r for r in baseline}
+    slower = []
+    for r in results:
+        base = reference.get((r['name'], r['n']))
+        if base and base['ops_per_sec'] > 0 and r['ops_per_sec'] < (1 - threshold) * base['ops_per_sec']:
+            slower.append((r, base))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000,100000')
+    parser.add_argument('--calls', type=int, default=20000,
+                        help='largest number of calls of a scalar kernel')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default='', help='comma separated benchmark names')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    only = set(filter(None, args.only.split(',')))
+    results = []
+    print("%-34s %7s %9s %14s %10s" % ('benchmark', 'n', 'ops', 'ops/sec', 'peak MiB'))
+    for n in (int(s) for s in args.sizes.split(',')):
+        w = Workload(n, args.calls)
+        for name, bench in BENCHMARKS:
+            if only and name not in only:
+                continue
+            ops, rate, peak = measure(bench, w, args.repeat)
+            print("%-34s %7d %9d %14.1f %10.2f" % (name, n, ops, rate, peak / 2.0 ** 20))
+            results.append({'name': name, 'n': n, 'ops': ops,
+                            'ops_per_sec': rate, 'peak_bytes': peak})
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.threshold)
+        for r, base in slower:
+            print("REGRESSION %s at %d aircraft: %.1f ops/sec, baseline %.1f"
+                  % (r['name'], r['n'], r['ops_per_sec'], base['ops_per_sec']))
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Synthetic traffic generator for the benchmarks.
+
+Aircraft are spread uniformly over a square area whose side is chosen to
+keep a fixed traffic density. Most aircraft are level at a flight level,
+the others climb or descend. States use the CDR units:
+x [nm], y [nm], alt [feet], trk [deg], gs [knots], vs [feet/min]
+
+"""
+import numpy as np
+
+
+def random_traffic(n, seed=0, density=5.0):
+    """
+    n aircraft with `density` aircraft per 10 000 square nautical miles.
+    Returns the arrays x, y, alt, trk, gs, vs.
+    """
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(n / density * 1e4)
+
+    x = rng.uniform(0, side, n)
+    y = rng.uniform(0, side, n)
+    alt = rng.integers(200, 410, n) * 100.0
+    trk = rng.uniform(0, 360, n)
+    gs = rng.uniform(350, 500, n)
+    vs = np.zeros(n)
+
+    moving = rng.random(n) < 0.3
+    vs[moving] = rng.choice([-1, 1], moving.sum()) * rng.uniform(500, 2500, moving.sum())
+    alt[~moving] = np.round(alt[~moving] / 1000) * 1000
+
+    return x, y, alt, trk, gs, vs
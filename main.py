@@ -7,15 +7,12 @@
 # http://research.nianet.org/fm-at-nia/KB3D
 #
 # The below Python implementation was done by Phu Tran @ ATMRI
+#
+# Run from the directory containing the package: python -m pykb3d.main
 #/
 
-from Constants import *
-from Util import *
-from LoS import *
-from Geodesic import *
-from CDR import *
-from CD3D import *
-from KB3D import *
+from .Constants import NaR
+from .CDR import CDR
 
 
 def run( D, H, T, ownship, traffic ) :
@@ -66,7 +63,7 @@ def run( D, H, T, ownship, traffic ) :
 
 
 
-        if cdr.gxy and cdr.cd.conflict :
+        if cdr.gxy and cdr.conflict :
             cdr.loc_at_conflict()
             print("Locations at loss in the format: [ lon[deg] lat[deg] alt[ft] ] ")
             print("Ownship entry loss:", cdr.loc_at_entry_o )
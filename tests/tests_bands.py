@@ -0,0 +1,58 @@
+"""
+Conflict bands must agree with CDR detection for every candidate track,
+ground speed and vertical speed, and merge the candidates into intervals.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Bands import Bands, merge_intervals
+from pykb3d.CDR import CDR
+from pykb3d.tests.traffic import random_traffic
+
+
+class TestBands(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.own = (0.0, 0.0, 30000.0, 90.0, 450.0, 0.0)
+        self.traffic = random_traffic(30, 8, (-40, 40), (290, 300, 310), (-500.0, 0.0, 500.0))
+        self.bands = Bands(5, 1000, 300)
+        self.bands.set_ownship(*self.own)
+        self.bands.set_traffic(*self.traffic)
+
+    def detection(self, trk, gs, vs):
+        return any(CDR(5, 1000, 300, *self.own[:3], trk, gs, vs,
+                       *(c[k] for c in self.traffic), False).detection()
+                   for k in range(self.traffic[0].size))
+
+    def check(self, intervals, candidates, state):
+        self.assertGreater(len(intervals), 0)
+        for value in candidates:
+            expected = self.detection(*state(value))
+            self.assertTrue(any(c == expected for lo, hi, c in intervals
+                                if lo <= value <= hi or (lo > hi and (value >= lo or value <= hi))))
+
+    def test_track(self):
+        intervals = self.bands.track_bands()
+        self.assertEqual(len({c for _, _, c in intervals}), 2)
+        self.check(intervals, range(0, 360, 5), lambda trk: (trk, 450, 0))
+
+    def test_gs_vs(self):
+        self.check(self.bands.gs_bands(), range(150, 601, 25), lambda gs: (90, gs, 0))
+        self.check(self.bands.vs_bands(), range(-3000, 3001, 500), lambda vs: (90, 450, vs))
+
+    def test_merge(self):
+        values = np.arange(0, 360, 90)
+        self.assertEqual(merge_intervals(values, [True, False, False, True], circular=True),
+                         [(270, 0, True), (90, 180, False)])
+        self.assertEqual(merge_intervals(values, [True, False, False, True]),
+                         [(0, 0, True), (90, 180, False), (270, 270, True)])
+        self.assertEqual(merge_intervals(values, [False] * 4, circular=True), [(0, 270, False)])
+
+        self.bands.set_traffic([], [], [], [], [], [])
+        self.assertEqual(self.bands.vs_bands(), [(-3000.0, 3000.0, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
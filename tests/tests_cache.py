@@ -0,0 +1,120 @@
+"""
+The resolution cache must answer repeated and quantized states from its
+entries, evict the least recently used ones, bypass states near branch
+boundaries, and stay close to the direct solvers.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CD3D import cd3d
+from pykb3d.Cache import ResolutionCache, near_boundary, near_maneuver_boundary
+from pykb3d.Constants import NaR
+from pykb3d.KB3D import kb3d
+
+
+D = 9260.0  # 5 nm
+H = 304.8   # 1000 ft
+T = 300.0
+
+HEAD_ON = (-20000.0, 500.0, 0.0, 200.0, 0.0, 0.0, -150.0, 20.0, 0.0)
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cache = ResolutionCache(D, H, T)
+
+    def test_hits(self):
+        expected = kb3d(D, H, T, *HEAD_ON)
+        self.assertNotEqual(expected[0], NaR)
+        self.assertEqual(self.cache.kb3d(*HEAD_ON), expected)
+        self.assertEqual(self.cache.kb3d(*HEAD_ON), expected)
+        # Within the quantization steps: same entry
+        moved = np.add(HEAD_ON, [0.3, -0.2, 0.1, 0.002, 0, 0, 0, -0.004, 0])
+        self.assertEqual(self.cache.kb3d(*moved), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.bypassed), (2, 1, 0))
+
+        state = HEAD_ON[:3] + tuple(np.subtract(HEAD_ON[3:6], HEAD_ON[6:]))
+        self.assertEqual(self.cache.cd3d(1, *state), cd3d(D, H, T, 1, *state))
+        self.cache.cd3d(1, *state)
+        self.cache.cd3d(0, *state)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 3))
+        self.assertAlmostEqual(self.cache.hit_rate(), 0.5)
+
+    def test_eviction(self):
+        self.cache.set_size(2)
+        states = [np.add(HEAD_ON, [0, 100.0 * k, 0, 0, 0, 0, 0, 0, 0]) for k in range(3)]
+        self.cache.kb3d(*states[0])
+        self.cache.kb3d(*states[1])
+        self.cache.kb3d(*states[0])
+        self.cache.kb3d(*states[2])  # evicts states[1]
+        self.cache.kb3d(*states[0])
+        self.cache.kb3d(*states[1])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+        self.assertEqual(len(self.cache.entries), 2)
+
+    def test_guard(self):
+        # Closest approach now, and separation boundary at the lookahead time
+        self.assertTrue(near_boundary(D, H, T, 1e-3, 20000.0, 0.0, 0.0, 0.0, 50.0, 0.0))
+        self.assertTrue(near_boundary(D, H, T, 1e-3, -T * 100.0 - D, 0.0, 0.0, 100.0, 0.0, 0.0))
+        self.assertFalse(near_boundary(D, H, T, 1e-3, *HEAD_ON[:3], 350.0, -20.0, 0.0))
+        boundary = (-20000.0, 0.0, 0.0, 200.0, 0.0, 0.0, -200.0, 0.0, 0.0)
+        self.cache.kb3d(*boundary)
+        self.cache.kb3d(*boundary)
+        self.assertEqual(self.cache.bypassed, 2)
+        self.cache.set_guard(0)
+        self.cache.kb3d(*boundary)
+        self.cache.kb3d(*boundary)
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.bypassed), (1, 1, 2))
+
+    def test_maneuver_guard(self):
+        # States only near a tau_pos or contact time boundary of a candidate
+        # maneuver: their cell keeps no result
+        rng = np.random.default_rng(1)
+        found = 0
+        for _ in range(5000):
+            state = np.concatenate((rng.uniform(-40000, 40000, 2), rng.uniform(-900, 900, 1),
+                                    rng.uniform(-250, 250, 2), rng.uniform(-15, 15, 1),
+                                    rng.uniform(-250, 250, 2), rng.uniform(-15, 15, 1)))
+            relative = (*state[:3], *(state[3:6] - state[6:]))
+            if not cd3d(D, H, T, 0, *relative)[0] or \
+               near_boundary(D, H, T, 1e-2, *relative, tuple(state[3:5]), tuple(state[6:8])) or \
+               not near_maneuver_boundary(D, 1e-2, state[0], state[1], *state[3:5], *state[6:8]):
+                continue
+            found += 1
+            self.cache.clear()
+            for _ in range(2):
+                self.assertEqual(self.cache.kb3d(*state), kb3d(D, H, T, *state))
+            self.assertEqual((self.cache.hits, self.cache.misses, self.cache.bypassed), (0, 0, 2))
+        self.assertGreater(found, 0)
+
+    def test_accuracy(self):
+        rng = np.random.default_rng(1)
+        checked = 0
+        for _ in range(5000):
+            state = np.concatenate((rng.uniform(-40000, 40000, 2), rng.uniform(-900, 900, 1),
+                                    rng.uniform(-250, 250, 2), rng.uniform(-15, 15, 1),
+                                    rng.uniform(-250, 250, 2), rng.uniform(-15, 15, 1)))
+            if not cd3d(D, H, T, 0, *state[:3], *(state[3:6] - state[6:]))[0]:
+                continue
+            self.cache.clear()
+            self.cache.kb3d(*state)
+            moved = np.concatenate((np.round(state[:3]) + rng.uniform(-0.49, 0.49, 3),
+                                    np.round(state[3:], 2) + rng.uniform(-0.0049, 0.0049, 6)))
+            cached = self.cache.kb3d(*moved)
+            if self.cache.hits == 0:
+                continue
+            checked += 1
+            # Tracks within 0.01 rad, speeds within 1% or 0.1 m/s
+            for k, (actual, expectation) in enumerate(zip(cached, kb3d(D, H, T, *moved))):
+                self.assertEqual(actual == NaR, expectation == NaR)
+                if actual != NaR:
+                    tolerance = 1e-2 if k in (0, 2) else 1e-2 * max(10.0, abs(expectation))
+                    self.assertLess(abs(actual - expectation), tolerance)
+        self.assertGreater(checked, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Check that the batch detector returns, for every pair, exactly what the
+scalar CD3D.cd3d returns for the same relative state, and that a sweep
+returns for every setting what the batch detector returns.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CD3D import CD3D
+from pykb3d.CD3DBatch import CD3DBatch, cd3d_batch, cd3d_sweep
+
+
+class TestCD3DBatch(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.D = 9260.0  # 5 nm
+        self.H = 304.8   # 1000 ft
+        self.T = 300.0
+        self.filter = 1
+
+        rng = np.random.default_rng(7)
+        n = 4000
+        self.sx = rng.uniform(-60000, 60000, n)
+        self.sy = rng.uniform(-60000, 60000, n)
+        self.sz = rng.uniform(-1500, 1500, n)
+        self.vx = rng.uniform(-450, 450, n)
+        self.vy = rng.uniform(-450, 450, n)
+        self.vz = rng.uniform(-30, 30, n)
+
+        # Exercise the special branches of cd3d
+        self.vz[::5] = 0
+        self.vx[::7] = 0
+        self.vy[::7] = 0
+        self.sx[::14] = rng.uniform(-5000, 5000, self.sx[::14].size)
+        self.sy[::14] = 0
+        self.sz[::3] = rng.uniform(-200, 200, self.sz[::3].size)
+
+    def scalar(self, i):
+        cd = CD3D(self.D, self.H, self.T)
+        cd.set_filter(self.filter)
+        cd.cd3d(self.sx[i], self.sy[i], self.sz[i],
+                self.vx[i], self.vy[i], self.vz[i])
+        return (cd.conflict, cd.t_in, cd.t_out, cd.time2los,
+                cd.time2lhs, cd.time2lvs, cd.duration)
+
+    def test_matches_scalar(self):
+        batch = cd3d_batch(self.D, self.H, self.T, self.filter,
+                           self.sx, self.sy, self.sz,
+                           self.vx, self.vy, self.vz)
+
+        for i in range(self.sx.size):
+            expectation = self.scalar(i)
+            actual = tuple(column[i] for column in batch)
+            self.assertEqual(actual, expectation, msg="pair %d" % i)
+
+        self.assertTrue(batch[0].any())
+        self.assertFalse(batch[0].all())
+
+    def test_class_interface(self):
+        cd = CD3DBatch(self.D, self.H, self.T)
+        cd.set_filter(self.filter)
+        conflict = cd.cd3d(self.sx, self.sy, self.sz,
+                           self.vx, self.vy, self.vz)
+
+        self.assertIs(conflict, cd.conflict)
+        self.assertEqual(cd.time2los.shape, self.sx.shape)
+
+        violation = cd.violation(self.sx, self.sy, self.sz)
+        single = CD3D(self.D, self.H, self.T)
+        for i in range(0, self.sx.size, 13):
+            self.assertEqual(
+                violation[i],
+                single.violation(self.sx[i], self.sy[i], self.sz[i]))
+
+    def test_sweep(self):
+        D = np.array([5556.0, 9260.0, 9260.0, 18520.0])
+        H = np.array([304.8, 304.8, 152.4, 609.6])
+        T = np.array([120.0, 300.0, 300.0, 600.0])
+        sweep = cd3d_sweep(D, H, T, self.filter, self.sx, self.sy, self.sz,
+                           self.vx, self.vy, self.vz)
+        for m in range(D.size):
+            batch = cd3d_batch(D[m], H[m], T[m], self.filter,
+                               self.sx, self.sy, self.sz,
+                               self.vx, self.vy, self.vz)
+            for actual, expectation in zip(sweep, batch):
+                self.assertEqual(actual.shape, (self.sx.size, D.size))
+                np.testing.assert_array_equal(actual[:, m], expectation)
+        self.assertGreater(sweep[0][:, 3].sum(), sweep[0][:, 0].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
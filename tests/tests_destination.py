@@ -0,0 +1,71 @@
+"""
+The batched locations at conflict must match CDR.loc_at_conflict with the
+ellipsoidal tier, and the faster tiers must stay within their documented
+error against Vincenty.
+
+"""
+import unittest
+
+import numpy as np
+from geographiclib.geodesic import Geodesic
+
+from pykb3d.CDR import CDR
+from pykb3d.Destination import (FLAT, SPHERICAL, ELLIPSOIDAL, destination_array,
+                                loc_at_conflict_array)
+
+
+class TestDestination(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(11)
+        n = 500
+        self.lat = rng.uniform(-60, 60, n)
+        self.lon = rng.uniform(-180, 180, n)
+        self.trk = rng.uniform(0, 360, n)
+
+    def error(self, dist, tier):
+        lat, lon = destination_array(self.lat, self.lon, dist, self.trk, tier)
+        reference = destination_array(self.lat, self.lon, dist, self.trk, ELLIPSOIDAL)
+        return max(Geodesic.WGS84.Inverse(*p)['s12']
+                   for p in zip(lat, lon, *reference))
+
+    def test_vincenty(self):
+        for lat, lon, trk in zip(self.lat[:20], self.lon[:20], self.trk[:20]):
+            g = Geodesic.WGS84.Direct(lat, lon, trk, 150000.0)
+            lat2, lon2 = destination_array(lat, lon, 150000.0, trk)
+            self.assertAlmostEqual(float(lat2), g['lat2'], places=8)
+            self.assertAlmostEqual(float(lon2), g['lon2'], places=8)
+
+    def test_tiers(self):
+        self.assertLess(self.error(100000.0, SPHERICAL), 10)
+        self.assertLess(self.error(200000.0, SPHERICAL), 40)
+        self.assertLess(self.error(10000.0, FLAT), 30)
+        self.assertLess(self.error(100000.0, FLAT), 3000)
+        self.assertRaises(ValueError, destination_array, 0, 0, 0, 0, 'conformal')
+
+    def test_loc_at_conflict(self):
+        rng = np.random.default_rng(3)
+        cdrs = []
+        while len(cdrs) < 30:
+            lat, lon = rng.uniform(-50, 50), rng.uniform(-170, 170)
+            trk = rng.uniform(0, 360)
+            cdr = CDR(5, 1000, 300, lat, lon, 30000, trk, 450, 0,
+                      lat + rng.uniform(-0.3, 0.3), lon + rng.uniform(-0.3, 0.3),
+                      30000 + rng.uniform(-500, 500), rng.uniform(0, 360), 420,
+                      rng.choice([-1000, 0, 1000]), True)
+            if cdr.detection():
+                cdr.loc_at_conflict()
+                cdrs.append(cdr)
+
+        columns = [np.array([getattr(c, a) for c in cdrs], dtype=float) for a in
+                   ('x_o', 'y_o', 'alt_o', 'trk_o', 'gs_o', 'vs_o',
+                    'x_i', 'y_i', 'alt_i', 'trk_i', 'gs_i', 'vs_i', 't_in', 't_out')]
+        locations = loc_at_conflict_array(*columns)
+        for k, c in enumerate(cdrs):
+            for expected, actual in zip((c.loc_at_entry_o, c.loc_at_exit_o,
+                                         c.loc_at_entry_i, c.loc_at_exit_i), locations):
+                np.testing.assert_allclose([a[k] for a in actual], expected, atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Pairs read from the fleet table must give the same detection and
+resolution results as a CDR built from the same states, and so must a
+Scene running against the table.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Constants import NaR
+from pykb3d.CDR import CDR
+from pykb3d.Fleet import Fleet
+from pykb3d.Scene import Scene
+
+
+OUTPUTS = ('sx', 'sy', 'sz', 'vox', 'voy', 'voz', 'vix', 'viy', 'viz',
+           'time2los', 't_in', 't_out', 'duration', 'recovery',
+           'newtrk', 'newgs', 'newvs', 'opttrk', 'optgs')
+
+
+def random_states(n, seed, gxy):
+    rng = np.random.default_rng(seed)
+    if gxy:
+        x = 10 + rng.uniform(-0.3, 0.3, n)
+        y = rng.uniform(-0.3, 0.3, n)
+    else:
+        x = rng.uniform(0, 40, n)
+        y = rng.uniform(0, 40, n)
+    alt = rng.choice([10000.0, 10500.0, 11000.0], n)
+    trk = rng.uniform(0, 360, n)
+    gs = rng.uniform(250, 450, n)
+    vs = rng.choice([-500.0, 0.0, 500.0], n)
+    return x, y, alt, trk, gs, vs
+
+
+class TestFleet(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.ids = np.arange(40) * 3 + 100
+        self.states = random_states(self.ids.size, 1, True)
+        self.fleet = Fleet(gxy=True)
+        self.fleet.insert(self.ids, *self.states)
+
+    def state(self, k):
+        return tuple(float(column[k]) for column in self.states)
+
+    def test_same_as_cdr(self):
+        conflicts = 0
+        for o, own in enumerate(self.ids):
+            for i, intruder in enumerate(self.ids):
+                if o == i:
+                    continue
+                pair = self.fleet.pair(5, 1000, 300, own, intruder)
+                cdr = CDR(5, 1000, 300, *self.state(o), *self.state(i), True)
+                self.assertEqual(pair.detection(), cdr.detection())
+                if cdr.detection():
+                    conflicts += 1
+                    pair.resolution()
+                    cdr.resolution()
+                for name in OUTPUTS:
+                    self.assertAlmostEqual(
+                        getattr(pair, name), getattr(cdr, name), places=6,
+                        msg="%s of %d/%d" % (name, own, intruder))
+        self.assertGreater(conflicts, 0)
+
+    def test_bulk_operations(self):
+        self.fleet.update(self.ids[:2], 10, 0, 10000, 90, 360, 0)
+        vx, vy, vz = self.fleet.velocity(self.ids[1])
+        self.assertAlmostEqual(vx, 360 * 1852 / 3600.0)
+        self.assertAlmostEqual(vy, 0, places=6)
+        self.assertEqual(vz, 0)
+        x, y, alt, trk, gs, vs = self.fleet.state(self.ids[0])
+        self.assertEqual(trk, 90)
+        self.assertEqual(gs, 360)
+
+        # update inserts unknown aircraft, keeping the table sorted by id
+        self.fleet.update([7, 5], 10, 0, 10000, 90, 360, 0)
+        self.assertEqual(self.fleet.size(), self.ids.size + 2)
+        self.assertTrue((np.diff(self.fleet.ids()) > 0).all())
+
+        self.fleet.delete([5, self.ids[3]])
+        self.assertFalse(self.fleet.contains(5))
+        self.assertFalse(self.fleet.contains(self.ids[3]))
+        self.assertTrue(self.fleet.contains(7))
+        self.assertEqual(self.fleet.size(), self.ids.size)
+
+        self.assertRaises(ValueError, self.fleet.insert, [7], 0, 0, 0, 0, 0, 0)
+        self.assertRaises(KeyError, self.fleet.delete, [5])
+
+    def test_memory(self):
+        self.assertLessEqual(self.fleet.nbytes() / self.fleet.size(), 80)
+
+    def test_scene(self):
+        ids = np.arange(60)
+        states = random_states(ids.size, 2, False)
+        fleet = Fleet(gxy=False)
+        fleet.insert(ids, *states)
+
+        scene = Scene(5, 1000, 300)
+        scene.set_fleet(fleet)
+        pairs = scene.detection()
+        scene.resolution()
+        self.assertGreater(len(pairs), 0)
+
+        for k, (own, intruder) in enumerate(pairs):
+            cdr = CDR(5, 1000, 300,
+                      *(float(c[own]) for c in states),
+                      *(float(c[intruder]) for c in states), False)
+            self.assertTrue(cdr.detection())
+            cdr.resolution()
+            self.assertAlmostEqual(scene.time2los[k], cdr.time2los, places=6)
+            self.assertEqual(scene.recovery[k], cdr.recovery)
+            for name in ('newtrk', 'newgs', 'newvs', 'opttrk', 'optgs'):
+                expectation = getattr(cdr, name)
+                actual = getattr(scene, name)[k]
+                if expectation == NaR:
+                    self.assertEqual(actual, NaR)
+                else:
+                    self.assertAlmostEqual(actual, expectation, places=4,
+                                           msg="%s of %d/%d" % (name, own, intruder))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,12 +7,15 @@ Author: @tanthml
 """
 import unittest
 
+import numpy as np
 from geopy.point import Point
 from geopy.distance import great_circle
 from geographiclib.geodesic import Geodesic
 
 from pykb3d.Util import deg2rad, rad2deg
 from pykb3d.Geodesic import gc_dist, true_course
+from pykb3d.Geodesic import Geodesic as FlatEarth
+from pykb3d.Projection import TangentPlane
 
 
 class TestGeodesic(unittest.TestCase):
@@ -61,5 +64,47 @@ class TestGeodesic(unittest.TestCase):
         self.assertAlmostEqual(actual, expectation, places=0)
 
 
+class TestTangentPlane(unittest.TestCase):
+    """
+    The shared tangent plane must reproduce the per-pair flat earth
+    relative positions of Geodesic.geo2xy within the documented bounds.
+    """
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(5)
+        n = 500
+        self.lat0, self.lon0 = 45.0, 2.0
+        self.lat_o = rng.uniform(43, 47, n)
+        self.lon_o = rng.uniform(-1, 5, n)
+        self.lat_i = self.lat_o + rng.uniform(-0.3, 0.3, n)
+        self.lon_i = self.lon_o + rng.uniform(-0.3, 0.3, n)
+
+    def test_relative_position(self):
+        plane = TangentPlane(self.lat0, self.lon0)
+        x_o, y_o = plane.geo2xy(self.lat_o, self.lon_o)
+        x_i, y_i = plane.geo2xy(self.lat_i, self.lon_i)
+        ex, ey = plane.scale_error(self.lat_i)
+
+        geo = FlatEarth()
+        for k in range(self.lat_o.size):
+            geo.geo2xy(self.lat_o[k], self.lon_o[k],
+                       self.lat_i[k], self.lon_i[k])
+            self.assertAlmostEqual(x_o[k] - x_i[k], geo.sx * (1 + ex[k]),
+                                   delta=1e-6)
+            self.assertAlmostEqual(y_o[k] - y_i[k], geo.sy * (1 + ey[k]),
+                                   delta=1e-6)
+
+        # 1 deg away from the reference at 45 deg of latitude
+        ex, ey = plane.scale_error(46)
+        self.assertLess(abs(ex), 0.02)
+        self.assertLess(abs(ey), 0.0002)
+
+    def test_reference(self):
+        plane = TangentPlane(self.lat0, self.lon0)
+        x, y = plane.geo2xy([self.lat0], [self.lon0])
+        self.assertEqual((x[0], y[0]), (0, 0))
+        self.assertEqual(plane.scale_error(self.lat0), (0, 0))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+"""
+With altitude bands, the grid must list each pair of neighbouring aircraft
+with overlapping band ranges exactly once, never drop a pair that can lose
+vertical separation, and the band ranges must follow climbing and
+descending aircraft incrementally.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Index import UniformGrid, AltitudeBands
+from pykb3d.tests.traffic import random_traffic
+
+
+H = 304.8  # 1000 ft
+T = 300.0
+
+
+def traffic(n, seed):
+    # Shared traffic in metres, at levels multiple of H, a third of the
+    # aircraft climbing or descending at up to 2400 fpm
+    x, y, alt, _, _, vs = random_traffic(n, seed, (0, 216), np.arange(200, 410, 10),
+                                         np.append(np.linspace(-2400, 2400, 41), np.zeros(80)))
+    return x * 1852.0, y * 1852.0, alt * 0.3048, vs * 0.3048 / 60
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.x, self.y, self.z, self.vz = traffic(3000, 2)
+        self.bands = AltitudeBands(H, T)
+        self.bands.build(self.z, self.vz)
+        self.grid = UniformGrid(50000.0)
+        self.grid.build(self.x, self.y, self.bands.lo, self.bands.hi)
+
+    def expected(self):
+        plain = UniformGrid(50000.0)
+        plain.build(self.x, self.y)
+        i, j = plain.candidate_pairs()
+        lo, hi = self.bands.lo, self.bands.hi
+        keep = (lo[i] <= hi[j]) & (lo[j] <= hi[i])
+        return i[keep], j[keep]
+
+    def test_candidate_pairs(self):
+        i, j = self.grid.candidate_pairs()
+        ei, ej = self.expected()
+        np.testing.assert_array_equal(i, ei)
+        np.testing.assert_array_equal(j, ej)
+
+        # Pairs that come closer than H vertically within T are all listed
+        listed = set(zip(i.tolist(), j.tolist()))
+        plain = UniformGrid(50000.0)
+        plain.build(self.x, self.y)
+        a, b = plain.candidate_pairs()
+        start = self.z[a] - self.z[b]
+        end = start + (self.vz[a] - self.vz[b]) * T
+        closest = np.where(start * end <= 0, 0, np.minimum(np.abs(start), np.abs(end)))
+        close = closest < H
+        self.assertGreater(close.sum(), 0)
+        self.assertTrue(set(zip(a[close].tolist(), b[close].tolist())) <= listed)
+
+        # Level aircraft only meet the aircraft of the neighbouring levels
+        level = np.flatnonzero(self.vz == 0)
+        self.assertTrue(np.all(self.bands.hi[level] - self.bands.lo[level] == 1))
+
+    def test_pairs_of(self):
+        rows = np.arange(0, 3000, 7)
+        i, j = self.grid.pairs_of(rows)
+        ei, ej = self.expected()
+        keep = np.isin(ei, rows) | np.isin(ej, rows)
+        np.testing.assert_array_equal(i, ei[keep])
+        np.testing.assert_array_equal(j, ej[keep])
+
+    def test_update(self):
+        bands = AltitudeBands(H, T)
+        rows = np.arange(self.z.size)
+        self.assertEqual(bands.update(rows, self.z, self.vz).size, rows.size)
+        # 10 s later, only some of the climbing and descending aircraft
+        # change bands
+        z = self.z + self.vz * 10
+        changed = bands.update(rows, z, self.vz)
+        self.assertGreater(changed.size, 0)
+        self.assertTrue(np.all(self.vz[changed] != 0))
+        lo, hi = bands.ranges(z, self.vz)
+        np.testing.assert_array_equal(bands.lo, lo)
+        np.testing.assert_array_equal(bands.hi, hi)
+
+
+if __name__ == '__main__':
+    unittest.main()
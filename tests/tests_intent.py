@@ -0,0 +1,96 @@
+"""
+Detection on piecewise-linear trajectories must give the cd3d conflict of
+straight-line trajectories, whatever the number of waypoints on the lines,
+and follow the turns of the flight plans that cd3d does not see.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CD3D import CD3D
+from pykb3d.Intent import CD3DIntent, Trajectory, cd3d_intent
+
+
+D = 9260.0  # 5 nm
+H = 304.8   # 1000 ft
+T = 300.0
+
+
+def line(x, y, z, vx, vy, vz, waypoints=2, duration=1000.0):
+    t = np.linspace(0, duration, waypoints)
+    return Trajectory(t, x + vx * t, y + vy * t, z + vz * t)
+
+
+class TestIntent(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(12)
+        n = 400
+        self.own = np.column_stack((rng.uniform(-40000, 40000, (n, 2)), rng.uniform(-600, 600, n),
+                                    rng.uniform(-250, 250, (n, 2)), rng.choice([-10.0, 0.0, 10.0], n)))
+        self.intruder = np.column_stack((np.zeros((n, 3)), rng.uniform(-250, 250, (n, 2)),
+                                         rng.choice([-10.0, 0.0, 10.0], n)))
+
+    def test_straight_lines(self):
+        cd = CD3D(D, H, T)
+        intent = CD3DIntent(D, H, T)
+        found = 0
+        for waypoints in (2, 37):
+            for own, intruder in zip(self.own, self.intruder):
+                cd.cd3d(*(own - intruder))
+                intent.cd3d(line(*own, waypoints=waypoints), line(*intruder, waypoints=waypoints), 0.0)
+                self.assertEqual(intent.conflict, cd.conflict)
+                if cd.conflict:
+                    found += 1
+                    self.assertAlmostEqual(intent.time2los, cd.time2los, places=6)
+                    self.assertAlmostEqual(intent.duration, min(cd.t_out, T) - cd.time2los, places=6)
+                    self.assertEqual(intent.intervals.shape, (1, 2))
+        self.assertGreater(found, 20)
+
+    def test_pairs(self):
+        owns = [line(*own, waypoints=5) for own in self.own]
+        intruders = [line(*intruder, waypoints=9) for intruder in self.intruder]
+        conflict, time2los, duration, (pair, t_in, t_out) = cd3d_intent(D, H, T, 0, owns, intruders, 0.0)
+        intent = CD3DIntent(D, H, T)
+        for k in range(len(owns)):
+            self.assertEqual(intent.cd3d(owns[k], intruders[k], 0.0), conflict[k])
+            self.assertEqual(intent.time2los, time2los[k])
+            self.assertEqual(intent.duration, duration[k])
+        self.assertEqual(pair.size, conflict.sum())
+
+    def test_turns(self):
+        intruder = line(0, 0, 10000, 0, 0, 0)
+        # Heading for the intruder, turning away just before the loss of
+        # separation: a conflict for cd3d, none with the turn
+        away = Trajectory([0, 100, 400], [-50000, -10000, -10000], [0, 0, 40000], [10000] * 3)
+        cd = CD3D(D, H, T)
+        self.assertTrue(cd.cd3d(-50000, 0, 0, 400, 0, 0))
+        intent = CD3DIntent(D, H, T)
+        self.assertFalse(intent.cd3d(away, intruder, 0.0))
+
+        # Flying through the intruder, then turning back through it: two intervals
+        back = Trajectory([0, 100, 150, 291], [-20000, 20000, 20000, -20000],
+                          [0, 0, 20000, -20000], [10000] * 4)
+        self.assertTrue(intent.cd3d(back, intruder, 0.0))
+        self.assertEqual(intent.intervals.shape, (2, 2))
+        self.assertAlmostEqual(intent.time2los, 26.85, places=2)
+        self.assertAlmostEqual(intent.duration, np.diff(intent.intervals).sum())
+
+        # Filter on the merged intervals
+        intent.set_filter(100)
+        self.assertFalse(intent.cd3d(back, intruder, 0.0))
+
+    def test_span(self):
+        own = line(-40000, 0, 10000, 200, 0, 0, duration=100)
+        intruder = line(0, 0, 10000, 0, 0, 0)
+        intent = CD3DIntent(D, H, T)
+        # The ownship plan ends before the loss of separation
+        self.assertFalse(intent.cd3d(own, intruder, 0.0))
+        self.assertFalse(intent.cd3d(intruder, own, 500.0))
+        with self.assertRaises(ValueError):
+            Trajectory([0, 0], [0, 1], [0, 1], [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Check that the batch resolution kernel returns, for every pair, the same
+trk, gs, opt_trk, opt_gs and vs as the scalar KB3D.kb3d, and that the pair
+evaluation returns the resolutions of both aircraft.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Constants import NaR
+from pykb3d.KB3D import KB3D
+from pykb3d.KB3DBatch import KB3DBatch
+
+
+class TestKB3DBatch(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.D = 9260.0  # 5 nm
+        self.H = 304.8   # 1000 ft
+        self.T = 300.0
+
+        rng = np.random.default_rng(11)
+        n = 3000
+        self.sx = rng.uniform(-40000, 40000, n)
+        self.sy = rng.uniform(-40000, 40000, n)
+        self.sz = rng.uniform(-900, 900, n)
+        gs_o = rng.uniform(100, 250, n)
+        gs_i = rng.uniform(100, 250, n)
+        trk_o = rng.uniform(-np.pi, np.pi, n)
+        trk_i = rng.uniform(-np.pi, np.pi, n)
+        self.vox = gs_o * np.sin(trk_o)
+        self.voy = gs_o * np.cos(trk_o)
+        self.vix = gs_i * np.sin(trk_i)
+        self.viy = gs_i * np.cos(trk_i)
+        self.voz = rng.uniform(-15, 15, n)
+        self.viz = rng.uniform(-15, 15, n)
+
+        # Level pairs and pairs at the same altitude
+        self.voz[::4] = 0
+        self.viz[::4] = 0
+        self.sz[::6] = 0
+
+    def test_matches_scalar(self):
+        batch = KB3DBatch(self.D, self.H, self.T)
+        batch.kb3d(self.sx, self.sy, self.sz,
+                   self.vox, self.voy, self.voz,
+                   self.vix, self.viy, self.viz)
+
+        solved = 0
+        for i in range(self.sx.size):
+            kb = KB3D(self.D, self.H, self.T)
+            kb.kb3d(self.sx[i], self.sy[i], self.sz[i],
+                    self.vox[i], self.voy[i], self.voz[i],
+                    self.vix[i], self.viy[i], self.viz[i])
+            for name in ('trk', 'gs', 'opt_trk', 'opt_gs', 'vs'):
+                expectation = getattr(kb, name)
+                actual = getattr(batch, name)[i]
+                self.assertAlmostEqual(actual, expectation, places=9,
+                                       msg="%s of pair %d" % (name, i))
+            solved += kb.vs != NaR
+
+        self.assertGreater(solved, 100)
+
+    def test_pair(self):
+        states = (self.sx, self.sy, self.sz, self.vox, self.voy, self.voz,
+                  self.vix, self.viy, self.viz)
+        pair = KB3DBatch(self.D, self.H, self.T)
+        pair.kb3d_pair(*states)
+        own = KB3DBatch(self.D, self.H, self.T)
+        own.kb3d(*states)
+        intruder = KB3DBatch(self.D, self.H, self.T)
+        intruder.kb3d(-self.sx, -self.sy, -self.sz, self.vix, self.viy, self.viz,
+                      self.vox, self.voy, self.voz)
+        for name in ('trk', 'gs', 'opt_trk', 'opt_gs', 'vs'):
+            np.testing.assert_array_equal(getattr(pair, name), getattr(own, name))
+            np.testing.assert_array_equal(getattr(pair, name + '_i'), getattr(intruder, name))
+            self.assertGreater((getattr(pair, name + '_i') != NaR).sum(), 50)
+
+    def test_track_axis(self):
+        # sxy == 0 (R == 1 at sx == sy == D): solutions along the y axis, or
+        # none when neither direction closes the pair
+        D = self.D
+        vix = np.array([0.0, 0.0])
+        viy = np.array([-200.0, 0.0])
+        batch = KB3DBatch(D, self.H, self.T)
+        trk = batch.track(np.full(2, D), np.full(2, D), np.zeros(2), np.full(2, 100.0), vix, viy, 1)
+        for i in range(2):
+            kb = KB3D(D, self.H, self.T)
+            self.assertEqual(trk[i], kb.track(D, D, 0.0, 100.0, vix[i], viy[i], 1))
+            self.assertEqual((batch.vx[i], batch.vy[i]), (kb.vx, kb.vy))
+        self.assertEqual(trk[0], NaR)
+        self.assertEqual((batch.vx[1], batch.vy[1]), (0, -100))
+
+    def test_no_conflict(self):
+        batch = KB3DBatch(self.D, self.H, self.T)
+        # Diverging pairs, far apart
+        batch.kb3d(self.sx + 1e6, self.sy, self.sz,
+                   np.abs(self.vox), self.voy, self.voz,
+                   -np.abs(self.vix), self.viy, self.viz)
+        for name in ('trk', 'gs', 'opt_trk', 'opt_gs', 'vs'):
+            self.assertTrue((getattr(batch, name) == NaR).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
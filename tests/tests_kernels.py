@@ -0,0 +1,123 @@
+"""
+The stateless cd3d and KB3D functions must give the results of the CD3D and
+KB3D classes as they were before the functions were extracted (reference
+values below, computed with that code on the same random pairs), and the
+same results when called from many threads with one configuration.
+
+"""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pykb3d.Constants import NaR
+from pykb3d.CD3D import cd3d
+from pykb3d.KB3D import KB3D, kb3d, ground_speed, track, optimal, vertical
+
+
+D = 9260.0  # 5 nm
+H = 304.8   # 1000 ft
+T = 300.0
+
+# Pair index: conflict, t_in, t_out, time2los, time2lhs, time2lvs, duration
+# (filter 1 s)
+CD3D_REFERENCE = {
+    19: (True, 28.283734439080515, 29.954888647525422, 28.283734439080515, 28.283734439080515, 0,
+         1.6711542084449071),
+    29: (True, 6.110508612770175, 29.458144491481452, 6.110508612770175, 6.110508612770175, 0,
+         23.347635878711277),
+    30: (True, -3.8778587576751824, 27.153146381993558, 0, 0, 0, 27.153146381993558),
+    71: (True, -3.420781147048451, 17.760840667180215, 0, 0, 0, 17.760840667180215),
+}
+
+# Pair index: trk, gs, opt_trk, opt_gs, vs
+KB3D_REFERENCE = {
+    19: (-2.503141271371785, 81.89071953605429, -2.7679615603128376, 111.23049195222937,
+         2.7633866825418396),
+    90: (0.6032431400096596, 418.5131804184166, 0.6079427606635, 244.58486217360257,
+         10.424971066373912),
+    124: (-0.6886925066643433, 151.49342002053623, -0.6966495482585254, 240.18897660040747,
+          2.395051009580159),
+    150: (1.6295648158149372, 128.43800205804803, 1.9874060193581817, 133.65743468568616,
+          -11.41765864834736),
+    289: (NaR, NaR, NaR, NaR, -11.212513122624658),
+    382: (NaR, NaR, NaR, NaR, -11.009953441690014),
+}
+
+# (pair index, epsilon): ground_speed, track, optimal and vertical outputs
+SOLVER_REFERENCE = {
+    (19, 1): ((NaR, 0, 0),
+              (2.0414640044985344, 152.76814418680434, -77.72936981881745),
+              (2.205488686984539, 205.8011685995127, 165.72224372961347, -122.02564865694278),
+              24.31641042885792),
+    (19, -1): ((81.89071953605429, -1.4524375874816238, -81.87783809546497),
+               (-2.503141271371785, -102.14975156074198, -137.64225029688166),
+               (-2.7679615603128376, 111.23049195222937, -40.59895250190348, -103.55649373980923),
+               2.7633866825418396),
+    (90, 1): ((418.5131804184166, 272.16863277110735, 317.92690593821123),
+              (0.6032431400096596, 136.12908959542108, 197.6011229303455),
+              (0.6079427606635, 244.58486217360257, 139.70199059940566, 200.76132253759374),
+              10.424971066373912),
+    (90, -1): ((158.164407671104, 102.85790890948515, 120.15086528493764),
+               (0.9286398351068476, 192.15563081425356, 143.7134174800252),
+               (0.8853022283680055, 216.91030055787252, 167.91164100629652, 137.3162747189101),
+               6.73983471511607),
+}
+
+
+def random_pairs(n, seed):
+    rng = np.random.default_rng(seed)
+    gs = rng.uniform(100, 250, (n, 2))
+    trk = rng.uniform(-np.pi, np.pi, (n, 2))
+    vz = rng.uniform(-15, 15, (n, 2))
+    vz[::4] = 0
+    s = np.column_stack((rng.uniform(-40000, 40000, n),
+                         rng.uniform(-40000, 40000, n),
+                         rng.uniform(-900, 900, n)))
+    return [tuple(float(x) for x in (*s[k], gs[k, 0] * np.sin(trk[k, 0]),
+                                     gs[k, 0] * np.cos(trk[k, 0]), vz[k, 0],
+                                     gs[k, 1] * np.sin(trk[k, 1]),
+                                     gs[k, 1] * np.cos(trk[k, 1]), vz[k, 1]))
+            for k in range(n)]
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pairs = random_pairs(2000, 4)
+
+    def test_cd3d(self):
+        for k, expected in CD3D_REFERENCE.items():
+            sx, sy, sz, vox, voy, voz, vix, viy, viz = self.pairs[k]
+            result = cd3d(D, H, T, 1, sx, sy, sz, vox - vix, voy - viy, voz - viz)
+            self.assertEqual(result[0], expected[0])
+            np.testing.assert_allclose(result[1:], expected[1:], rtol=1e-12, atol=1e-12, err_msg=k)
+
+    def test_kb3d(self):
+        for k, expected in KB3D_REFERENCE.items():
+            np.testing.assert_allclose(kb3d(D, H, T, *self.pairs[k]), expected, rtol=1e-12, err_msg=k)
+
+        for (k, eps), (gs, trk, opt, vs) in SOLVER_REFERENCE.items():
+            sx, sy, sz, vox, voy, voz, vix, viy, viz = self.pairs[k]
+            np.testing.assert_allclose(ground_speed(D, sx, sy, vox, voy, vix, viy, eps), gs, rtol=1e-12)
+            np.testing.assert_allclose(track(D, sx, sy, vox, voy, vix, viy, eps), trk, rtol=1e-12)
+            np.testing.assert_allclose(optimal(D, sx, sy, vox, voy, vix, viy, eps), opt, rtol=1e-12)
+            self.assertAlmostEqual(vertical(D, H, *self.pairs[k], eps), vs, places=12)
+
+    def test_precondition(self):
+        # The time to loss of separation of the precondition's cd3d call
+        kb = KB3D(D, H, T)
+        self.assertTrue(kb.precondition(*self.pairs[19]))
+        self.assertAlmostEqual(kb.time2los, CD3D_REFERENCE[19][3], places=12)
+        self.assertFalse(kb.precondition(*self.pairs[30]))  # violation
+        self.assertEqual(kb.time2los, 0)
+
+    def test_threads(self):
+        serial = [kb3d(D, H, T, *p) for p in self.pairs]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            threaded = list(pool.map(lambda p: kb3d(D, H, T, *p), self.pairs))
+        self.assertEqual(threaded, serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
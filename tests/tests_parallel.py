@@ -0,0 +1,41 @@
+"""
+Detection and resolution sharded across worker processes must give the
+same results, in the same order, as the serial Scene.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Parallel import ParallelScene
+from pykb3d.Scene import Scene
+from pykb3d.tests.traffic import random_traffic
+
+
+class TestParallelScene(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.traffic = random_traffic(1500, 9, (0, 500), np.arange(300, 360))
+
+    def test_same_as_serial(self):
+        serial = Scene(5, 1000, 300)
+        serial.set_traffic(*self.traffic)
+        expectation = serial.detection()
+        serial.resolution()
+
+        with ParallelScene(5, 1000, 300, workers=2, block=40) as scene:
+            scene.set_traffic(*self.traffic)
+            for _ in range(2):
+                actual = scene.detection()
+                scene.resolution()
+
+                self.assertEqual(actual, expectation)
+                for name in ('time2los', 'duration', 'recovery', 'newtrk',
+                             'newgs', 'opttrk', 'optgs', 'newvs'):
+                    np.testing.assert_array_equal(getattr(scene, name),
+                                                  getattr(serial, name))
+            self.assertGreater(len(actual), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
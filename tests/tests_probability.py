@@ -0,0 +1,87 @@
+"""
+Without surveillance errors the probability of conflict must be that of
+the deterministic detection; with errors, a pair whose miss distance is
+the horizontal separation must be in conflict half of the time, and the
+samples must depend on the seed only, not on the number of workers.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Probability import ConflictProbability, error_factor
+from pykb3d.tests.traffic import random_traffic
+
+
+class TestProbability(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cp = ConflictProbability(5, 1000, 300, samples=300, seed=7)
+        self.cp.set_traffic(*random_traffic(120, 5, (0, 100), np.arange(300, 310),
+                                            (-1500.0, 0.0, 0.0, 1500.0)))
+
+    def tearDown(self) -> None:
+        self.cp.close()
+
+    def test_no_error(self):
+        found = self.cp.probability()
+        conflicts = self.cp.detection()
+        self.assertGreater(len(conflicts), 0)
+        self.assertEqual([(own, intruder) for own, intruder, _ in found], conflicts)
+        np.testing.assert_array_equal(self.cp.p_conflict, 1.0)
+        np.testing.assert_array_equal(self.cp.p_time2los,
+                                      np.repeat(self.cp.time2los[:, None], 300, axis=1))
+
+    def test_boundary(self):
+        # Head-on, level, with a miss distance of 5 nm
+        cp = ConflictProbability(5, 1000, 300, samples=4000, seed=1)
+        cp.set_traffic([0, 10], [0, 5], [30000, 30000], [90, 270], [450, 450], [0, 0])
+        cp.set_position_error([50, 50, 0])
+        found = cp.probability()
+        self.assertEqual(len(found), 1)
+        self.assertAlmostEqual(found[0][2], 0.5, delta=0.03)
+        low, median, high = cp.time2los_quantiles([0.05, 0.5, 0.95])[0]
+        self.assertLess(low, median)
+        self.assertLess(median, high)
+
+    def test_seed_and_workers(self):
+        self.cp.set_position_error([200, 200, 30])
+        self.cp.set_velocity_error(np.diag([9.0, 9.0, 1.0]))
+        self.cp.set_block(100)
+        serial = self.cp.probability()
+        time2los = self.cp.p_time2los.copy()
+        self.assertLess(self.cp.p_conflict.min(), 1.0)
+        self.assertEqual(self.cp.probability(), serial)
+
+        self.cp.set_workers(2)
+        self.assertEqual(self.cp.probability(), serial)
+        np.testing.assert_array_equal(self.cp.p_time2los, time2los)
+
+        self.cp.set_seed(8)
+        self.assertNotEqual(self.cp.probability(), serial)
+
+    def test_error_margins(self):
+        # Level head-on aircraft 2500 ft apart: in conflict only through the
+        # vertical velocity error, out of the altitude bands of the reported
+        # states
+        cp = ConflictProbability(5, 1000, 300, samples=500, seed=3)
+        cp.set_traffic([0, 40], [0, 0], [30000, 32500], [90, 270], [450, 450], [0, 0])
+        cp.set_velocity_error([0, 0, 2])
+        pairs = cp.probability([0], [1])
+        self.assertGreater(pairs[0][2], 0.05)
+        self.assertEqual(cp.probability(), pairs)
+        self.assertEqual(cp.candidates, 1)
+        cp.set_velocity_error([0, 0, 0])
+        self.assertEqual(cp.probability(), [])
+        self.assertEqual(cp.candidates, 0)
+
+    def test_error_factor(self):
+        cov = np.array([[4.0, 1.0, 0.0], [1.0, 3.0, 0.0], [0.0, 0.0, 0.0]])
+        factor = error_factor(cov)
+        np.testing.assert_allclose(factor @ factor.T, cov, atol=1e-12)
+        with self.assertRaises(ValueError):
+            error_factor(-cov)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+A replay must detect, at each tick, the conflicts of a Scene run on the
+last reports of the aircraft extrapolated to the tick, and give the same
+conflicts whatever the window length and the number of worker processes.
+
+"""
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pykb3d.Destination import SPHERICAL, location_array
+from pykb3d.Replay import Conflict, ReplayEngine, write_conflicts
+from pykb3d.Scene import Scene
+from pykb3d.TrackStore import TrackStore, write_tracks
+from pykb3d.tests.traffic import recorded_traffic
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'day.trk')
+        self.states = recorded_traffic(60, 400, 8, silent=200)
+        write_tracks(self.path, *self.states)
+        self.store = TrackStore(self.path)
+        self.engine = ReplayEngine(5, 1000, 300)
+        self.engine.set_period(10)
+        self.engine.set_max_age(12)
+
+    def tearDown(self) -> None:
+        del self.store
+        self.folder.cleanup()
+
+    def expectation(self, tick):
+        t, ids, lat, lon, alt, trk, gs, vs = self.states
+        conflicts = []
+        picture = []
+        for i in np.unique(ids):
+            rows = np.flatnonzero((ids == i) & (t <= tick) & (t >= tick - 12))
+            if rows.size:
+                picture.append(rows[np.argmax(t[rows])])
+        picture = np.array(picture)
+        lat, lon, alt = location_array(lat[picture], lon[picture], alt[picture], trk[picture],
+                                       gs[picture], vs[picture], tick - t[picture], SPHERICAL)
+        scene = Scene(5, 1000, 300)
+        scene.set_traffic(lat, lon, alt, trk[picture], gs[picture], vs[picture], ids[picture], True)
+        for own, intruder in scene.detection():
+            conflicts.append((tick, own, intruder))
+        return conflicts, picture.size
+
+    def test_ticks(self):
+        conflicts = list(self.engine.run(self.store, 20, 300))
+        expectation, aircraft = [], 0
+        for tick in np.arange(20, 301, 10.0):
+            c, n = self.expectation(tick)
+            expectation += c
+            aircraft += n
+        self.assertGreater(len(expectation), 0)
+        self.assertEqual([(c.time, c.own, c.intruder) for c in conflicts], expectation)
+        self.assertEqual(self.engine.ticks, 29)
+        self.assertEqual(self.engine.aircraft_ticks, aircraft)
+        self.assertGreater(self.engine.throughput(), 0)
+        # Aircraft 100 is dropped once its last report is too old
+        self.assertLess(self.expectation(300)[1], 60)
+
+    def test_windows_and_workers(self):
+        serial = list(self.engine.run(self.path))
+        self.assertTrue(all(isinstance(c, Conflict) for c in serial))
+        for window, workers in ((60, 1), (50, 2)):
+            engine = ReplayEngine(5, 1000, 300)
+            engine.set_period(10)
+            engine.set_max_age(12)
+            engine.set_window(window)
+            self.assertEqual(list(engine.run(self.store, workers=workers)), serial)
+            self.assertEqual(engine.aircraft_ticks, self.engine.aircraft_ticks)
+
+    def test_write(self):
+        f = io.StringIO()
+        count = write_conflicts(self.engine.run(self.store), f)
+        lines = f.getvalue().splitlines()
+        self.assertGreater(count, 0)
+        self.assertEqual(len(lines), count + 1)
+        self.assertEqual(lines[0].split(','), list(Conflict._fields))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Every maneuver returned by the resolver must solve the conflict with its
+intruder and be conflict free with every aircraft according to CDR, and
+the maneuvers that create a secondary conflict must be dropped.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CDR import CDR
+from pykb3d.Resolver import Resolver, MANEUVERS, TRACK
+from pykb3d.tests.traffic import random_traffic
+
+
+class TestResolver(unittest.TestCase):
+
+    def setUp(self) -> None:
+        n = 40
+        self.own = (0.0, 0.0, 30000.0, 90.0, 450.0, 0.0)
+        # Head-on intruder, then traffic around the ownship
+        self.traffic = tuple(np.concatenate(([a], b)) for a, b in zip(
+            (30.0, 0.0, 30000.0, 270.0, 450.0, 0.0),
+            random_traffic(n, 34, (-40, 40), (290, 300, 310), (-500.0, 0.0, 500.0))))
+        self.ids = np.arange(100, 100 + n + 1)
+        self.resolver = Resolver(5, 1000, 300)
+        self.resolver.set_ownship(*self.own)
+        self.resolver.set_traffic(*self.traffic, self.ids)
+
+    def detection(self, trk, gs, vs):
+        return [self.ids[k] for k in range(self.ids.size)
+                if CDR(5, 1000, 300, *self.own[:3], trk, gs, vs,
+                       *(c[k] for c in self.traffic), False).detection()]
+
+    def test_resolution(self):
+        maneuvers = self.resolver.resolution()
+        self.assertEqual(self.resolver.conflicts, self.detection(*self.own[3:]))
+        self.assertIn(100, self.resolver.conflicts)
+        self.assertGreater(len(maneuvers), 0)
+        self.assertLess(len(maneuvers), self.resolver.proposed)
+        for kind, intruder, trk, gs, vs in maneuvers:
+            self.assertIn(kind, MANEUVERS)
+            self.assertIn(intruder, self.resolver.conflicts)
+            self.assertEqual(self.detection(trk, gs, vs), [])
+
+    def test_secondary_conflict(self):
+        # An intruder right on the KB3D track resolution of the head-on
+        # conflict: the track maneuver must be dropped.
+        self.resolver.set_traffic(*(c[:1] for c in self.traffic), self.ids[:1])
+        alone = [m for m in self.resolver.resolution() if m[0] == TRACK]
+        self.assertEqual(len(alone), 1)
+        trk = np.radians(alone[0][2])
+        blocker = (10 * np.sin(trk), 10 * np.cos(trk), 30000.0, 0.0, 0.0, 0.0)
+        traffic = tuple(np.append(c[:1], b) for c, b in zip(self.traffic, blocker))
+        self.resolver.set_traffic(*traffic)
+        self.assertNotIn(TRACK, [m[0] for m in self.resolver.resolution()])
+
+        self.resolver.set_traffic([], [], [], [], [], [])
+        self.assertEqual(self.resolver.resolution(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Check that grid pruning in Scene finds exactly the conflicts of the
+brute force all-pairs search, that pair resolution gives each intruder
+the resolution of the swapped pair, and that a sweep finds the conflicts
+of every setting.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CD3D import CD3D
+from pykb3d.Scene import Scene, resolve_block
+from pykb3d.tests.traffic import random_traffic
+
+
+ADVISORIES = ('recovery', 'newtrk', 'newgs', 'opttrk', 'optgs', 'newvs')
+
+
+class TestScene(unittest.TestCase):
+
+    def setUp(self) -> None:
+        n = 800
+        self.x, self.y, self.alt, self.trk, self.gs, self.vs = random_traffic(
+            n, 3, (0, 400), np.arange(300, 380), (-1500.0, 0.0, 0.0, 1500.0))
+        self.ids = np.arange(n) + 1000
+
+        self.scene = Scene(5, 1000, 300)
+        self.scene.set_traffic(self.x, self.y, self.alt,
+                               self.trk, self.gs, self.vs, self.ids)
+
+    def test_matches_brute_force(self):
+        pruned = self.scene.detection()
+        time2los = self.scene.time2los.copy()
+        duration = self.scene.duration.copy()
+
+        brute = self.scene.brute_force()
+
+        self.assertGreater(len(brute), 0)
+        self.assertLess(self.scene.candidates, 800 * 799 // 2)
+        self.assertEqual(pruned, brute)
+        np.testing.assert_array_equal(time2los, self.scene.time2los)
+        np.testing.assert_array_equal(duration, self.scene.duration)
+
+    def test_matches_cd3d(self):
+        conflicts = set(self.scene.detection())
+        s = self.scene
+        cd = CD3D(s.d, s.h, s.t)
+        cd.set_filter(s.get_detection_filter())
+        for i in range(0, s.size(), 7):
+            for j in range(i + 1, s.size()):
+                conflict = cd.cd3d(s.x[i] - s.x[j], s.y[i] - s.y[j],
+                                   s.z[i] - s.z[j], s.vx[i] - s.vx[j],
+                                   s.vy[i] - s.vy[j], s.vz[i] - s.vz[j])
+                self.assertEqual(
+                    conflict, (s.ids[i], s.ids[j]) in conflicts)
+
+    def test_pair_resolution(self):
+        self.scene.detection()
+        s = self.scene
+        s.resolution()
+        own = [getattr(s, name).copy() for name in ADVISORIES]
+        s.pair_resolution()
+        swapped = resolve_block(s.d, s.h, s.t, s.states(), s.intruder_rows, s.own_rows, s.t_in)
+        self.assertGreater((s.recovery_i == 1).sum(), 0)
+        for name, expectation, reverse in zip(ADVISORIES, own, swapped):
+            np.testing.assert_array_equal(getattr(s, name), expectation)
+            np.testing.assert_array_equal(getattr(s, name + '_i'), reverse)
+
+    def test_sweep(self):
+        D, H, T = [3, 5, 5, 8], [1000, 1000, 500, 1000], [300, 300, 300, 120]
+        conflict = self.scene.sweep(D, H, T)
+        s = self.scene
+        pairs = list(zip(s.sweep_own.tolist(), s.sweep_intruder.tolist()))
+        self.assertEqual(s.get_D(), 5)
+        for m in range(len(D)):
+            scene = Scene(D[m], H[m], T[m])
+            scene.set_traffic(self.x, self.y, self.alt, self.trk, self.gs, self.vs, self.ids)
+            found = scene.detection()
+            self.assertGreater(len(found), 0)
+            self.assertEqual([pair for pair, c in zip(pairs, conflict[:, m]) if c], found)
+            np.testing.assert_array_equal(s.sweep_time2los[conflict[:, m], m], scene.time2los)
+
+    def test_empty(self):
+        scene = Scene(5, 1000, 300)
+        self.assertEqual(scene.detection(), [])
+        scene.set_traffic([0], [0], [35000], [90], [450], [0])
+        self.assertEqual(scene.detection(), [])
+        self.assertEqual(scene.sweep([3, 5], 1000, 300).shape, (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+The scheduler must resolve violations first and then the conflicts by
+increasing time to loss of separation, give the resolutions of CDR, and
+stop at the deadline with the other conflicts deferred in the same order.
+
+"""
+import itertools
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pykb3d.CDR import CDR
+from pykb3d.Scheduler import ResolutionScheduler
+
+
+def conflicts(n, seed):
+    rng = np.random.default_rng(seed)
+    found = []
+    while len(found) < n:
+        x, y = rng.uniform(-30, 30, 2)
+        alt = rng.choice([35000.0, 35500.0, 37000.0])
+        trk, gs = rng.uniform(0, 360, 2), rng.uniform(400, 480, 2)
+        cdr = CDR(5, 1000, 300, x, y, alt, trk[0], gs[0], 0, 0, 0, 35000, trk[1], gs[1], 0, False)
+        if cdr.detection():
+            found.append((len(found), 1000 + len(found), cdr))
+    return found
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.conflicts = conflicts(60, 2)
+        self.urgency = {(own, intruder): (not cdr.violation(), cdr.time2los)
+                        for own, intruder, cdr in self.conflicts}
+
+    def test_order(self):
+        scheduler = ResolutionScheduler(math.inf)
+        for conflict in self.conflicts:
+            scheduler.push(*conflict)
+        resolved = scheduler.resolve()
+        self.assertEqual(len(resolved), 60)
+        self.assertEqual(scheduler.deferred, [])
+        keys = [self.urgency[(own, intruder)] for own, intruder, _ in resolved]
+        self.assertEqual(keys, sorted(keys))
+        self.assertFalse(keys[0][0])
+        self.assertTrue(keys[-1][0])
+
+        # Same resolutions as CDR on its own
+        for (own, intruder, cdr), (_, _, twin) in zip(sorted(resolved, key=lambda r: r[0]), conflicts(60, 2)):
+            twin.resolution()
+            self.assertEqual(cdr.recovery, twin.recovery)
+            self.assertEqual((cdr.newtrk, cdr.newgs, cdr.newvs), (twin.newtrk, twin.newgs, twin.newvs))
+            if cdr.violation():
+                self.assertEqual(cdr.recovery, -1)
+
+    def test_deadline(self):
+        scheduler = ResolutionScheduler(0.0)
+        for conflict in self.conflicts:
+            scheduler.push(*conflict)
+        self.assertEqual(scheduler.resolve(), [])
+        self.assertEqual(len(scheduler.deferred), 60)
+
+        # Clock advancing 1 s per reading: each resolution takes 1 s and ten
+        # fit before a deadline 21 s after the start
+        clock = itertools.count()
+        with mock.patch('pykb3d.Scheduler.time', mock.Mock(perf_counter=lambda: float(next(clock)))):
+            resolved = scheduler.resolve(deadline=21.0)
+        self.assertEqual(len(resolved), 10)
+        self.assertEqual(scheduler.cost, 1.0)
+        order = sorted(self.urgency, key=self.urgency.get)
+        self.assertEqual([(own, intruder) for own, intruder, _ in resolved] + scheduler.deferred, order)
+        self.assertEqual(len(scheduler), len(scheduler.deferred))
+        self.assertEqual(scheduler.ticks, 2)
+        self.assertEqual(scheduler.resolved, len(resolved))
+        self.assertEqual(scheduler.deferred_total, 60 + len(scheduler.deferred))
+
+    def test_cost_above_budget(self):
+        # A slow resolution left the estimate above the budget: the most
+        # urgent conflict is still resolved every tick, and the estimate
+        # decays with the measured cost
+        scheduler = ResolutionScheduler(0.005)
+        scheduler.cost = 0.006
+        for conflict in self.conflicts[:20]:
+            scheduler.push(*conflict)
+        order = sorted(self.urgency, key=self.urgency.get)
+        order = [pair for pair in order if pair in scheduler.entries]
+        clock = itertools.count()
+        resolved = []
+        with mock.patch('pykb3d.Scheduler.time', mock.Mock(perf_counter=lambda: next(clock) * 1e-4)):
+            for _ in range(100):
+                tick = scheduler.resolve()
+                self.assertTrue(tick or not len(scheduler))
+                resolved += [(own, intruder) for own, intruder, _ in tick]
+        self.assertEqual(resolved, order)
+        self.assertLess(scheduler.cost, 0.005)
+
+    def test_push_replaces(self):
+        scheduler = ResolutionScheduler(math.inf)
+        own, intruder, cdr = self.conflicts[0]
+        scheduler.push(own, intruder, cdr)
+        scheduler.push(own, intruder, self.conflicts[1][2])
+        self.assertEqual(len(scheduler), 1)
+        self.assertIs(scheduler.pop()[2], self.conflicts[1][2])
+        with self.assertRaises(IndexError):
+            scheduler.pop()
+
+    def test_overload(self):
+        # The same conflicts pushed again every tick, none resolved
+        scheduler = ResolutionScheduler(0.0)
+        for _ in range(200):
+            for conflict in self.conflicts[:50]:
+                scheduler.push(*conflict)
+            scheduler.resolve()
+        self.assertEqual(len(scheduler), 50)
+        self.assertLessEqual(len(scheduler.heap), 150)
+        self.assertEqual(len(scheduler.deferred), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
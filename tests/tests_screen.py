@@ -0,0 +1,60 @@
+"""
+Screening must never remove a pair that cd3d reports in conflict, its
+array version must agree with the scalar one, and Scene detection with
+screening must find exactly the conflicts of the brute force.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.CD3D import cd3d
+from pykb3d.Scene import Scene
+from pykb3d.Screen import (KEPT, VERTICAL, HORIZONTAL, DIVERGING, screen,
+                           screen_array)
+from pykb3d.tests.traffic import random_traffic
+
+
+D = 9260.0  # 5 nm
+H = 304.8   # 1000 ft
+T = 300.0
+
+
+def relative_states(n, seed):
+    rng = np.random.default_rng(seed)
+    s = np.column_stack((rng.uniform(-150000, 150000, (n, 2)), rng.uniform(-3000, 3000, n)))
+    v = np.column_stack((rng.uniform(-500, 500, (n, 2)), rng.uniform(-20, 20, n)))
+    v[::5, 2] = 0
+    v[::7, :2] = 0
+    # Pairs on the boundaries of the bounds
+    s[1::11, 2] = H + np.abs(v[1::11, 2]) * T
+    s[2::11, 0] = D + np.hypot(v[2::11, 0], v[2::11, 1]) * T
+    s[2::11, 1] = 0
+    return np.column_stack((s, v))
+
+
+class TestScreen(unittest.TestCase):
+
+    def test_no_false_negative(self):
+        states = relative_states(20000, 13)
+        bound = screen_array(D, H, T, *states.T)
+        self.assertEqual(set(bound.tolist()), {KEPT, VERTICAL, HORIZONTAL, DIVERGING})
+        for k, p in enumerate(states.tolist()):
+            self.assertEqual(screen(D, H, T, *p), bound[k])
+            if bound[k] != KEPT:
+                self.assertFalse(cd3d(D, H, T, 0, *p)[0])
+
+    def test_scene(self):
+        scene = Scene(5, 1000, 300)
+        # En route traffic, 5 aircraft per 10000 nm^2, a third of them climbing or descending
+        scene.set_traffic(*random_traffic(2000, 5, (0, 2000), np.arange(200, 410, 10),
+                                          (-1500.0, 0.0, 0.0, 0.0, 0.0, 1500.0)))
+        conflicts = scene.detection()
+        self.assertGreater(len(conflicts), 0)
+        self.assertEqual(scene.screened.sum(), scene.candidates)
+        self.assertGreater(scene.candidates, 10 * scene.screened[KEPT])
+        self.assertEqual(conflicts, scene.brute_force())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+The closed-loop simulation must keep a head-on encounter separated with the
+KB3D maneuvers and lose separation without them, return the aircraft to
+their nominal velocity and level after the maneuver, and give the same
+Monte Carlo metrics with or without worker processes.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Resolver import MANEUVERS, TRACK, VERTICAL
+from pykb3d.Simulation import Simulator, monte_carlo
+from pykb3d.Util import velocity_array
+
+
+HEAD_ON = ([0, 40], [0, 0.5], [30000, 30000], [90, 270], [450, 450], [0, 0])
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_head_on(self):
+        sim = Simulator(5, 1000, 300, dt=2.0)
+        sim.set_policy([])
+        sim.set_traffic(*HEAD_ON)
+        metrics = sim.run(600)
+        self.assertEqual(metrics['los_events'], 1)
+        self.assertGreater(metrics['unresolved'], 0)
+
+        for policy in ([TRACK], [VERTICAL], MANEUVERS):
+            sim.set_policy(policy)
+            sim.set_traffic(*HEAD_ON)
+            metrics = sim.run(600)
+            self.assertEqual(metrics['los_events'], 0, msg=policy)
+            self.assertEqual(metrics['los_time'], 0)
+            self.assertEqual(sum(metrics['maneuvers'].values()), 2)
+            self.assertEqual(metrics['maneuvers'][policy[0]], 2)
+            self.assertEqual(metrics['steps'], 300)
+
+    def test_return_to_nominal(self):
+        sim = Simulator(5, 1000, 300, dt=2.0)
+        sim.set_policy([VERTICAL])
+        sim.set_traffic(*HEAD_ON)
+        metrics = sim.run(900)
+        self.assertGreater(metrics['delay'], -1e-9)
+        np.testing.assert_allclose(sim.vx, sim.nominal[0])
+        np.testing.assert_allclose(sim.vz, 0)
+        np.testing.assert_allclose(sim.states()[2], 30000)
+
+        sim.set_policy([TRACK])
+        sim.set_traffic(*HEAD_ON)
+        self.assertGreater(sim.run(900)['delay'], 1)
+
+        # Climbing aircraft without a target: back to their vertical speed
+        for policy in ([TRACK], [VERTICAL]):
+            sim.set_policy(policy)
+            sim.set_traffic(*HEAD_ON[:5], [500, 500])
+            metrics = sim.run(900)
+            self.assertEqual(sum(metrics['maneuvers'].values()), 2, msg=policy)
+            np.testing.assert_allclose(sim.vx, sim.nominal[0])
+            np.testing.assert_allclose(sim.vz, velocity_array(0, 0, 500)[2])
+
+    def test_level_off(self):
+        sim = Simulator(5, 1000, 300)
+        sim.set_traffic([0, 100], [0, 0], [30000, 20000], [0, 0], [400, 400], [1500, 0],
+                        target=[33000, 20000])
+        sim.run(300)
+        np.testing.assert_allclose(sim.states()[2], [33000, 20000])
+        np.testing.assert_array_equal(sim.vz, 0)
+        np.testing.assert_allclose(sim.vy, velocity_array(0, 400, 0)[1])
+
+    def test_monte_carlo(self):
+        parameters = dict(n=150, duration=600.0, density=20.0)
+        serial = monte_carlo([3, 4], workers=1, **parameters)
+        self.assertEqual([m['seed'] for m in serial], [3, 4])
+        self.assertGreater(sum(m['conflicts'] for m in serial), 0)
+        self.assertEqual(monte_carlo([3, 4], workers=2, **parameters), serial)
+
+    def test_policy(self):
+        with self.assertRaises(ValueError):
+            Simulator(5, 1000, 300).set_policy(['climb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
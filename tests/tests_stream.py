@@ -0,0 +1,78 @@
+"""
+The streaming monitor must keep the same conflict set as a Scene built on
+the same states, report only changes, and re-evaluate only the pairs of
+the updated aircraft.
+
+"""
+import unittest
+
+import numpy as np
+
+from pykb3d.Scene import Scene
+from pykb3d.Stream import ConflictMonitor, NEW, UPDATED, RESOLVED
+from pykb3d.tests.traffic import random_traffic
+
+
+class TestStream(unittest.TestCase):
+
+    def test_same_as_scene(self):
+        ids = np.arange(300) + 10
+        monitor = ConflictMonitor(5, 1000, 300)
+        for tick in range(3):
+            states = random_traffic(ids.size, tick)
+            monitor.process(10.0 * tick, ids, *states)
+            scene = Scene(5, 1000, 300)
+            scene.set_traffic(*states, ids)
+            expected = scene.detection()
+            self.assertGreater(len(expected), 0)
+            self.assertEqual(monitor.conflict_pairs(), sorted(expected))
+
+    def test_alerts(self):
+        monitor = ConflictMonitor(5, 1000, 300)
+        # Head-on at 20 nm, 480 kts closing: loss of separation in 112.5 s
+        alerts = monitor.process(0, [2, 1], [0, 20], [0, 0], 30000,
+                                 [90, 270], 240, 0)
+        self.assertEqual([(a.kind, a.own, a.intruder) for a in alerts],
+                         [(NEW, 1, 2)])
+        self.assertAlmostEqual(alerts[0].time2los, 112.5, places=6)
+        self.assertEqual(alerts[0].recovery, 1)
+
+        # Same trajectory, updated later: nothing to report
+        self.assertEqual(monitor.process(10, [1], [20 - 240 * 10 / 3600.0],
+                                         [0], 30000, [270], 240, 0), [])
+
+        # The intruder climbs: the conflict moves
+        alerts = monitor.process(20, [2], [240 * 20 / 3600.0], [0], 30000,
+                                 [90], 240, 600)
+        self.assertEqual([a.kind for a in alerts], [UPDATED])
+
+        # ... and turns away
+        alerts = monitor.process(30, [2], [0.5], [0], 30000, [0], 240, 0)
+        self.assertEqual([(a.kind, a.own, a.intruder) for a in alerts],
+                         [(RESOLVED, 1, 2)])
+        self.assertEqual(monitor.conflict_pairs(), [])
+
+        # Back in conflict, then the ownship leaves the airspace
+        monitor.process(40, [2], [0.5], [0], 30000, [90], 240, 0)
+        self.assertEqual(monitor.conflict_pairs(), [(1, 2)])
+        alerts = monitor.remove(40, [1])
+        self.assertEqual([a.kind for a in alerts], [RESOLVED])
+        self.assertEqual(monitor.conflict_pairs(), [])
+
+        self.assertRaises(ValueError, monitor.process, 0, [2], 0, 0, 0, 0, 0, 0)
+
+    def test_partial_updates(self):
+        ids = np.arange(400)
+        states = random_traffic(ids.size, 7)
+        monitor = ConflictMonitor(5, 1000, 300)
+        monitor.process(0, ids, *states)
+        everything = monitor.evaluated
+
+        updates = [(5.0, k) + tuple(float(c[k]) for c in states)
+                   for k in range(0, ids.size, 40)]
+        list(monitor.run(updates))
+        self.assertLess(monitor.evaluated, everything / 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
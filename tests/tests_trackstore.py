@@ -0,0 +1,80 @@
+"""
+A track store must return the states written to it, sorted by time then
+id, as views of the file; time slices and ticks must match a selection on
+the arrays, the CSV converter must give the same store as the arrays, and
+a replay must raise the alerts of the monitor run on the same updates.
+
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pykb3d.Stream import ConflictMonitor
+from pykb3d.TrackStore import TrackStore, csv2tracks, replay, write_tracks
+from pykb3d.tests.traffic import recorded_traffic
+
+
+class TestTrackStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'day.trk')
+        self.states = recorded_traffic(80, 600, 4, period=5.0, phased=False)
+        order = np.random.default_rng(0).permutation(self.states[0].size)
+        write_tracks(self.path, *(c[order] for c in self.states), step=60.0)
+        self.store = TrackStore(self.path)
+
+    def tearDown(self) -> None:
+        del self.store
+        self.folder.cleanup()
+
+    def test_slice(self):
+        self.assertEqual(self.store.size(), self.states[0].size)
+        self.assertEqual(self.store.time_range(), (0.0, 595.0))
+        self.assertIsInstance(self.store.slice(100.0, 160.0)[2], np.memmap)
+        for start, stop in ((None, None), (100.0, 160.0), (59.9, 60.0), (-10.0, 12.5), (590.0, 1000.0)):
+            columns = self.store.slice(start, stop)
+            t = self.states[0]
+            keep = (t >= (start if start is not None else -np.inf)) & (t < (stop if stop is not None else np.inf))
+            for actual, expectation in zip(columns, self.states):
+                np.testing.assert_allclose(actual, expectation[keep], rtol=1e-7)
+
+    def test_ticks(self):
+        ticks = list(self.store.ticks(30.0, 200.0))
+        self.assertEqual([t for t, *_ in ticks], list(np.arange(30.0, 200.0, 5.0)))
+        for t, ids, *_ in ticks:
+            np.testing.assert_array_equal(ids, self.states[1][self.states[0] == t])
+
+    def test_csv(self):
+        source = os.path.join(self.folder.name, 'day.csv')
+        with open(source, 'w') as f:
+            f.write('vs,gs,trk,alt,lon,lat,id,t,squawk\n')
+            for row in zip(*(c.tolist() for c in self.states)):
+                f.write('%r,%r,%r,%r,%r,%r,%d,%r,7000\n' % tuple(row[::-1]))
+        path = os.path.join(self.folder.name, 'csv.trk')
+        self.assertEqual(csv2tracks(source, path, step=60.0, chunk=1000), self.store.size())
+        store = TrackStore(path)
+        for actual, expectation in zip(store.slice(), self.store.slice()):
+            np.testing.assert_array_equal(actual, expectation)
+        np.testing.assert_array_equal(store.index, self.store.index)
+        del store
+
+        with open(source, 'w') as f:
+            f.write('t,id,lat,lon,alt,trk,gs,vs\n5,1,0,0,0,0,0,0\n0,1,0,0,0,0,0,0\n')
+        self.assertRaises(ValueError, csv2tracks, source, path)
+
+    def test_replay(self):
+        monitor = ConflictMonitor(5, 1000, 300, True)
+        alerts = list(replay(self.store, monitor))
+        self.assertGreater(len(alerts), 0)
+        expected = ConflictMonitor(5, 1000, 300, True)
+        order = np.lexsort((self.states[1], self.states[0]))
+        updates = zip(*(c[order].tolist() for c in self.states))
+        self.assertEqual(len(alerts), len(list(expected.run(updates))))
+        self.assertEqual(monitor.conflict_pairs(), expected.conflict_pairs())
+
+
+if __name__ == '__main__':
+    unittest.main()
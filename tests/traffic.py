@@ -0,0 +1,38 @@
+"""
+Random traffic shared by the tests, in the units of Scene.set_traffic
+(nm, ft, deg, kts, fpm) and of TrackStore.
+
+"""
+import numpy as np
+
+from pykb3d.Destination import SPHERICAL, location_array
+
+
+def random_traffic(n, seed, area=(0, 120), levels=np.arange(300, 320), vs=(-1000.0, 0.0, 1000.0)):
+    # n aircraft with x and y uniform in area [nm], at flight levels drawn
+    # from levels and vertical speeds [fpm] drawn from vs
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(*area, n), rng.uniform(*area, n),
+            rng.choice(levels, n) * 100.0, rng.uniform(0, 360, n),
+            rng.uniform(350, 500, n), rng.choice(vs, n))
+
+
+def recorded_traffic(n, seconds, seed, period=4.0, phased=True, silent=None):
+    # n aircraft on straight level lines, reporting every period s with 20%
+    # of the reports missing, each at its own phase when phased. Aircraft 100
+    # stops reporting after silent s.
+    #
+    # Returns t, ids, lat, lon, alt, trk, gs, vs
+    rng = np.random.default_rng(seed)
+    lat, lon = rng.uniform(50, 50.6, n), rng.uniform(4, 5, n)
+    trk, gs = rng.uniform(0, 360, n), rng.uniform(350, 500, n)
+    alt = rng.integers(300, 304, n) * 100.0
+    phase = rng.integers(0, period, n) if phased else np.zeros(n)
+    t = (np.arange(0, seconds, period)[:, None] + phase).ravel()
+    rows = np.tile(np.arange(n), t.size // n)
+    keep = rng.random(t.size) < 0.8
+    if silent is not None:
+        keep &= ~((rows == 0) & (t > silent))
+    t, rows = t[keep], rows[keep]
+    x, y, z = location_array(lat[rows], lon[rows], alt[rows], trk[rows], gs[rows], 0.0, t, SPHERICAL)
+    return t, rows + 100, x, y, z, trk[rows], gs[rows], np.zeros(t.size)